@@ -1,68 +1,177 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import selectinload
+import io
 import os
 
 # Load environment variables
 load_dotenv()
 
 # Import database and models
-from models import db, Context, Transaction, Todo, Idea, Event
+from models import (
+    db, Context, Transaction, Todo, Idea, Event, Tag, normalize_tag_names,
+    TransactionDailyRollup, TransactionTagDailyRollup, event_window_clause
+)
+import rollups  # noqa: F401  (flush hooks keep the daily rollups in step with transaction writes)
+from recurrence import RECURRENCE_TYPES, expand_event, is_recurring_series
+from changes import CHANGE_KINDS, conditional_get, record_changes
+from cache import cached_response, get_response_cache, init_response_cache
+from invalidation import init_invalidation_bus
+from pagination import InvalidPageParams, list_response, pagination_requested, parse_limit
+from importers import ImportFileError, import_transactions, iter_records
+from backup import iter_export
+from replicas import init_read_replicas, parse_replica_urls
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, init_metrics
+from serving import app_engines
+from slow_queries import init_slow_query_log
+from profiling import init_profiling
+from tracing import init_tracing
 
 VALID_CONTEXT_TYPES = {'Revenue', 'Investment', 'Experimental'}
 DEFAULT_CONTEXT_TYPE = 'Revenue'
+TODO_STATUSES = ('todo', 'in_progress', 'done')
+MAX_OVERDUE_LIMIT = 500
+HOME_LIMIT_DEFAULTS = (('notesLimit', 5), ('todosLimit', 8), ('eventsLimit', 5))
+MAX_HOME_LIMIT = 100
 
-app = Flask(__name__)
+api = Blueprint('api', __name__)
 
-# Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-}
 
-# Initialize extensions
-CORS(app)
-db.init_app(app)
+def create_app(config=None):
+    """
+    Build the API app: configuration from the environment (overridden by `config`),
+    extensions, and the routes below. `python app.py` runs it on the development
+    server; production serves it with gunicorn through wsgi.py.
+    """
+    app = Flask(__name__)
+
+    # Configuration
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_pre_ping': True,
+        'pool_recycle': 300,
+    }
+    # Optional read replicas (comma-separated URLs); GET requests read from them, see replicas.py
+    app.config['DATABASE_REPLICA_URLS'] = parse_replica_urls(os.getenv('DATABASE_REPLICA_URLS'))
+    app.config['REPLICA_MAX_LAG'] = float(os.getenv('REPLICA_MAX_LAG', 5))
+    app.config['REPLICA_CHECK_INTERVAL'] = float(os.getenv('REPLICA_CHECK_INTERVAL', 2))
+    app.config['REPLICA_RETRY_DELAY'] = float(os.getenv('REPLICA_RETRY_DELAY', 10))
+    app.config['RESPONSE_CACHE_SIZE'] = int(os.getenv('RESPONSE_CACHE_SIZE', 1024))
+    app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', 300))
+    app.config['CACHE_DEGRADED_TTL'] = int(os.getenv('CACHE_DEGRADED_TTL', 5))
+    # Slow-query log (0 disables it); EXPLAIN capture is PostgreSQL only, see slow_queries.py
+    app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS', 500))
+    app.config['SLOW_QUERY_EXPLAIN'] = os.getenv('SLOW_QUERY_EXPLAIN', '0') == '1'
+    app.config['SLOW_QUERY_EXPLAIN_INTERVAL'] = int(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 300))
+    app.config['SLOW_QUERY_LOG_FILE'] = os.getenv('SLOW_QUERY_LOG_FILE') or None
+    app.config['SLOW_QUERY_LOG_MAX_BYTES'] = int(os.getenv('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))
+    app.config['SLOW_QUERY_LOG_BACKUPS'] = int(os.getenv('SLOW_QUERY_LOG_BACKUPS', 5))
+    # Opt-in profiling of any request with ?__profile=1 and the X-Profile-Token header, see profiling.py
+    app.config['PROFILING_ENABLED'] = os.getenv('PROFILING_ENABLED', '0') == '1'
+    app.config['PROFILING_TOKEN'] = os.getenv('PROFILING_TOKEN') or None
+    # Request tracing: 'console' or 'otlp-file' (appends to TRACING_FILE); off when unset, see tracing.py
+    app.config['TRACING_EXPORTER'] = os.getenv('TRACING_EXPORTER') or None
+    app.config['TRACING_FILE'] = os.getenv('TRACING_FILE', 'traces.jsonl')
+    app.config['TRACING_SAMPLE_RATE'] = float(os.getenv('TRACING_SAMPLE_RATE', 1))
+    app.config['TRACING_SERVICE_NAME'] = os.getenv('TRACING_SERVICE_NAME', 'second-brain-api')
+    if config:
+        app.config.update(config)
+
+    # Initialize extensions
+    CORS(app)
+    init_metrics(app)
+    init_tracing(app)
+    db.init_app(app)
+    init_read_replicas(app)
+    init_slow_query_log(app, app_engines(app))
+    response_cache = init_response_cache(app)
+    init_invalidation_bus(app, response_cache)
+    init_profiling(app)
+
+    app.register_blueprint(api)
+    return app
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def filter_transactions_by_range(transactions, date_range):
-    """Filter transactions by date range"""
-    if date_range == 'all':
-        return transactions
-    
-    now = datetime.now()
-    
+TRANSACTION_RANGE_WINDOWS = {
+    'week': timedelta(days=7),
+    'month': timedelta(days=30),
+    'year': timedelta(days=365),
+}
+
+
+def get_range_start_date(date_range, now=None):
+    """Return the earliest transaction date included in a named range (None means no lower bound)"""
+    now = now or datetime.now()
+
     if date_range == 'day':
-        cutoff = datetime(now.year, now.month, now.day)
-    elif date_range == 'week':
-        cutoff = now - timedelta(days=7)
-    elif date_range == 'month':
-        cutoff = now - timedelta(days=30)
-    elif date_range == 'year':
-        cutoff = now - timedelta(days=365)
-    else:
-        return transactions
-    
-    # Handle both dict and model objects
-    filtered = []
-    for t in transactions:
-        if isinstance(t, dict):
-            # Already converted to dict
-            trans_date = datetime.strptime(t['date'], '%Y-%m-%d')
-        else:
-            # Model object
-            trans_date = datetime.combine(t.date, datetime.min.time())
-        
-        if trans_date >= cutoff:
-            filtered.append(t)
-    
-    return filtered
+        return now.date()
+
+    window = TRANSACTION_RANGE_WINDOWS.get(date_range)
+    if window is None:
+        return None
+
+    cutoff = now - window
+    # Transactions are dated at midnight, so a cutoff part-way through a day excludes that day
+    if cutoff.time() == datetime.min.time():
+        return cutoff.date()
+    return cutoff.date() + timedelta(days=1)
+
+
+def apply_transaction_range(query, args, date_column=Transaction.date):
+    """
+    Restrict a transaction (or rollup) query to the requested window so the filtering happens in SQL.
+    Supports the named ranges (day/week/month/year/all) plus inclusive `from`/`to` dates.
+    """
+    start_date = get_range_start_date(args.get('range', 'all'))
+
+    from_dt = parse_date_param(args.get('from'))
+    if from_dt:
+        start_date = max(start_date, from_dt.date()) if start_date else from_dt.date()
+
+    if start_date:
+        query = query.filter(date_column >= start_date)
+
+    to_dt = parse_date_param(args.get('to'), is_end=True)
+    if to_dt:
+        query = query.filter(date_column <= to_dt.date())
+
+    return query
+
+
+def apply_tag_filter(query, model, args):
+    """Keep only rows carrying every ?tag= value, using the normalized tag index"""
+    for name in normalize_tag_names(args.getlist('tag')):
+        query = query.filter(model.tag_objects.any(Tag.name == name))
+    return query
+
+
+def find_overdue_todos(query, now=None, limit=None):
+    """Return the open todos from `query` whose due date/time has passed (no time means end of day)"""
+    now = now or datetime.now()
+    today = now.date()
+
+    query = query.filter(
+        Todo.status != 'done',
+        # Implied by the OR below, but gives the partial index a range to seek on
+        Todo.due_date <= today,
+        or_(
+            Todo.due_date < today,
+            and_(Todo.due_date == today, Todo.due_time.isnot(None), Todo.due_time < now.time())
+        )
+    ).options(selectinload(Todo.calendar_events)).order_by(
+        Todo.due_date, Todo.due_time.asc().nulls_last(), Todo.id
+    )
+    if limit is not None:
+        query = query.limit(limit)
+
+    return query.all()
 
 
 def parse_duration_minutes(value):
@@ -163,10 +272,91 @@ def apply_duration_to_event(event_obj, duration_minutes):
         event_obj.end_date = anchor + timedelta(minutes=minutes)
 
 
+def parse_bool_param(value):
+    return str(value or '').strip().lower() in ('1', 'true', 'yes')
+
+
+def filter_events(query, args):
+    """Restrict an event query to the from/to window and tag filters, with linked todos batch-loaded"""
+    start_dt = parse_date_param(args.get('from'))
+    end_dt = parse_date_param(args.get('to'), is_end=True)
+
+    # Load every event's linked todos in one batched query instead of one per event
+    query = apply_tag_filter(query, Event, args).options(selectinload(Event.linked_todos))
+    window_clause = event_window_clause(db.engine.dialect.name, start_dt, end_dt)
+    if window_clause is not None:
+        query = query.filter(window_clause)
+    return query
+
+
+def expand_params_error(args):
+    """
+    Why an ?expand=true event list cannot be served, or None. Expanded occurrences are one
+    bounded window computed in Python, so they need from/to and are never paginated or streamed.
+    """
+    if not parse_bool_param(args.get('expand')):
+        return None
+    if not (args.get('from') and args.get('to')):
+        return 'Expanding recurring events requires from and to dates'
+    if pagination_requested(args):
+        return 'limit, after and stream are not supported with expand=true; narrow the from/to window instead'
+    return None
+
+
+def list_events(query, args):
+    """
+    Serialize the events of `query` that overlap the optional from/to window.
+    With expand=true (which needs both bounds), recurring series are returned as one entry per
+    occurrence in the window, including series that started before it. Occurrences keep the
+    series id, carry shifted startDate/endDate and add seriesId plus the series' own
+    seriesStartDate/seriesEndDate, which edits of an occurrence must send back to the series.
+    """
+    start_dt = parse_date_param(args.get('from'))
+    end_dt = parse_date_param(args.get('to'), is_end=True)
+
+    events = filter_events(query, args).order_by(Event.start_date).all()
+
+    if not parse_bool_param(args.get('expand')):
+        return [event.to_dict() for event in events]
+
+    # Series that began before the window can still have occurrences inside it
+    series_query = apply_tag_filter(query, Event, args).options(selectinload(Event.linked_todos))
+    seen_ids = {event.id for event in events}
+    events += [
+        event for event in series_query.filter(
+            Event.recurring.is_(True),
+            Event.recurrence_type.in_(RECURRENCE_TYPES),
+            Event.start_date < start_dt,
+            or_(Event.recurrence_end_date.is_(None), Event.recurrence_end_date >= start_dt.date())
+        ).all()
+        if event.id not in seen_ids
+    ]
+
+    occurrences = []
+    for event in events:
+        event_dict = event.to_dict()
+        if not is_recurring_series(event):
+            occurrences.append((event.start_date, event_dict))
+            continue
+        for start, end in expand_event(event, start_dt, end_dt):
+            occurrences.append((start, {
+                **event_dict,
+                'startDate': start.isoformat(),
+                'endDate': end.isoformat() if event.end_date else None,
+                'seriesId': event.id,
+                'seriesStartDate': event_dict['startDate'],
+                'seriesEndDate': event_dict['endDate']
+            }))
+
+    occurrences.sort(key=lambda occurrence: occurrence[0])
+    return [event_dict for _, event_dict in occurrences]
+
+
 def parse_date_param(value, is_end=False):
     """
     Normalize incoming date query params so dates without an explicit time component
     cover the full day (e.g. 2024-01-01 should include all events on Jan 1st).
+    Values with a UTC offset ('Z', '+02:00') become naive UTC, like the stored datetimes.
     """
     if not value:
         return None
@@ -185,6 +375,9 @@ def parse_date_param(value, is_end=False):
         else:
             raise
 
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
     if not has_time_component and is_end:
         parsed = parsed + timedelta(days=1) - timedelta(microseconds=1)
 
@@ -195,7 +388,7 @@ def parse_date_param(value, is_end=False):
 # HEALTH CHECK
 # ============================================================================
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     try:
         # Test database connection
@@ -213,11 +406,19 @@ def health_check():
         }), 500
 
 
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Per-endpoint latency, status and SQL counters plus pool gauges of this worker, in Prometheus text format"""
+    body = current_app.extensions['metrics'].render(app_engines(current_app))
+    return Response(body, content_type=METRICS_CONTENT_TYPE)
+
+
 # ============================================================================
 # CONTEXT ENDPOINTS
 # ============================================================================
 
-@app.route('/api/contexts', methods=['GET'])
+@api.route('/api/contexts', methods=['GET'])
+@conditional_get
 def get_contexts():
     try:
         contexts = Context.query.order_by(Context.created_at).all()
@@ -233,7 +434,7 @@ def get_contexts():
         }), 500
 
 
-@app.route('/api/contexts', methods=['POST'])
+@api.route('/api/contexts', methods=['POST'])
 def create_context():
     try:
         data = request.get_json() or {}
@@ -275,7 +476,7 @@ def create_context():
         }), 500
 
 
-@app.route('/api/contexts/<int:context_id>', methods=['PUT'])
+@api.route('/api/contexts/<int:context_id>', methods=['PUT'])
 def update_context(context_id):
     try:
         context = Context.query.get(context_id)
@@ -315,7 +516,7 @@ def update_context(context_id):
         }), 500
 
 
-@app.route('/api/contexts/<int:context_id>', methods=['DELETE'])
+@api.route('/api/contexts/<int:context_id>', methods=['DELETE'])
 def delete_context(context_id):
     try:
         context = Context.query.get(context_id)
@@ -326,6 +527,9 @@ def delete_context(context_id):
                 'message': 'Context not found'
             }), 404
         
+        # Items, links and rollups go with it through ON DELETE CASCADE without being
+        # loaded, so report every item list of the context as changed
+        record_changes(db.session, {(kind, context.id) for kind in CHANGE_KINDS.values()})
         db.session.delete(context)
         db.session.commit()
         
@@ -342,7 +546,8 @@ def delete_context(context_id):
         }), 500
 
 
-@app.route('/api/contexts/<int:context_id>/overview', methods=['GET'])
+@api.route('/api/contexts/<int:context_id>/overview', methods=['GET'])
+@cached_response('transaction', 'todo', 'idea', 'event', 'context')
 def get_context_overview(context_id):
     try:
         context = Context.query.get(context_id)
@@ -353,22 +558,44 @@ def get_context_overview(context_id):
                 'message': 'Context not found'
             }), 404
         
-        # Get transactions
-        transactions = Transaction.query.filter_by(context_id=context_id).all()
-        transaction_dicts = [t.to_dict() for t in transactions]
-        
-        # Calculate stats
-        total_income = sum(t.amount for t in transactions if t.type == 'income')
-        total_expenses = sum(t.amount for t in transactions if t.type == 'expense')
+        # Totals come from the daily rollups, counts from COUNT queries: nothing is loaded row by row
+        rollup = TransactionDailyRollup
+        totals = {
+            transaction_type: (amount or 0, count or 0)
+            for transaction_type, amount, count in (
+                db.session.query(rollup.type, db.func.sum(rollup.total_amount), db.func.sum(rollup.transaction_count))
+                .filter(rollup.context_id == context_id)
+                .group_by(rollup.type)
+                .all()
+            )
+        }
+        total_income = totals.get('income', (0, 0))[0]
+        total_expenses = totals.get('expense', (0, 0))[0]
         balance = total_income - total_expenses
+        transaction_count = sum(count for _, count in totals.values())
         
-        # Get todos
-        todos = Todo.query.filter_by(context_id=context_id).all()
-        # Get notes
-        notes_count = Idea.query.filter_by(context_id=context_id).count()
+        todo_counts = dict.fromkeys(TODO_STATUSES, 0)
+        for status, count in (
+            db.session.query(Todo.status, db.func.count(Todo.id))
+            .filter(Todo.context_id == context_id)
+            .group_by(Todo.status)
+            .all()
+        ):
+            todo_counts[status or 'todo'] = todo_counts.get(status or 'todo', 0) + count
         
-        # Get recent transactions (last 5)
-        recent_transactions = sorted(transaction_dicts, key=lambda x: x['date'], reverse=True)[:5]
+        notes_count = Idea.query.filter_by(context_id=context_id).count()
+        event_count = Event.query.filter_by(context_id=context_id).count()
+        
+        # Latest 5 by date; same-day ties keep insertion order like the old stable sort
+        recent_transactions = [
+            t.to_dict() for t in (
+                Transaction.query
+                .filter_by(context_id=context_id)
+                .order_by(Transaction.date.desc(), Transaction.id)
+                .limit(5)
+                .all()
+            )
+        ]
         
         return jsonify({
             'success': True,
@@ -378,10 +605,11 @@ def get_context_overview(context_id):
                     'total_income': round(total_income, 2),
                     'total_expenses': round(total_expenses, 2),
                     'balance': round(balance, 2),
-                    'transaction_count': len(transactions),
-                    'todo_count': len(todos),
+                    'transaction_count': transaction_count,
+                    'todo_count': sum(todo_counts.values()),
+                    'todo_counts': todo_counts,
                     'idea_count': notes_count,
-                    'event_count': 0,  # TODO: Implement when events are added
+                    'event_count': event_count,
                     'time_minutes': context.total_time_minutes or 0
                 },
                 'recent_transactions': recent_transactions
@@ -395,7 +623,8 @@ def get_context_overview(context_id):
         }), 500
 
 
-@app.route('/api/contexts/<int:context_id>/notes', methods=['GET'])
+@api.route('/api/contexts/<int:context_id>/notes', methods=['GET'])
+@conditional_get
 def get_context_notes(context_id):
     try:
         context = Context.query.get(context_id)
@@ -405,12 +634,8 @@ def get_context_notes(context_id):
                 'message': 'Field not found'
             }), 404
 
-        notes = Idea.query.filter_by(context_id=context_id).order_by(Idea.created_at.desc()).all()
-        return jsonify({
-            'success': True,
-            'data': [note.to_dict() for note in notes],
-            'count': len(notes)
-        }), 200
+        query = apply_tag_filter(Idea.query.filter_by(context_id=context_id), Idea, request.args)
+        return list_response(query, Idea, Idea.created_at, Idea.to_dict, request.args, descending=True)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -418,7 +643,7 @@ def get_context_notes(context_id):
         }), 500
 
 
-@app.route('/api/contexts/<int:context_id>/notes', methods=['POST'])
+@api.route('/api/contexts/<int:context_id>/notes', methods=['POST'])
 def add_context_note(context_id):
     try:
         context = Context.query.get(context_id)
@@ -468,7 +693,7 @@ def add_context_note(context_id):
         }), 500
 
 
-@app.route('/api/notes/<int:note_id>', methods=['DELETE'])
+@api.route('/api/notes/<int:note_id>', methods=['DELETE'])
 def delete_note(note_id):
     try:
         note = Idea.query.get(note_id)
@@ -492,7 +717,7 @@ def delete_note(note_id):
         }), 500
 
 
-@app.route('/api/notes/<int:note_id>', methods=['PUT'])
+@api.route('/api/notes/<int:note_id>', methods=['PUT'])
 def update_note(note_id):
     try:
         note = Idea.query.get(note_id)
@@ -534,10 +759,9 @@ def update_note(note_id):
 # TRANSACTION ENDPOINTS
 # ============================================================================
 
-@app.route('/api/transactions', methods=['GET'])
+@api.route('/api/transactions', methods=['GET'])
 def get_transactions():
     try:
-        date_range = request.args.get('range', 'all')
         context_id = request.args.get('contextId', None)
         
         query = Transaction.query
@@ -545,17 +769,10 @@ def get_transactions():
         if context_id:
             query = query.filter_by(context_id=int(context_id))
         
-        transactions = query.order_by(Transaction.date.desc()).all()
-        transaction_dicts = [t.to_dict() for t in transactions]
+        query = apply_transaction_range(query, request.args)
+        query = apply_tag_filter(query, Transaction, request.args)
         
-        # Filter by date range
-        filtered = filter_transactions_by_range(transaction_dicts, date_range)
-        
-        return jsonify({
-            'success': True,
-            'data': filtered,
-            'count': len(filtered)
-        }), 200
+        return list_response(query, Transaction, Transaction.date, Transaction.to_dict, request.args, descending=True)
         
     except Exception as e:
         return jsonify({
@@ -564,21 +781,18 @@ def get_transactions():
         }), 500
 
 
-@app.route('/api/contexts/<int:context_id>/transactions', methods=['GET'])
+@api.route('/api/contexts/<int:context_id>/transactions', methods=['GET'])
+@conditional_get
 def get_context_transactions(context_id):
     try:
-        date_range = request.args.get('range', 'all')
-        
-        transactions = Transaction.query.filter_by(context_id=context_id).order_by(Transaction.date.desc()).all()
-        transaction_dicts = [t.to_dict() for t in transactions]
-        
-        # Filter by date range
-        filtered = filter_transactions_by_range(transaction_dicts, date_range)
+        query = apply_transaction_range(Transaction.query.filter_by(context_id=context_id), request.args)
+        query = apply_tag_filter(query, Transaction, request.args)
+        transactions = query.order_by(Transaction.date.desc()).all()
         
         return jsonify({
             'success': True,
-            'data': filtered,
-            'count': len(filtered)
+            'data': [t.to_dict() for t in transactions],
+            'count': len(transactions)
         }), 200
         
     except Exception as e:
@@ -588,7 +802,7 @@ def get_context_transactions(context_id):
         }), 500
 
 
-@app.route('/api/transactions', methods=['POST'])
+@api.route('/api/transactions', methods=['POST'])
 def add_transaction():
     try:
         data = request.get_json()
@@ -637,7 +851,44 @@ def add_transaction():
         }), 500
 
 
-@app.route('/api/transactions/<int:transaction_id>', methods=['PUT'])
+@api.route('/api/transactions/import', methods=['POST'])
+def import_transactions_file():
+    """
+    Bulk-import a CSV or OFX statement, sent as the raw request body or as a multipart `file`.
+    ?format=csv|ofx (default: the file extension, else csv), ?contextId= for rows without one.
+    """
+    try:
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        extension = os.path.splitext(upload.filename or '')[1].lstrip('.') if upload else ''
+        import_format = (request.args.get('format') or extension or 'csv').lower()
+        
+        # Parsed incrementally: the file is never held in memory as a whole
+        text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+        report = import_transactions(iter_records(import_format, text_stream), request.args.get('contextId'))
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'data': report,
+            'message': f"Imported {report['imported']} transactions"
+        }), 200
+        
+    except ImportFileError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Error importing transactions: {str(e)}'
+        }), 500
+
+
+@api.route('/api/transactions/<int:transaction_id>', methods=['PUT'])
 def update_transaction(transaction_id):
     try:
         transaction = Transaction.query.get(transaction_id)
@@ -681,7 +932,7 @@ def update_transaction(transaction_id):
         }), 500
 
 
-@app.route('/api/transactions/<int:transaction_id>', methods=['DELETE'])
+@api.route('/api/transactions/<int:transaction_id>', methods=['DELETE'])
 def delete_transaction(transaction_id):
     try:
         transaction = Transaction.query.get(transaction_id)
@@ -713,28 +964,23 @@ def delete_transaction(transaction_id):
 # EVENT ENDPOINTS
 # ============================================================================
 
-@app.route('/api/contexts/<int:context_id>/events', methods=['GET'])
+@api.route('/api/contexts/<int:context_id>/events', methods=['GET'])
+@conditional_get
 def get_context_events(context_id):
     try:
-        from_date = request.args.get('from')  # Optional date filter
-        to_date = request.args.get('to')  # Optional date filter
+        error = expand_params_error(request.args)
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
         
         query = Event.query.filter_by(context_id=context_id)
+        if not parse_bool_param(request.args.get('expand')):
+            return list_response(filter_events(query, request.args), Event, Event.start_date, Event.to_dict, request.args)
         
-        # Filter by date range if provided
-        start_dt = parse_date_param(from_date)
-        end_dt = parse_date_param(to_date, is_end=True)
-
-        if start_dt:
-            query = query.filter(Event.start_date >= start_dt)
-        if end_dt:
-            query = query.filter(Event.start_date <= end_dt)
-        
-        events = query.order_by(Event.start_date).all()
+        events = list_events(query, request.args)
         
         return jsonify({
             'success': True,
-            'data': [event.to_dict() for event in events],
+            'data': events,
             'count': len(events)
         }), 200
         
@@ -745,31 +991,28 @@ def get_context_events(context_id):
         }), 500
 
 
-@app.route('/api/events', methods=['GET'])
+@api.route('/api/events', methods=['GET'])
 def get_all_events():
     try:
-        from_date = request.args.get('from')
-        to_date = request.args.get('to')
         context_id = request.args.get('contextId')
         
+        error = expand_params_error(request.args)
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
+        
         query = Event.query
         
         if context_id:
             query = query.filter_by(context_id=int(context_id))
-
-        start_dt = parse_date_param(from_date)
-        end_dt = parse_date_param(to_date, is_end=True)
-
-        if start_dt:
-            query = query.filter(Event.start_date >= start_dt)
-        if end_dt:
-            query = query.filter(Event.start_date <= end_dt)
         
-        events = query.order_by(Event.start_date).all()
+        if not parse_bool_param(request.args.get('expand')):
+            return list_response(filter_events(query, request.args), Event, Event.start_date, Event.to_dict, request.args)
+        
+        events = list_events(query, request.args)
         
         return jsonify({
             'success': True,
-            'data': [event.to_dict() for event in events],
+            'data': events,
             'count': len(events)
         }), 200
         
@@ -780,7 +1023,7 @@ def get_all_events():
         }), 500
 
 
-@app.route('/api/events', methods=['POST'])
+@api.route('/api/events', methods=['POST'])
 def create_event():
     try:
         data = request.get_json()
@@ -851,7 +1094,7 @@ def create_event():
         }), 500
 
 
-@app.route('/api/events/<int:event_id>', methods=['GET'])
+@api.route('/api/events/<int:event_id>', methods=['GET'])
 def get_event(event_id):
     try:
         event = Event.query.get(event_id)
@@ -873,7 +1116,7 @@ def get_event(event_id):
         }), 500
 
 
-@app.route('/api/events/<int:event_id>', methods=['PUT'])
+@api.route('/api/events/<int:event_id>', methods=['PUT'])
 def update_event(event_id):
     try:
         event = Event.query.get(event_id)
@@ -967,7 +1210,7 @@ def update_event(event_id):
         }), 500
 
 
-@app.route('/api/events/<int:event_id>', methods=['DELETE'])
+@api.route('/api/events/<int:event_id>', methods=['DELETE'])
 def delete_event(event_id):
     try:
         event = Event.query.get(event_id)
@@ -1007,16 +1250,15 @@ def delete_event(event_id):
 # TODOS ENDPOINTS
 # ============================================================================
 
-@app.route('/api/contexts/<int:context_id>/todos', methods=['GET'])
+@api.route('/api/contexts/<int:context_id>/todos', methods=['GET'])
+@conditional_get
 def get_context_todos(context_id):
     try:
-        todos = Todo.query.filter_by(context_id=context_id).order_by(Todo.created_at.desc()).all()
+        query = apply_tag_filter(Todo.query.filter_by(context_id=context_id), Todo, request.args)
+        # Load every todo's calendar events in one batched query instead of one per todo
+        query = query.options(selectinload(Todo.calendar_events))
         
-        return jsonify({
-            'success': True,
-            'data': [todo.to_dict() for todo in todos],
-            'count': len(todos)
-        }), 200
+        return list_response(query, Todo, Todo.created_at, Todo.to_dict, request.args, descending=True)
         
     except Exception as e:
         return jsonify({
@@ -1025,7 +1267,7 @@ def get_context_todos(context_id):
         }), 500
 
 
-@app.route('/api/todos', methods=['POST'])
+@api.route('/api/todos', methods=['POST'])
 def add_todo():
     try:
         data = request.get_json()
@@ -1097,7 +1339,7 @@ def add_todo():
         }), 500
 
 
-@app.route('/api/todos/<int:todo_id>', methods=['PUT'])
+@api.route('/api/todos/<int:todo_id>', methods=['PUT'])
 def update_todo(todo_id):
     try:
         todo = Todo.query.get(todo_id)
@@ -1217,7 +1459,7 @@ def update_todo(todo_id):
         }), 500
 
 
-@app.route('/api/todos/<int:todo_id>/add-to-calendar', methods=['POST'])
+@api.route('/api/todos/<int:todo_id>/add-to-calendar', methods=['POST'])
 def add_todo_to_calendar(todo_id):
     try:
         todo = Todo.query.get(todo_id)
@@ -1325,7 +1567,7 @@ def add_todo_to_calendar(todo_id):
         }), 500
 
 
-@app.route('/api/todos/<int:todo_id>/events/<int:event_id>/unlink', methods=['DELETE'])
+@api.route('/api/todos/<int:todo_id>/events/<int:event_id>/unlink', methods=['DELETE'])
 def unlink_todo_from_event(todo_id, event_id):
     try:
         todo = Todo.query.get(todo_id)
@@ -1368,36 +1610,22 @@ def unlink_todo_from_event(todo_id, event_id):
         }), 500
 
 
-@app.route('/api/todos/overdue', methods=['GET'])
+@api.route('/api/todos/overdue', methods=['GET'])
 def get_overdue_todos():
     try:
         context_id = request.args.get('contextId')
+        try:
+            limit = parse_limit(request.args.get('limit'), maximum=MAX_OVERDUE_LIMIT)
+        except InvalidPageParams as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         
-        # Get current date and time
-        now = datetime.now()
-        
-        query = Todo.query.filter(
-            Todo.status != 'done',
-            Todo.due_date.isnot(None)
-        )
+        query = Todo.query
         
         if context_id:
             query = query.filter_by(context_id=int(context_id))
         
-        todos = query.all()
-        
-        # Filter overdue todos
-        overdue_todos = []
-        for todo in todos:
-            if todo.due_time:
-                # Has specific time - check datetime
-                due_datetime = datetime.combine(todo.due_date, todo.due_time)
-                if due_datetime < now:
-                    overdue_todos.append(todo)
-            else:
-                # No time - check if date is in past
-                if todo.due_date < now.date():
-                    overdue_todos.append(todo)
+        query = apply_tag_filter(query, Todo, request.args)
+        overdue_todos = find_overdue_todos(query, limit=limit)
         
         return jsonify({
             'success': True,
@@ -1412,7 +1640,7 @@ def get_overdue_todos():
         }), 500
 
 
-@app.route('/api/todos/<int:todo_id>', methods=['DELETE'])
+@api.route('/api/todos/<int:todo_id>', methods=['DELETE'])
 def delete_todo(todo_id):
     try:
         todo = Todo.query.get(todo_id)
@@ -1449,29 +1677,90 @@ def delete_todo(todo_id):
         }), 500
 
 
+# ============================================================================
+# HOME ENDPOINT
+# ============================================================================
+
+@api.route('/api/home', methods=['GET'])
+def get_home():
+    """Everything the home page shows, in one response built from a fixed number of queries"""
+    try:
+        limits = {}
+        for param, default in HOME_LIMIT_DEFAULTS:
+            try:
+                limits[param] = parse_limit(request.args.get(param), maximum=MAX_HOME_LIMIT) or default
+            except InvalidPageParams as e:
+                return jsonify({'success': False, 'message': f'{param}: {e}'}), 400
+        now = datetime.now()
+        week_end = datetime.combine(now.date() + timedelta(days=7), datetime.max.time())
+        
+        contexts = Context.query.order_by(Context.created_at).all()
+        
+        recent_notes = Idea.query.order_by(Idea.created_at.desc(), Idea.id.desc()).limit(limits['notesLimit']).all()
+        
+        open_todo_query = Todo.query.filter(Todo.status != 'done')
+        open_todo_count = open_todo_query.count()
+        # Soonest due first, undated todos last
+        open_todos = (
+            open_todo_query
+            .options(selectinload(Todo.calendar_events))
+            .order_by(Todo.due_date.is_(None), Todo.due_date, Todo.due_time, Todo.id)
+            .limit(limits['todosLimit'])
+            .all()
+        )
+        
+        overdue_todos = find_overdue_todos(Todo.query, now)
+        
+        # Events overlapping the coming week, so one already in progress is listed too
+        upcoming_events = (
+            Event.query
+            .filter(event_window_clause(db.engine.dialect.name, now, week_end))
+            .options(selectinload(Event.linked_todos))
+            .order_by(Event.start_date, Event.id)
+            .limit(limits['eventsLimit'])
+            .all()
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'contexts': [context.to_dict() for context in contexts],
+                'recent_notes': [note.to_dict() for note in recent_notes],
+                'open_todos': [todo.to_dict() for todo in open_todos],
+                'open_todo_count': open_todo_count,
+                'overdue_todos': [todo.to_dict() for todo in overdue_todos],
+                'upcoming_events': [event.to_dict() for event in upcoming_events]
+            }
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error fetching home data: {str(e)}'
+        }), 500
+
+
 # ============================================================================
 # STATS ENDPOINTS
 # ============================================================================
 
-@app.route('/api/stats/summary', methods=['GET'])
+@api.route('/api/stats/summary', methods=['GET'])
+@cached_response('transaction')
 def get_summary_stats():
     try:
-        date_range = request.args.get('range', 'all')
         context_id = request.args.get('contextId', None)
         
-        query = Transaction.query
+        rollup = TransactionDailyRollup
+        query = db.session.query(rollup.type, db.func.sum(rollup.total_amount))
         
         if context_id:
-            query = query.filter_by(context_id=int(context_id))
-        
-        transactions = query.all()
-        transaction_dicts = [t.to_dict() for t in transactions]
+            query = query.filter(rollup.context_id == int(context_id))
         
-        # Filter by date range
-        filtered = filter_transactions_by_range(transaction_dicts, date_range)
+        query = apply_transaction_range(query, request.args, date_column=rollup.date)
+        totals = dict(query.group_by(rollup.type).all())
         
-        total_income = sum(t['amount'] for t in filtered if t['type'] == 'income')
-        total_expenses = sum(t['amount'] for t in filtered if t['type'] == 'expense')
+        total_income = totals.get('income') or 0
+        total_expenses = totals.get('expense') or 0
         balance = total_income - total_expenses
         
         return jsonify({
@@ -1490,29 +1779,25 @@ def get_summary_stats():
         }), 500
 
 
-@app.route('/api/stats/by-context', methods=['GET'])
+@api.route('/api/stats/by-context', methods=['GET'])
+@cached_response('transaction', 'context')
 def get_stats_by_context():
     try:
-        date_range = request.args.get('range', 'all')
-        
-        contexts = Context.query.all()
-        transactions = Transaction.query.filter_by(type='expense').all()
-        transaction_dicts = [t.to_dict() for t in transactions]
-        
-        # Filter by date range
-        filtered = filter_transactions_by_range(transaction_dicts, date_range)
-        
-        # Group by context
-        context_totals = {}
-        context_map = {c.id: c.name for c in contexts}
+        rollup = TransactionDailyRollup
+        query = (
+            db.session.query(Context.name, db.func.sum(rollup.total_amount))
+            .select_from(rollup)
+            .outerjoin(Context, Context.id == rollup.context_id)
+            .filter(rollup.type == 'expense')
+        )
         
-        for t in filtered:
-            context_name = context_map.get(t['contextId'], 'Unknown')
-            context_totals[context_name] = context_totals.get(context_name, 0) + t['amount']
+        # Contexts sharing a name are reported together
+        query = apply_transaction_range(query, request.args, date_column=rollup.date)
+        rows = query.group_by(Context.name).all()
         
         context_data = [
-            {'name': context, 'value': round(amount, 2)}
-            for context, amount in context_totals.items()
+            {'name': name or 'Unknown', 'value': round(amount, 2)}
+            for name, amount in rows
         ]
         
         context_data.sort(key=lambda x: x['value'], reverse=True)
@@ -1529,38 +1814,38 @@ def get_stats_by_context():
         }), 500
 
 
-@app.route('/api/stats/by-tag', methods=['GET'])
+@api.route('/api/stats/by-tag', methods=['GET'])
+@cached_response('transaction')
 def get_stats_by_tag():
     try:
-        date_range = request.args.get('range', 'all')
         context_id = request.args.get('contextId', None)
         
-        query = Transaction.query.filter_by(type='expense')
+        tag_rollup = TransactionTagDailyRollup
+        daily_rollup = TransactionDailyRollup
+        tagged_query = (
+            db.session.query(Tag.name, db.func.sum(tag_rollup.total_amount))
+            .select_from(tag_rollup)
+            .join(Tag, Tag.id == tag_rollup.tag_id)
+            .filter(tag_rollup.type == 'expense')
+        )
+        untagged_query = (
+            db.session.query(db.func.sum(daily_rollup.untagged_amount))
+            .filter(daily_rollup.type == 'expense')
+        )
         
         if context_id:
-            query = query.filter_by(context_id=int(context_id))
-        
-        transactions = query.all()
-        transaction_dicts = [t.to_dict() for t in transactions]
-        
-        # Filter by date range
-        filtered = filter_transactions_by_range(transaction_dicts, date_range)
+            tagged_query = tagged_query.filter(tag_rollup.context_id == int(context_id))
+            untagged_query = untagged_query.filter(daily_rollup.context_id == int(context_id))
         
-        # Group by tag
-        tag_totals = {}
-        untagged_total = 0
-        
-        for t in filtered:
-            tags = t.get('tags', [])
-            if not tags or len(tags) == 0:
-                untagged_total += t['amount']
-            else:
-                for tag in tags:
-                    tag_totals[tag] = tag_totals.get(tag, 0) + t['amount']
+        # A transaction counts towards each of its tags
+        tagged_query = apply_transaction_range(tagged_query, request.args, date_column=tag_rollup.date)
+        untagged_query = apply_transaction_range(untagged_query, request.args, date_column=daily_rollup.date)
+        tag_rows = tagged_query.group_by(Tag.name).all()
+        untagged_total = untagged_query.scalar() or 0
         
         tag_data = [
             {'name': tag, 'value': round(amount, 2)}
-            for tag, amount in tag_totals.items()
+            for tag, amount in tag_rows
         ]
         
         if untagged_total > 0:
@@ -1580,36 +1865,37 @@ def get_stats_by_tag():
         }), 500
 
 
-@app.route('/api/stats/daily', methods=['GET'])
+@api.route('/api/stats/daily', methods=['GET'])
+@cached_response('transaction')
 def get_daily_stats():
     try:
-        date_range = request.args.get('range', 'all')
         context_id = request.args.get('contextId', None)
         
-        query = Transaction.query
+        rollup = TransactionDailyRollup
+        query = db.session.query(rollup.date, rollup.type, db.func.sum(rollup.total_amount))
         
         if context_id:
-            query = query.filter_by(context_id=int(context_id))
-        
-        transactions = query.all()
-        transaction_dicts = [t.to_dict() for t in transactions]
+            query = query.filter(rollup.context_id == int(context_id))
         
-        # Filter by date range
-        filtered = filter_transactions_by_range(transaction_dicts, date_range)
+        rows = (
+            apply_transaction_range(query, request.args, date_column=rollup.date)
+            .group_by(rollup.date, rollup.type)
+            .order_by(rollup.date)
+            .all()
+        )
         
-        # Group by date
+        # Buckets are labelled by month and day, so the same day in different years shares a point
         daily_totals = {}
-        for t in filtered:
-            date_obj = datetime.strptime(t['date'], '%Y-%m-%d')
-            date_key = date_obj.strftime('%b %d')
+        for day, transaction_type, amount in rows:
+            date_key = day.strftime('%b %d')
             
             if date_key not in daily_totals:
                 daily_totals[date_key] = {'date': date_key, 'expenses': 0, 'income': 0}
             
-            if t['type'] == 'expense':
-                daily_totals[date_key]['expenses'] += t['amount']
+            if transaction_type == 'expense':
+                daily_totals[date_key]['expenses'] += amount
             else:
-                daily_totals[date_key]['income'] += t['amount']
+                daily_totals[date_key]['income'] += amount
         
         daily_data = list(daily_totals.values())
         
@@ -1625,5 +1911,45 @@ def get_daily_stats():
         }), 500
 
 
+@api.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss counters of the stats and overview response cache"""
+    return jsonify({
+        'success': True,
+        'data': get_response_cache().stats()
+    }), 200
+
+
+@api.route('/api/replicas/stats', methods=['GET'])
+def get_replica_stats():
+    """Routing counters and lag of the read replicas (null when none are configured)"""
+    replicas = current_app.extensions.get('read_replicas')
+    return jsonify({
+        'success': True,
+        'data': replicas.stats() if replicas else None
+    }), 200
+
+
+# ============================================================================
+# BACKUP
+# ============================================================================
+
+@api.route('/api/export', methods=['GET'])
+def export_data():
+    """
+    Stream every context and item as NDJSON from one consistent snapshot (?gzip=true to compress).
+    Restore the file with restore_data.py.
+    """
+    compress = parse_bool_param(request.args.get('gzip'))
+    filename = f"second-brain-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.ndjson" + ('.gz' if compress else '')
+    return Response(
+        stream_with_context(iter_export(db.engine, compress)),
+        mimetype='application/gzip' if compress else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
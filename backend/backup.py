@@ -0,0 +1,247 @@
+"""
+Full-data export and restore as NDJSON.
+
+An export is one JSON object per line: a header, one {"table", "row"} line
+per row, and a footer with the row count per table. Tables are written in
+dependency order (parents before children). All of them are read from one
+snapshot: a REPEATABLE READ, read-only transaction on PostgreSQL, or one
+read transaction on SQLite. Rows are fetched through server-side cursors,
+so memory stays flat however large the database is.
+
+A restore loads the lines in file order with batched multi-row inserts.
+Ids are preserved, and PostgreSQL sequences are moved past them. The
+rollups are rebuilt from the restored transactions, and the change
+versions of every touched context are bumped, so cached responses and
+ETags from before the restore are not served. A file without its footer
+(a truncated download) is rejected, and nothing is written.
+
+Derived tables (rollups, change versions) are not exported.
+"""
+
+import json
+import zlib
+from datetime import date, datetime, time
+
+from changes import CHANGE_KINDS, CONTEXT_LIST_SCOPE, record_changes
+from models import (
+    db, Context, Event, Idea, Tag, Todo, Transaction, TransactionDailyRollup, TransactionTagDailyRollup,
+    event_tags, idea_tags, todo_event_links, todo_tags, transaction_tags
+)
+from rollups import rebuild_rollups
+
+BACKUP_FORMAT = 'second-brain-ndjson'
+BACKUP_VERSION = 1
+EXPORT_BATCH_SIZE = 1000
+RESTORE_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Dependency order: every table comes after the tables its foreign keys point to
+BACKUP_TABLES = [
+    Context.__table__,
+    Tag.__table__,
+    Transaction.__table__,
+    transaction_tags,
+    Todo.__table__,
+    todo_tags,
+    Idea.__table__,
+    idea_tags,
+    Event.__table__,
+    event_tags,
+    todo_event_links,
+]
+TABLES_BY_NAME = {table.name: table for table in BACKUP_TABLES}
+
+
+class RestoreError(ValueError):
+    """The backup file cannot be restored"""
+
+
+def encode_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def column_decoders(table):
+    """Parsers for the columns whose values are stored as ISO strings"""
+    decoders = {}
+    for column in table.columns:
+        try:
+            python_type = column.type.python_type
+        except NotImplementedError:
+            continue
+        if python_type in (datetime, date, time):
+            decoders[column.name] = python_type.fromisoformat
+    return decoders
+
+
+# ----------------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------------
+
+def snapshot_connection(engine):
+    """A connection whose statements all read the same snapshot"""
+    connection = engine.connect()
+    if engine.dialect.name == 'postgresql':
+        connection = connection.execution_options(isolation_level='REPEATABLE READ', postgresql_readonly=True)
+        connection.begin()
+    else:
+        connection.begin()
+        if engine.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+            # pysqlite does not open a transaction for SELECTs by itself
+            connection.exec_driver_sql('BEGIN')
+    return connection
+
+
+def export_lines(connection):
+    """Yield the NDJSON lines of a full export read through `connection`"""
+    yield json.dumps({
+        'format': BACKUP_FORMAT,
+        'version': BACKUP_VERSION,
+        'exportedAt': datetime.utcnow().isoformat(),
+        'tables': [table.name for table in BACKUP_TABLES],
+    }) + '\n'
+
+    counts = {}
+    streaming = connection.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+    for table in BACKUP_TABLES:
+        names = [column.name for column in table.columns]
+        result = streaming.execute(db.select(table).order_by(*table.primary_key.columns))
+        count = 0
+        for row in result:
+            yield json.dumps({
+                'table': table.name,
+                'row': {name: encode_value(value) for name, value in zip(names, row)},
+            }) + '\n'
+            count += 1
+        counts[table.name] = count
+
+    yield json.dumps({'end': True, 'counts': counts}) + '\n'
+
+
+def iter_export(engine, compress=False):
+    """Yield the export as byte chunks of about EXPORT_CHUNK_SIZE, gzip-compressed if `compress`"""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    connection = snapshot_connection(engine)
+    try:
+        buffer = []
+        size = 0
+        for line in export_lines(connection):
+            buffer.append(line)
+            size += len(line)
+            if size >= EXPORT_CHUNK_SIZE:
+                data = ''.join(buffer).encode()
+                yield compressor.compress(data) if compressor else data
+                buffer, size = [], 0
+        data = ''.join(buffer).encode()
+        if compressor:
+            yield compressor.compress(data) + compressor.flush()
+        elif data:
+            yield data
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+# ----------------------------------------------------------------------------
+# Restore
+# ----------------------------------------------------------------------------
+
+def existing_context_ids(session):
+    return {context_id for (context_id,) in session.execute(db.select(Context.id))}
+
+
+def clear_tables(session):
+    for table in [TransactionTagDailyRollup.__table__, TransactionDailyRollup.__table__] + BACKUP_TABLES[::-1]:
+        session.execute(table.delete())
+
+
+def reset_sequences(session):
+    """Move PostgreSQL id sequences past the restored ids"""
+    if session.get_bind().dialect.name != 'postgresql':
+        return
+    for table in BACKUP_TABLES:
+        if 'id' in table.c and table.c.id.autoincrement is not False and table.c.id.primary_key:
+            session.execute(db.text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE(MAX(id), 0) + 1, false) FROM {table.name}"
+            ))
+
+
+def restore_backup(lines, replace=False, batch_size=RESTORE_BATCH_SIZE):
+    """
+    Load an export into the current session (the caller commits).
+    The target must be empty unless `replace`, which deletes the current data first.
+    Returns the number of rows restored per table.
+    """
+    session = db.session
+    previous_context_ids = existing_context_ids(session)
+    if previous_context_ids or session.execute(db.select(Tag.id).limit(1)).first():
+        if not replace:
+            raise RestoreError('The database is not empty (restore with replace to overwrite it)')
+        clear_tables(session)
+
+    lines = iter(lines)
+    try:
+        header = json.loads(next(lines))
+    except (StopIteration, ValueError):
+        raise RestoreError('The backup file is empty or not NDJSON')
+    if header.get('format') != BACKUP_FORMAT or header.get('version') != BACKUP_VERSION:
+        raise RestoreError(f"Unsupported backup format: {header.get('format')!r} version {header.get('version')!r}")
+
+    counts = {}
+    footer = None
+    table = None
+    decoders = {}
+    batch = []
+
+    def flush_batch():
+        if batch:
+            session.execute(table.insert(), batch)
+            batch.clear()
+
+    for line_number, line in enumerate(lines, start=2):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise RestoreError(f'Line {line_number} is not valid JSON')
+        if record.get('end'):
+            footer = record
+            break
+
+        name = record.get('table')
+        if table is None or name != table.name:
+            if name not in TABLES_BY_NAME:
+                raise RestoreError(f'Line {line_number}: unknown table {name!r}')
+            flush_batch()
+            table = TABLES_BY_NAME[name]
+            decoders = column_decoders(table)
+
+        row = record['row']
+        for column_name, parse in decoders.items():
+            if row.get(column_name) is not None:
+                row[column_name] = parse(row[column_name])
+        batch.append(row)
+        counts[name] = counts.get(name, 0) + 1
+        if len(batch) >= batch_size:
+            flush_batch()
+    flush_batch()
+
+    if footer is None:
+        raise RestoreError('The backup file is truncated (no end marker)')
+    expected = {name: count for name, count in footer.get('counts', {}).items() if count}
+    if expected != counts:
+        raise RestoreError(f'Row counts do not match the end marker: expected {expected}, restored {counts}')
+
+    reset_sequences(session)
+    rebuild_rollups()
+
+    context_ids = previous_context_ids | existing_context_ids(session)
+    changes = {('context', CONTEXT_LIST_SCOPE)}
+    for context_id in context_ids:
+        changes.add(('context', context_id))
+        changes.update((kind, context_id) for kind in CHANGE_KINDS.values())
+    record_changes(session, changes)
+    return counts
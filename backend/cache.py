@@ -0,0 +1,243 @@
+"""
+Response cache for the stats and overview endpoints.
+
+Entries are keyed by endpoint, view args, sorted query params and today's
+date (named ranges are relative to it). Each entry is tagged with the data
+it was computed from, as "<kind>:<context_id>" or "<kind>:*" for every
+context. A committed change (kind, context_id) from changes.py drops the
+entries tagged with either form, so a transaction write only evicts the
+stats of its own context plus the cross-context ones.
+
+ResponseCache is the interface a shared backend implements;
+MemoryResponseCache is the bounded in-process LRU+TTL default. Set
+app.extensions['response_cache'] before init_response_cache() to use
+another backend. While cross-worker invalidation is unavailable (see
+invalidation.py) the cache is put in degraded mode: it is emptied and new
+entries only live for a short TTL.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from changes import on_commit
+from profiling import is_profiling
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 300
+ALL_CONTEXTS = '*'
+
+
+class ResponseCache(ABC):
+    """Interface for response cache backends; a backend missing any method cannot be instantiated"""
+
+    @abstractmethod
+    def begin(self):
+        """Token taken before computing a response; set() drops the value if its tags were invalidated since"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key, value, tags, token):
+        raise NotImplementedError
+
+    @abstractmethod
+    def invalidate(self, tags):
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def degrade(self, ttl):
+        """Drop every entry and cap the TTL of new ones until recover()"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def recover(self):
+        """Drop every entry and return to the configured TTL"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self):
+        raise NotImplementedError
+
+
+class MemoryResponseCache(ResponseCache):
+    """Thread-safe LRU cache with a per-entry TTL and tag-based invalidation"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.degraded_ttl = None
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._keys_by_tag = {}
+        self._invalidated_at = {}  # tag -> sequence number of its last invalidation
+        self._sequence = 0
+        self._cleared_at = 0
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('hits', 'misses', 'sets', 'evictions', 'expirations', 'invalidations'), 0)
+
+    def begin(self):
+        with self._lock:
+            return self._sequence
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            if entry[0] <= self.clock():
+                self._remove(key)
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return entry[1]
+
+    def set(self, key, value, tags, token):
+        with self._lock:
+            if self._cleared_at > token or any(self._invalidated_at.get(tag, -1) > token for tag in tags):
+                # A write committed while this value was being computed
+                return
+            if key in self._entries:
+                self._remove(key)
+            ttl = self.ttl if self.degraded_ttl is None else min(self.ttl, self.degraded_ttl)
+            self._entries[key] = (self.clock() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            self._counters['sets'] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._counters['evictions'] += 1
+
+    def invalidate(self, tags):
+        with self._lock:
+            self._sequence += 1
+            for tag in tags:
+                self._invalidated_at[tag] = self._sequence
+                for key in list(self._keys_by_tag.get(tag, ())):
+                    self._remove(key)
+                    self._counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def degrade(self, ttl):
+        with self._lock:
+            self.degraded_ttl = ttl
+            self._clear()
+
+    def recover(self):
+        with self._lock:
+            self.degraded_ttl = None
+            self._clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'degraded_ttl_seconds': self.degraded_ttl,
+                'hit_ratio': round(self._counters['hits'] / lookups, 4) if lookups else None,
+            }
+
+    def _clear(self):
+        # Values computed before the clear are rejected by set()
+        self._sequence += 1
+        self._cleared_at = self._sequence
+        self._entries.clear()
+        self._keys_by_tag.clear()
+        self._invalidated_at.clear()
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+def change_tags(changes):
+    """Cache tags hit by committed (kind, context_id) changes"""
+    tags = set()
+    for kind, context_id in changes:
+        tags.add(f'{kind}:{context_id}')
+        tags.add(f'{kind}:{ALL_CONTEXTS}')
+    return tags
+
+
+def init_response_cache(app):
+    """Attach the response cache to an app and invalidate it on committed changes"""
+    cache = app.extensions.get('response_cache')
+    if cache is None:
+        cache = MemoryResponseCache(
+            max_entries=app.config.get('RESPONSE_CACHE_SIZE', DEFAULT_MAX_ENTRIES),
+            ttl=app.config.get('RESPONSE_CACHE_TTL', DEFAULT_TTL_SECONDS)
+        )
+        app.extensions['response_cache'] = cache
+
+    def invalidate_committed_changes(changes):
+        cache.invalidate(change_tags(changes))
+
+    on_commit(app, invalidate_committed_changes)
+
+    return cache
+
+
+def get_response_cache():
+    return current_app.extensions['response_cache']
+
+
+def cached_response(*kinds):
+    """
+    Cache successful responses of a GET view that reads only the given kinds of data
+    ('transaction', 'todo', 'idea', 'event', 'context'), scoped to the contextId
+    query param or context_id view arg when present.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # A profiled request is after the handler's cost, not a cache hit
+            if is_profiling():
+                return view(*args, **kwargs)
+            cache = get_response_cache()
+            context_id = kwargs.get('context_id') or request.args.get('contextId') or ALL_CONTEXTS
+            key = (
+                request.endpoint,
+                tuple(sorted(kwargs.items())),
+                tuple(sorted(request.args.items(multi=True))),
+                date.today().isoformat()
+            )
+
+            cached = cache.get(key)
+            if cached is not None:
+                body, status, mimetype = cached
+                return current_app.response_class(body, status=status, mimetype=mimetype)
+
+            token = cache.begin()
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                tags = [f'{kind}:{context_id}' for kind in kinds]
+                cache.set(key, (response.get_data(), response.status_code, response.mimetype), tags, token)
+            return response
+        return wrapper
+    return decorator
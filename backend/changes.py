@@ -0,0 +1,162 @@
+"""
+Per-context change versions, commit notifications and conditional GET.
+
+Every flush that creates, updates or deletes a context or one of its
+transactions, todos, notes or events bumps context_versions for each
+affected context (including the one an item moved away from). Version 0
+covers the context list. The bump runs in the same database transaction
+as the write, so a version never runs ahead of the data it describes.
+
+The same flush hook records (kind, context_id) pairs on the session.
+Callbacks registered with on_flush(app, ...) see them inside the transaction
+(the invalidation bus sends NOTIFY from there); callbacks registered with
+on_commit(app, ...) receive them once the transaction commits, and also
+receive changes committed by other workers (the response cache invalidates
+from them). Callbacks are kept per app in app.extensions and run for the
+app whose context the session is used in, so apps built by create_app()
+never see each other's writes.
+
+List endpoints decorated with @conditional_get send an ETag built from the
+version and answer a matching If-None-Match with 304 after reading only
+context_versions.
+"""
+
+import hashlib
+from datetime import date
+from functools import wraps
+
+from flask import current_app, has_app_context, make_response, request
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import db, Context, ContextVersion, Event, Idea, Todo, Transaction, upsert_increment
+
+CONTEXT_LIST_SCOPE = 0
+CHANGE_KINDS = {
+    Transaction: 'transaction',
+    Todo: 'todo',
+    Idea: 'idea',
+    Event: 'event',
+}
+PENDING_CHANGES_KEY = 'pending_context_changes'
+
+CALLBACKS_KEY = 'change_callbacks'
+
+
+def app_callbacks(app, stage):
+    """The {name: callback} registry of one app for 'flush' or 'commit'"""
+    return app.extensions.setdefault(CALLBACKS_KEY, {'flush': {}, 'commit': {}})[stage]
+
+
+def register_callback(app, stage, callback):
+    # Keyed by name, so initializing the same app again replaces its callback instead of adding one
+    app_callbacks(app, stage)[f'{callback.__module__}.{callback.__qualname__}'] = callback
+    return callback
+
+
+def current_callbacks(stage):
+    """Callbacks of the app whose context the session is used in (none outside an app context)"""
+    if not has_app_context():
+        return []
+    return list(app_callbacks(current_app, stage).values())
+
+
+def on_flush(app, callback):
+    """Register callback(session, changes) to run inside each flush of app that changes data"""
+    return register_callback(app, 'flush', callback)
+
+
+def on_commit(app, callback):
+    """Register callback(changes) to run after each commit of app that changed data; changes is a set of (kind, context_id)"""
+    return register_callback(app, 'commit', callback)
+
+
+def dispatch_changes(app, changes):
+    """Hand committed changes (local or from another worker) to the on_commit callbacks of app"""
+    for callback in list(app_callbacks(app, 'commit').values()):
+        callback(changes)
+
+
+def collect_changes(session):
+    """(kind, context_id) pairs for the pending changes of a session"""
+    changes = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Context):
+            changes.add(('context', CONTEXT_LIST_SCOPE))
+            changes.add(('context', obj.id))
+            continue
+        kind = CHANGE_KINDS.get(type(obj))
+        if kind:
+            # An item moved between contexts changes both lists
+            for context_id in inspect(obj).attrs.context_id.history.deleted or ():
+                changes.add((kind, context_id))
+            changes.add((kind, obj.context_id))
+    return {(kind, context_id) for kind, context_id in changes if context_id is not None}
+
+
+def bump_versions(session, context_ids):
+    for context_id in sorted(context_ids):
+        upsert_increment(session, ContextVersion, {'context_id': int(context_id)}, {'version': 1})
+
+
+def record_changes(session, changes):
+    """Bump versions and queue notifications for changes; bulk Core writes call this themselves"""
+    bump_versions(session, {context_id for _, context_id in changes})
+    session.info.setdefault(PENDING_CHANGES_KEY, set()).update(changes)
+    for callback in current_callbacks('flush'):
+        callback(session, changes)
+
+
+@event.listens_for(Session, 'before_flush')
+def record_context_changes(session, flush_context, instances):
+    changes = collect_changes(session)
+    if changes:
+        record_changes(session, changes)
+
+
+@event.listens_for(Session, 'after_commit')
+def publish_context_changes(session):
+    changes = session.info.pop(PENDING_CHANGES_KEY, None)
+    if changes and has_app_context():
+        dispatch_changes(current_app, changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_context_changes(session, previous_transaction):
+    # A rolled-back savepoint keeps the outer changes (over-invalidating is harmless)
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_CHANGES_KEY, None)
+
+
+def get_context_version(context_id):
+    version = db.session.execute(
+        db.select(ContextVersion.version).where(ContextVersion.context_id == context_id)
+    ).scalar()
+    return version or 0
+
+
+def make_etag(context_id):
+    """Weak ETag for the current request: scope, version, and a digest of the query string and today's date"""
+    version = get_context_version(context_id)
+    # Relative ranges (?range=month) and default windows shift with the date
+    digest = hashlib.sha1(f'{request.full_path}|{date.today().isoformat()}'.encode()).hexdigest()[:12]
+    return f'{context_id}-{version}-{digest}'
+
+
+def conditional_get(view):
+    """Answer If-None-Match with 304 when the context (or the context list) is unchanged"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Read the version before the data: a write in between only costs the next request a full response
+        etag = make_etag(kwargs.get('context_id', CONTEXT_LIST_SCOPE))
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        # Let browsers keep the body but revalidate on every fetch
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
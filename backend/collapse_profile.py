@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Collapse Profile
+Converts profiles saved from ?__profile=pstats (or any cProfile/pstats
+dump) into collapsed stacks, one "frame;frame;frame microseconds" line
+per stack, for flamegraph.pl, speedscope or inferno. Several files are
+merged into one output. Runs locally; no database needed.
+
+    curl -H "X-Profile-Token: $PROFILING_TOKEN" -o todos.pstats \\
+        "http://localhost:5000/api/contexts/1/todos?__profile=pstats"
+    python collapse_profile.py todos.pstats > todos.folded
+    flamegraph.pl todos.folded > todos.svg
+"""
+
+import sys
+import pstats
+
+from profiling import breakdown, collapsed_stacks, format_collapsed
+
+
+def main():
+    paths = sys.argv[1:]
+    if not paths:
+        print("Usage: python collapse_profile.py <profile.pstats> [more.pstats ...] > stacks.folded")
+        sys.exit(1)
+
+    stacks = {}
+    for path in paths:
+        try:
+            stats = pstats.Stats(path)
+        except Exception as e:
+            print(f"❌ Cannot read {path}: {str(e)}", file=sys.stderr)
+            sys.exit(1)
+        for stack, seconds in collapsed_stacks(stats).items():
+            stacks[stack] = stacks.get(stack, 0.0) + seconds
+
+    for line in format_collapsed(stacks):
+        print(line)
+
+    # The breakdown goes to stderr so the stacks can be piped straight into a flame graph tool
+    print(f"✓ {len(stacks)} stacks from {len(paths)} profile(s)", file=sys.stderr)
+    for category, milliseconds in breakdown(stacks).items():
+        print(f"   {category}: {milliseconds} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Export All Data
+Writes every context, transaction, todo, note, event and their links to an
+NDJSON file from one consistent snapshot, gzip-compressed when the file
+name ends in .gz. Restore it with restore_data.py.
+
+    python export_data.py backup.ndjson.gz
+"""
+
+import os
+import sys
+import time
+from app import app
+from models import db
+from backup import iter_export
+
+
+def main():
+    print("\n" + "="*60)
+    print("🗄️  Second Brain - Export Data")
+    print("="*60 + "\n")
+
+    if not os.getenv('DATABASE_URL'):
+        print("❌ ERROR: DATABASE_URL environment variable not set!")
+        print("   Please create a .env file with your database URL")
+        return
+
+    if len(sys.argv) < 2:
+        print("Usage: python export_data.py <file.ndjson[.gz]>")
+        sys.exit(1)
+    path = sys.argv[1]
+
+    with app.app_context():
+        try:
+            started = time.perf_counter()
+            with open(path, 'wb') as output:
+                for chunk in iter_export(db.engine, compress=path.endswith('.gz')):
+                    output.write(chunk)
+            size = os.path.getsize(path) / 1e6
+            print(f"✅ Exported to {path} ({size:.1f} MB in {time.perf_counter() - started:.1f}s)")
+        except Exception as e:
+            print(f"❌ Export failed: {str(e)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
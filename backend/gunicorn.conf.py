@@ -0,0 +1,59 @@
+"""
+Gunicorn settings for serving the API (the Dockerfile runs this):
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting comes from the environment:
+
+    PORT                       listen port (5000)
+    WEB_CONCURRENCY            worker processes (one per CPU, at most 4); see the connection
+                               budget below before raising it
+    GUNICORN_THREADS           threads per worker (4); 1 switches to sync workers. Keep it at or
+                               below the SQLAlchemy pool (5 connections + 10 overflow per engine)
+    GUNICORN_PRELOAD           1 imports the app once in the master before forking (faster
+                               start-up, shared memory); workers still get their own pools
+    GUNICORN_TIMEOUT           seconds before a silent worker is killed and replaced (60)
+    GUNICORN_GRACEFUL_TIMEOUT  seconds in-flight requests get to finish on SIGTERM/HUP (30)
+    GUNICORN_MAX_REQUESTS      recycle a worker after this many requests, 0 for never (0)
+
+Every worker holds its own connection pools, response cache and cache
+invalidation listener; see serving.py for what happens around fork and exit.
+"""
+
+import multiprocessing
+import os
+import sys
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+# Connection budget: a worker may open pool_size + max_overflow (5 + 10) connections to the primary
+# plus one for the cache invalidation listener, so workers x 16 must stay under PostgreSQL's
+# max_connections (100 by default) with room left for migrations and admin sessions (each read
+# replica has the same budget against its own server). 4 workers take at most 64; handlers are
+# CPU-bound, so more workers than CPUs gains nothing.
+workers = int(os.getenv('WEB_CONCURRENCY', min(multiprocessing.cpu_count(), 4)))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') == '1'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Without preload the worker imports the app itself, after the fork
+    if server.cfg.preload_app:
+        from app import app
+        from serving import after_fork
+        after_fork(app)
+
+
+def worker_exit(server, worker):
+    # Only if the app got as far as loading in this worker
+    app_module = sys.modules.get('app')
+    if app_module is not None and hasattr(app_module, 'app'):
+        from serving import shutdown
+        shutdown(app_module.app)
@@ -0,0 +1,255 @@
+"""
+Bulk transaction import from CSV and OFX statements.
+
+The upload is parsed incrementally from the request stream and inserted in
+batches with one multi-row INSERT ... ON CONFLICT DO NOTHING per batch.
+Rows are deduplicated per context on import_hash, a sha256 of (date,
+signed amount, description), through the unique
+ux_transactions_context_id_import_hash index, so re-importing an
+overlapping statement only adds the new rows. Invalid rows are skipped and
+reported by row number; the rest of the file is imported in one
+transaction.
+
+Because the inserts bypass the ORM, the tag index, the daily rollups and
+the change versions are updated here in bulk.
+
+CSV columns: date (YYYY-MM-DD), amount, description, and optionally type
+(income/expense; otherwise a negative amount is an expense), tags
+(separated by ';') and contextId (otherwise the contextId query param).
+"""
+
+import csv
+import hashlib
+from datetime import datetime
+
+from changes import record_changes
+from models import (
+    db, Context, Tag, Transaction, transaction_tags, insert_missing_tags, normalize_tag_names, UPSERT_DIALECTS
+)
+from rollups import RollupDelta, TransactionSnapshot
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+OFX_READ_SIZE = 64 * 1024
+TRANSACTION_TYPES = ('income', 'expense')
+DESCRIPTION_LENGTH = Transaction.__table__.c.description.type.length
+IMPORT_FORMATS = ('csv', 'ofx')
+
+
+class ImportFileError(ValueError):
+    """The upload as a whole cannot be imported"""
+
+
+class ImportRowError(ValueError):
+    """One row is invalid and is skipped"""
+
+
+def import_hash(date_value, signed_amount, description):
+    return hashlib.sha256(f'{date_value.isoformat()}|{signed_amount:.2f}|{description}'.encode()).hexdigest()
+
+
+def parse_amount(value):
+    try:
+        amount = float(str(value).strip())
+    except (TypeError, ValueError):
+        raise ImportRowError(f'Invalid amount: {value!r}')
+    if amount == 0:
+        raise ImportRowError('Amount must not be zero')
+    return amount
+
+
+def build_row(record, default_context_id, valid_context_ids):
+    """Validate one parsed record into a transactions row"""
+    raw_context = record.get('contextId') or default_context_id
+    try:
+        context_id = int(raw_context)
+    except (TypeError, ValueError):
+        raise ImportRowError('Missing or invalid contextId')
+    if context_id not in valid_context_ids:
+        raise ImportRowError(f'Context {context_id} not found')
+
+    raw_date = (record.get('date') or '').strip()
+    try:
+        date_value = datetime.strptime(raw_date, '%Y-%m-%d').date()
+    except ValueError:
+        raise ImportRowError(f'Invalid date: {raw_date!r} (expected YYYY-MM-DD)')
+
+    amount = parse_amount(record.get('amount'))
+    transaction_type = (record.get('type') or '').strip().lower()
+    if not transaction_type:
+        transaction_type = 'expense' if amount < 0 else 'income'
+    elif transaction_type not in TRANSACTION_TYPES:
+        raise ImportRowError(f'Invalid type: {transaction_type!r}')
+    amount = abs(amount)
+
+    description = (record.get('description') or '').strip()[:DESCRIPTION_LENGTH]
+    signed_amount = amount if transaction_type == 'income' else -amount
+
+    return {
+        'context_id': context_id,
+        'type': transaction_type,
+        'amount': amount,
+        'description': description,
+        'tags': normalize_tag_names((record.get('tags') or '').split(';')),
+        'date': date_value,
+        'created_at': datetime.utcnow(),
+        'import_hash': import_hash(date_value, signed_amount, description),
+    }
+
+
+# ----------------------------------------------------------------------------
+# Parsers: yield (row_number, record dict) pairs
+# ----------------------------------------------------------------------------
+
+def iter_records(import_format, text_stream):
+    if import_format not in IMPORT_FORMATS:
+        raise ImportFileError(f"Unsupported import format: {import_format!r} (use {' or '.join(IMPORT_FORMATS)})")
+    return iter_ofx_records(text_stream) if import_format == 'ofx' else iter_csv_records(text_stream)
+
+
+def iter_csv_records(text_stream):
+    reader = csv.DictReader(text_stream)
+    if not reader.fieldnames:
+        raise ImportFileError('The CSV file is empty')
+    fields = {name.strip().lower() for name in reader.fieldnames if name}
+    missing = {'date', 'amount'} - fields
+    if missing:
+        raise ImportFileError(f"CSV header is missing: {', '.join(sorted(missing))}")
+
+    aliases = {'contextid': 'contextId', 'context_id': 'contextId'}
+    for record in reader:
+        normalized = {}
+        for key, value in record.items():
+            if key is None:
+                continue
+            key = key.strip().lower()
+            normalized[aliases.get(key, key)] = value
+        yield reader.line_num, normalized
+
+
+def iter_ofx_records(text_stream):
+    """Tokenize SGML or XML OFX on '<' so records split across reads (or all on one line) still parse"""
+    record = None
+    number = 0
+    buffer = ''
+    while True:
+        chunk = text_stream.read(OFX_READ_SIZE)
+        buffer += chunk
+        tokens = buffer.split('<')
+        # Keep the possibly incomplete last token for the next read
+        buffer = tokens.pop() if chunk else ''
+        for token in tokens:
+            tag, _, value = token.partition('>')
+            tag = tag.strip().upper()
+            if tag == 'STMTTRN':
+                record = {}
+            elif tag == '/STMTTRN' and record is not None:
+                number += 1
+                yield number, ofx_record(record)
+                record = None
+            elif record is not None and tag and not tag.startswith('/'):
+                record[tag] = value.strip()
+        if not chunk:
+            return
+
+
+def ofx_record(fields):
+    posted = fields.get('DTPOSTED', '')[:8]
+    try:
+        date_value = datetime.strptime(posted, '%Y%m%d').date().isoformat()
+    except ValueError:
+        date_value = posted
+    name = fields.get('NAME', '')
+    memo = fields.get('MEMO', '')
+    return {
+        'date': date_value,
+        'amount': fields.get('TRNAMT'),
+        'description': name if not memo or memo == name else f'{name} - {memo}'.strip(' -'),
+    }
+
+
+# ----------------------------------------------------------------------------
+# Bulk insert
+# ----------------------------------------------------------------------------
+
+def tag_ids_by_name(session, names):
+    """Ids for tag names, creating missing Tag rows"""
+    if not names:
+        return {}
+    insert_missing_tags(session, names)
+    return dict(session.execute(db.select(Tag.name, Tag.id).where(Tag.name.in_(names))).all())
+
+
+def insert_batch(session, rows, rollup_delta):
+    """Insert one batch, skipping duplicates; returns the number of rows inserted"""
+    insert = UPSERT_DIALECTS[session.get_bind().dialect.name]
+    table = Transaction.__table__
+    statement = (
+        insert(table)
+        .on_conflict_do_nothing(index_elements=['context_id', 'import_hash'])
+        .returning(table.c.id, table.c.import_hash, table.c.context_id)
+    )
+    inserted = session.execute(statement, rows).all()
+    if not inserted:
+        return 0
+
+    rows_by_key = {(row['context_id'], row['import_hash']): row for row in rows}
+    tag_ids = tag_ids_by_name(session, {name for row in rows for name in row['tags']})
+
+    links = []
+    for transaction_id, hash_value, context_id in inserted:
+        row = rows_by_key[(context_id, hash_value)]
+        row_tag_ids = tuple(sorted(tag_ids[name] for name in row['tags']))
+        links.extend({'transaction_id': transaction_id, 'tag_id': tag_id} for tag_id in row_tag_ids)
+        rollup_delta.add(TransactionSnapshot(context_id, row['date'], row['type'], row['amount'], row_tag_ids))
+
+    if links:
+        session.execute(transaction_tags.insert(), links)
+    record_changes(session, {('transaction', context_id) for _, _, context_id in inserted})
+    return len(inserted)
+
+
+def import_transactions(records, default_context_id=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import parsed (row_number, record) pairs into the current session (the caller commits).
+    Returns a report with imported/duplicate/failed counts and per-row errors.
+    """
+    session = db.session
+    valid_context_ids = {context_id for (context_id,) in session.query(Context.id)}
+    report = {'imported': 0, 'duplicates': 0, 'failed': 0, 'errors': []}
+
+    batch = []
+    batch_keys = set()
+    # Rollups are applied once at the end: a year of statements touches at most a few hundred rollup rows
+    rollup_delta = RollupDelta()
+
+    def flush_batch():
+        inserted = insert_batch(session, batch, rollup_delta)
+        report['imported'] += inserted
+        report['duplicates'] += len(batch) - inserted
+        batch.clear()
+        batch_keys.clear()
+
+    for row_number, record in records:
+        try:
+            row = build_row(record, default_context_id, valid_context_ids)
+        except ImportRowError as e:
+            report['failed'] += 1
+            if len(report['errors']) < MAX_REPORTED_ERRORS:
+                report['errors'].append({'row': row_number, 'message': str(e)})
+            continue
+
+        key = (row['context_id'], row['import_hash'])
+        if key in batch_keys:
+            # Same content twice in one batch: keep the first
+            report['duplicates'] += 1
+            continue
+        batch_keys.add(key)
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush_batch()
+
+    if batch:
+        flush_batch()
+    rollup_delta.apply()
+    return report
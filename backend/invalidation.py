@@ -0,0 +1,174 @@
+"""
+Cross-worker cache invalidation over PostgreSQL LISTEN/NOTIFY.
+
+Inside every flush that changes data, each (kind, context_id) pair is sent
+with pg_notify on INVALIDATION_CHANNEL. PostgreSQL delivers notifications
+only when the transaction commits (and drops duplicates within it), so
+listeners never hear about rolled-back writes.
+
+Each worker process runs one listener thread on a dedicated connection and
+feeds the changes of other workers to changes.dispatch_changes() for its
+app, which invalidates the response cache exactly like a local commit.
+While the listener is not connected, the cache runs in degraded mode (short
+TTL), because notifications sent during the outage are lost. On reconnect it is
+emptied and returns to its normal TTL.
+
+The bus is only started on PostgreSQL; set CACHE_INVALIDATION_BUS=0 to
+disable it.
+"""
+
+import os
+import select
+import threading
+import uuid
+
+from changes import dispatch_changes, on_flush
+from models import db
+
+INVALIDATION_CHANNEL = 'second_brain_changes'
+DEFAULT_DEGRADED_TTL = 5
+DEFAULT_RECONNECT_DELAY = 2
+POLL_SECONDS = 10
+CONNECT_WAIT_SECONDS = 1
+
+_worker = {'pid': None, 'id': None}
+
+
+def worker_id():
+    """Identifier of this process; regenerated after a fork so workers never share it"""
+    if _worker['pid'] != os.getpid():
+        _worker['pid'] = os.getpid()
+        _worker['id'] = uuid.uuid4().hex[:12]
+    return _worker['id']
+
+
+def encode_change(kind, context_id):
+    return f'{worker_id()}|{kind}|{context_id}'
+
+
+def decode_change(payload):
+    """(sender, kind, context_id) from a notification payload, or None if it is malformed"""
+    parts = payload.split('|')
+    if len(parts) != 3 or not parts[2].isdigit():
+        return None
+    return parts[0], parts[1], int(parts[2])
+
+
+def send_notifications(session, changes):
+    if session.get_bind().dialect.name != 'postgresql':
+        return
+    for kind, context_id in sorted(changes):
+        session.execute(
+            db.text('SELECT pg_notify(:channel, :payload)'),
+            {'channel': INVALIDATION_CHANNEL, 'payload': encode_change(kind, context_id)}
+        )
+
+
+class InvalidationListener:
+    """Background thread that LISTENs for changes from other workers"""
+
+    def __init__(self, app, engine, cache, logger, degraded_ttl=DEFAULT_DEGRADED_TTL,
+                 reconnect_delay=DEFAULT_RECONNECT_DELAY):
+        self.app = app
+        self.engine = engine
+        self.cache = cache
+        self.logger = logger
+        self.degraded_ttl = degraded_ttl
+        self.reconnect_delay = reconnect_delay
+        self.connected = threading.Event()
+        self.pid = None
+        self.backend_pid = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._connection = None
+
+    def ensure_running(self):
+        """Start the thread in this process if needed (threads do not survive a fork)"""
+        if self.pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        self.pid = os.getpid()
+        self.connected.clear()
+        self._stop.clear()
+        self.cache.degrade(self.degraded_ttl)
+        self._thread = threading.Thread(target=self._run, name='cache-invalidation-listener', daemon=True)
+        self._thread.start()
+        # Give the first request a warm cache instead of one the listener empties on connect
+        self.connected.wait(CONNECT_WAIT_SECONDS)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                if not self._stop.is_set():
+                    self.logger.warning(f'Cache invalidation listener disconnected: {str(e)}')
+            finally:
+                if self._connection is not None:
+                    try:
+                        self._connection.close()
+                    except Exception:
+                        pass
+                    self._connection = None
+            if self.connected.is_set():
+                self.connected.clear()
+                self.cache.degrade(self.degraded_ttl)
+            self._stop.wait(self.reconnect_delay)
+
+    def _listen(self):
+        # A raw DBAPI connection outside the pool, in autocommit so notifications arrive immediately
+        pooled = self.engine.raw_connection()
+        pooled.detach()
+        self._connection = connection = pooled.dbapi_connection
+        connection.autocommit = True
+        cursor = connection.cursor()
+        cursor.execute(f'LISTEN {INVALIDATION_CHANNEL}')
+        self.backend_pid = connection.get_backend_pid()
+
+        # Anything may have changed while we were not listening
+        self.cache.recover()
+        self.connected.set()
+
+        while not self._stop.is_set():
+            if select.select([connection], [], [], POLL_SECONDS) == ([], [], []):
+                # Idle: make sure the connection is still alive
+                cursor.execute('SELECT 1')
+                continue
+            connection.poll()
+            changes = set()
+            while connection.notifies:
+                change = decode_change(connection.notifies.pop(0).payload)
+                if change and change[0] != worker_id():
+                    changes.add(change[1:])
+            if changes:
+                dispatch_changes(self.app, changes)
+
+
+def init_invalidation_bus(app, cache):
+    """Send NOTIFY on writes and start the per-worker listener lazily on the first request"""
+    on_flush(app, send_notifications)
+
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'postgresql' or os.getenv('CACHE_INVALIDATION_BUS', '1') == '0':
+        return None
+
+    listener = InvalidationListener(
+        app,
+        engine,
+        cache,
+        app.logger,
+        degraded_ttl=app.config.get('CACHE_DEGRADED_TTL', DEFAULT_DEGRADED_TTL),
+        reconnect_delay=app.config.get('CACHE_LISTENER_RECONNECT_DELAY', DEFAULT_RECONNECT_DELAY)
+    )
+    app.extensions['invalidation_listener'] = listener
+
+    @app.before_request
+    def start_invalidation_listener():
+        listener.ensure_running()
+
+    return listener
@@ -0,0 +1,201 @@
+"""
+Request, SQL and connection pool metrics in Prometheus text format.
+
+Every request is timed and counted per endpoint (the Flask endpoint name,
+e.g. api.get_contexts; unmatched URLs are "unmatched") and status code.
+SQLAlchemy before/after_cursor_execute events count the statements each
+request runs and the time spent in them, on every engine (primary and
+replicas alike). GET /api/metrics renders the counters together with
+gauges of each engine's connection pool.
+
+The numbers are per worker process: under gunicorn each worker keeps its
+own, and Prometheus should scrape the workers individually (or accept
+seeing whichever worker answers). Streamed responses (/api/export) are
+timed until their first byte, not until the stream ends.
+"""
+
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+UNMATCHED_ENDPOINT = 'unmatched'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of (label, value) pairs"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{format_labels(labels + (("le", bound),))} {count}')
+            lines.append(f'{self.name}_bucket{format_labels(labels + (("le", "+Inf"),))} {series[-1]}')
+            lines.append(f'{self.name}_sum{format_labels(labels)} {format_value(series[-2])}')
+            lines.append(f'{self.name}_count{format_labels(labels)} {series[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{format_labels(labels)} {format_value(value)}')
+        return lines
+
+
+class RequestMetrics:
+    """Thread-safe per-process request and SQL metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self.requests = Counter('http_requests_total', 'Requests handled, by endpoint, method and status code.')
+        self.latency = Histogram(
+            'http_request_duration_seconds', 'Request handling time, by endpoint and method.', LATENCY_BUCKETS
+        )
+        self.sql_statements = Counter('sql_statements_total', 'SQL statements executed, by endpoint.')
+        self.sql_seconds = Counter('sql_duration_seconds_total', 'Time spent executing SQL, by endpoint.')
+        self.statements_per_request = Histogram(
+            'sql_statements_per_request', 'SQL statements executed per request, by endpoint.', STATEMENT_BUCKETS
+        )
+
+    def observe(self, endpoint, method, status, seconds, statements, sql_seconds):
+        endpoint_labels = (('endpoint', endpoint),)
+        with self._lock:
+            self.requests.inc(endpoint_labels + (('method', method), ('status', status)))
+            self.latency.observe(endpoint_labels + (('method', method),), seconds)
+            self.sql_statements.inc(endpoint_labels, statements)
+            self.sql_seconds.inc(endpoint_labels, sql_seconds)
+            self.statements_per_request.observe(endpoint_labels, statements)
+
+    def render(self, engines):
+        """Prometheus exposition of the counters plus pool gauges of the named engines"""
+        lines = []
+        with self._lock:
+            for metric in (self.requests, self.latency, self.sql_statements, self.sql_seconds,
+                           self.statements_per_request):
+                lines.extend(metric.render())
+        lines.extend(render_pool_gauges(engines))
+        return '\n'.join(lines) + '\n'
+
+
+POOL_GAUGES = (
+    ('db_pool_size', 'Configured pool size.', 'size'),
+    ('db_pool_checked_out', 'Connections currently checked out of the pool.', 'checkedout'),
+    ('db_pool_checked_in', 'Idle connections in the pool.', 'checkedin'),
+    ('db_pool_overflow', 'Connections open beyond the pool size (negative: room left before the pool is full).',
+     'overflow'),
+)
+
+
+def render_pool_gauges(engines):
+    """Gauges for engines with a sizing pool (QueuePool); SQLite's static/singleton pools have none"""
+    pools = [(name, engine.pool) for name, engine in engines.items() if hasattr(engine.pool, 'checkedout')]
+    lines = []
+    for metric, help_text, method in POOL_GAUGES:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} gauge']
+        for name, pool in pools:
+            lines.append(f'{metric}{format_labels((("engine", name),))} {getattr(pool, method)()}')
+    return lines
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_statement_timer(connection, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        connection.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_statement(connection, cursor, statement, parameters, context, executemany):
+    started = connection.info.get('metrics_started')
+    if not started or not has_request_context():
+        return
+    elapsed = time.perf_counter() - started.pop()
+    g.sql_statements = g.get('sql_statements', 0) + 1
+    g.sql_seconds = g.get('sql_seconds', 0.0) + elapsed
+
+
+@event.listens_for(Engine, 'handle_error')
+def discard_statement_timer(context):
+    # A failed statement never reaches after_cursor_execute
+    started = context.connection.info.get('metrics_started') if context.connection is not None else None
+    if started and context.statement is not None:
+        started.pop()
+
+
+def init_metrics(app):
+    """Time and count every request of an app into app.extensions['metrics']"""
+    metrics = RequestMetrics()
+    app.extensions['metrics'] = metrics
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is not None:
+            metrics.observe(
+                request.endpoint or UNMATCHED_ENDPOINT,
+                request.method,
+                response.status_code,
+                time.perf_counter() - started,
+                g.get('sql_statements', 0),
+                g.get('sql_seconds', 0.0)
+            )
+        return response
+
+    return metrics
@@ -1,67 +1,66 @@
 #!/usr/bin/env python3
 """
-Database Migration - Add Calendar Features
-Adds:
-- due_time to todos
-- calendar_event_id link to todos  
-- completed, recurring fields to events
+Database Migration
+Applies the pending schema revisions from migrations.py to the database in
+DATABASE_URL. Migrations only add tables, columns and indexes; no data is
+dropped, and it is safe to run against the live database (and to re-run
+after an interruption).
+
+    python migrate_database.py            # apply pending revisions
+    python migrate_database.py status     # list applied and pending revisions
+
+MIGRATION_BATCH_SIZE / MIGRATION_BATCH_PAUSE tune backfill throttling and
+MIGRATION_LOCK_TIMEOUT bounds how long DDL waits for a table lock.
+
+After applying revision 0002 (daily transaction rollups) on a live database,
+run python rebuild_rollups.py once the new release is serving; see
+migrations.py.
 """
 
 import os
+import sys
 from app import app
 from models import db
+from migrations import REVISIONS, applied_revisions, upgrade
 
-def migrate_database():
-    """Run database migration"""
-    with app.app_context():
-        print("🔄 Running database migration...")
-        print("   Adding new fields for calendar integration...")
-        
-        try:
-            # Drop all tables and recreate (WARNING: This deletes all data!)
-            print("\n⚠️  WARNING: This will delete all existing data!")
-            
-            print("\n📊 Dropping existing tables...")
-            db.drop_all()
-            
-            print("📊 Creating new tables with updated schema...")
-            db.create_all()
-            
-            print("\n✅ Migration completed successfully!")
-            print("\n📝 New fields added:")
-            print("   Todos:")
-            print("   - due_time (optional time for due date)")
-            print("   - calendar_event_id (link to calendar event)")
-            print("\n   Events:")
-            print("   - completed (track if event is done)")
-            print("   - recurring (is this a recurring event)")
-            print("   - recurrence_type (daily/weekly/monthly/yearly)")
-            print("   - recurrence_end_date (when recurring stops)")
-            
-            print("\n💡 Next step: Run init_db.py to seed sample data")
-            
-        except Exception as e:
-            print(f"\n❌ Migration failed: {str(e)}")
-            db.session.rollback()
+
+def print_status():
+    applied = applied_revisions(db.engine)
+    for revision_id, description, _ in REVISIONS:
+        marker = "✓" if revision_id in applied else "·"
+        print(f"   {marker} {revision_id}  {description}")
+    pending = len([entry for entry in REVISIONS if entry[0] not in applied])
+    print(f"\n📊 {len(REVISIONS) - pending} applied, {pending} pending")
 
 
 def main():
     print("\n" + "="*60)
-    print("🗄️  Second Brain - Calendar Migration")
+    print("🗄️  Second Brain - Database Migration")
     print("="*60 + "\n")
-    
-    # Check if DATABASE_URL is set
+
     if not os.getenv('DATABASE_URL'):
         print("❌ ERROR: DATABASE_URL environment variable not set!")
         print("   Please create a .env file with your database URL")
         return
-    
-    migrate_database()
-    
-    print("\n" + "="*60)
-    print("✅ Migration process complete!")
-    print("="*60 + "\n")
+
+    with app.app_context():
+        if sys.argv[1:] == ['status']:
+            print_status()
+            return
+
+        try:
+            applied = upgrade(db.engine)
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Migration failed: {str(e)}")
+            print("   Fix the cause and re-run; completed steps are skipped")
+            sys.exit(1)
+
+        if applied:
+            print(f"\n✅ Applied {len(applied)} revision(s): {', '.join(applied)}")
+        else:
+            print("✅ Database is up to date")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,423 @@
+"""
+Versioned, non-destructive schema migrations.
+
+Revisions are registered in order with @revision and recorded in
+schema_migrations once applied; migrate_database.py applies the pending
+ones. They only add things (tables, nullable columns, indexes), and every
+operation checks the live schema first, so a revision interrupted half way
+can simply be run again.
+
+On PostgreSQL the runner is built for a live database:
+- indexes are built with CREATE INDEX CONCURRENTLY, outside a transaction,
+  so writes carry on during the build (an invalid index left by a failed
+  build is dropped and rebuilt);
+- other DDL runs with a short lock_timeout, so it gives up rather than
+  queueing behind a long transaction and blocking every writer behind it;
+- backfills run in id-range batches, each in its own short transaction,
+  with a pause between batches;
+- an advisory lock keeps two runners from migrating at once.
+
+The rollup backfill of revision 0002 takes no lock either, so updates and
+deletes the previous release makes to already backfilled transactions are
+missed: run rebuild_rollups.py once the new release (which maintains the
+rollups on every write) is serving. The runner prints a reminder.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn, CreateTable
+
+from models import (
+    db, ContextVersion, Event, Idea, SchemaMigration, Tag, Todo, Transaction,
+    TransactionDailyRollup, TransactionTagDailyRollup, TAGGED_MODELS,
+    SQLITE_PERIOD_DDL, SQLITE_PERIOD_MINUTES, UPSERT_DIALECTS, event_tags, idea_tags,
+    normalize_tag_names, todo_event_links, todo_tags, transaction_tags
+)
+from importers import tag_ids_by_name
+from rollups import backfill_rollups
+
+MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 1000))
+MIGRATION_BATCH_PAUSE = float(os.getenv('MIGRATION_BATCH_PAUSE', 0.05))
+MIGRATION_LOCK_TIMEOUT = os.getenv('MIGRATION_LOCK_TIMEOUT', '5s')
+MIGRATION_LOCK_ID = 0x5B_4D16  # pg_advisory_lock key held while migrating
+
+REVISIONS = []
+
+ROLLUP_REBUILD_NOTICE = (
+    "   ⚠️  Transactions updated or deleted during the rollup backfill are not in the rollups yet: "
+    "run python rebuild_rollups.py once the new release is serving"
+)
+
+
+def revision(revision_id, description):
+    """Register upgrade(migrator) as the next revision"""
+    def register(upgrade):
+        assert not REVISIONS or REVISIONS[-1][0] < revision_id, 'revisions must be registered in order'
+        REVISIONS.append((revision_id, description, upgrade))
+        return upgrade
+    return register
+
+
+class Migrator:
+    """Idempotent additive schema operations against one engine"""
+
+    def __init__(self, engine, batch_size=MIGRATION_BATCH_SIZE, batch_pause=MIGRATION_BATCH_PAUSE, log=print):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.log = log
+
+    @contextmanager
+    def transaction(self):
+        """A short DDL/DML transaction that fails fast instead of waiting on locks"""
+        with self.engine.begin() as connection:
+            if self.dialect == 'postgresql':
+                connection.execute(db.text(f"SET LOCAL lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'"))
+            yield connection
+
+    def execute(self, statement, **params):
+        with self.transaction() as connection:
+            return connection.execute(db.text(statement) if isinstance(statement, str) else statement, params)
+
+    def has_table(self, name):
+        return inspect(self.engine).has_table(name)
+
+    def create_tables(self, *tables):
+        """Create the tables that do not exist yet (with their indexes); returns the names created"""
+        created = []
+        for table in tables:
+            if self.has_table(table.name):
+                continue
+            with self.transaction() as connection:
+                table.create(connection)
+            created.append(table.name)
+            self.log(f"   ✓ Created table {table.name}")
+        return created
+
+    def add_column(self, table, column_name):
+        """ALTER TABLE ... ADD COLUMN for a model column the live table lacks (must be nullable)"""
+        column = table.c[column_name]
+        existing = {c['name'] for c in inspect(self.engine).get_columns(table.name)}
+        if column_name in existing:
+            return False
+        if not column.nullable:
+            raise ValueError(f'{table.name}.{column_name} must be nullable to be added online')
+        definition = CreateColumn(column).compile(dialect=self.engine.dialect)
+        self.execute(f'ALTER TABLE {table.name} ADD COLUMN {definition}')
+        self.log(f"   ✓ Added column {table.name}.{column_name}")
+        return True
+
+    def index_state(self, index):
+        """'valid', 'invalid' (left by a failed concurrent build) or None when the index does not exist"""
+        if self.dialect != 'postgresql':
+            names = {existing['name'] for existing in inspect(self.engine).get_indexes(index.table.name)}
+            return 'valid' if index.name in names else None
+        with self.engine.connect() as connection:
+            valid = connection.execute(db.text(
+                "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+            ), {'name': index.name}).scalar()
+        if valid is None:
+            return None
+        return 'valid' if valid else 'invalid'
+
+    def create_index(self, index):
+        """Build a model index if missing; CONCURRENTLY on PostgreSQL so writes are not blocked"""
+        state = self.index_state(index)
+        if state == 'valid':
+            return False
+
+        started = time.perf_counter()
+        if self.dialect != 'postgresql':
+            with self.transaction() as connection:
+                # Index.create honours ddl_if, so indexes for other dialects are skipped
+                index.create(connection)
+        else:
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                if state == 'invalid':
+                    connection.execute(db.text(f'DROP INDEX CONCURRENTLY IF EXISTS {index.name}'))
+                options = index.dialect_options['postgresql']
+                options['concurrently'] = True
+                try:
+                    index.create(connection)
+                finally:
+                    options['concurrently'] = False
+
+        if self.index_state(index) != 'valid':
+            return False
+        self.log(f"   ✓ Created index {index.name} ({time.perf_counter() - started:.1f}s)")
+        return True
+
+    def create_model_indexes(self, *tables):
+        """Create every index declared on the given tables that the database lacks"""
+        for table in tables:
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                self.create_index(index)
+
+    def live_foreign_keys(self, table):
+        """{(constrained columns, referred table): (constraint name, ON DELETE action)} of the live table"""
+        if self.dialect == 'sqlite':
+            keys = {}
+            with self.engine.connect() as connection:
+                rows = connection.exec_driver_sql(f'PRAGMA foreign_key_list({table.name})').all()
+            for _, _, referred, column, _, _, on_delete, _ in rows:
+                keys[((column,), referred)] = (None, on_delete.upper())
+            return keys
+        return {
+            (tuple(key['constrained_columns']), key['referred_table']):
+                (key['name'], (key['options'].get('ondelete') or 'NO ACTION').upper())
+            for key in inspect(self.engine).get_foreign_keys(table.name)
+        }
+
+    def add_delete_cascades(self, table):
+        """Give the live table the ON DELETE actions its model foreign keys declare"""
+        live = self.live_foreign_keys(table)
+        stale = []
+        for key in table.foreign_keys:
+            wanted = (key.ondelete or 'NO ACTION').upper()
+            name, action = live.get(((key.parent.name,), key.column.table.name), (None, None))
+            if action is not None and action != wanted:
+                stale.append((key, name, wanted))
+        if not stale:
+            return False
+
+        if self.dialect == 'sqlite':
+            # SQLite cannot alter a constraint; the table is rebuilt with the model definition
+            self.rebuild_sqlite_table(table)
+        else:
+            for key, name, wanted in stale:
+                referred = key.column.table.name
+                # NOT VALID skips the full-table check under the exclusive lock; VALIDATE then
+                # scans without blocking writes
+                self.execute(
+                    f'ALTER TABLE {table.name} DROP CONSTRAINT {name}, '
+                    f'ADD CONSTRAINT {name} FOREIGN KEY ({key.parent.name}) '
+                    f'REFERENCES {referred} ({key.column.name}) ON DELETE {wanted} NOT VALID'
+                )
+                self.execute(f'ALTER TABLE {table.name} VALIDATE CONSTRAINT {name}')
+        self.log(f"   ✓ Foreign keys of {table.name} now cascade deletes")
+        return True
+
+    def rebuild_sqlite_table(self, table):
+        """Recreate a SQLite table from its model definition, keeping its rows (indexes are re-created separately)"""
+        temporary = f'_rebuild_{table.name}'
+        create = str(CreateTable(table).compile(dialect=self.engine.dialect)).strip()
+        create = create.replace(f'CREATE TABLE {table.name} ', f'CREATE TABLE {temporary} ', 1)
+        live_columns = {column['name'] for column in inspect(self.engine).get_columns(table.name)}
+        columns = ', '.join(column.name for column in table.columns if column.name in live_columns)
+
+        pooled = self.engine.raw_connection()
+        try:
+            connection = pooled.dbapi_connection
+            if connection.in_transaction:
+                connection.commit()
+            cursor = connection.cursor()
+            # Off for the swap, or dropping the old table would cascade into its children
+            cursor.execute('PRAGMA foreign_keys = OFF')
+            try:
+                cursor.execute('BEGIN')
+                cursor.execute(create)
+                cursor.execute(f'INSERT INTO {temporary} ({columns}) SELECT {columns} FROM {table.name}')
+                cursor.execute(f'DROP TABLE {table.name}')
+                cursor.execute(f'ALTER TABLE {temporary} RENAME TO {table.name}')
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                cursor.execute('PRAGMA foreign_keys = ON')
+                cursor.close()
+        finally:
+            pooled.close()
+
+    def id_batches(self, table, id_column='id', after=None):
+        """
+        Yield (low, high) id ranges of batch_size (only ids above `after`, if given), pausing
+        between them to leave room for live traffic
+        """
+        column = table.c[id_column]
+        query = db.select(db.func.min(column), db.func.max(column))
+        if after is not None:
+            query = query.where(column > after)
+        with self.engine.connect() as connection:
+            low, high = connection.execute(query).one()
+        if low is None:
+            return
+        for start in range(low, high + 1, self.batch_size):
+            yield start, start + self.batch_size - 1
+            if self.batch_pause:
+                time.sleep(self.batch_pause)
+
+    def backfill(self, table, statement, id_column='id'):
+        """Run a statement with :low/:high id bounds over the whole table in throttled batches"""
+        batches = 0
+        for low, high in self.id_batches(table, id_column):
+            self.execute(statement, low=low, high=high)
+            batches += 1
+        self.log(f"   ✓ Backfilled {table.name} in {batches} batches")
+
+
+# ----------------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------------
+
+def applied_revisions(engine):
+    if not inspect(engine).has_table(SchemaMigration.__tablename__):
+        return set()
+    with engine.connect() as connection:
+        return {row for (row,) in connection.execute(db.select(SchemaMigration.revision))}
+
+
+def pending_revisions(engine):
+    applied = applied_revisions(engine)
+    return [entry for entry in REVISIONS if entry[0] not in applied]
+
+
+@contextmanager
+def migration_lock(engine):
+    """Hold a session-level advisory lock on PostgreSQL for the duration of a run"""
+    if engine.dialect.name != 'postgresql':
+        yield
+        return
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(db.text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_ID})
+        try:
+            yield
+        finally:
+            connection.execute(db.text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_ID})
+
+
+def upgrade(engine, migrator=None):
+    """Apply every pending revision in order; returns the ids applied"""
+    migrator = migrator or Migrator(engine)
+    applied = []
+    with migration_lock(engine):
+        migrator.create_tables(SchemaMigration.__table__)
+        for revision_id, description, run in pending_revisions(engine):
+            migrator.log(f"🔄 {revision_id}: {description}")
+            run(migrator)
+            with migrator.transaction() as connection:
+                connection.execute(db.insert(SchemaMigration).values(
+                    revision=revision_id, description=description, applied_at=datetime.utcnow()
+                ))
+            applied.append(revision_id)
+    return applied
+
+
+# ============================================================================
+# REVISIONS
+# ============================================================================
+
+@revision('0001', 'Normalized tag index')
+def add_tag_index(migrator):
+    migrator.create_tables(
+        Tag.__table__, transaction_tags, todo_tags, idea_tags, event_tags
+    )
+    # Core reads only: the mapped tables may still lack columns that later revisions add
+    session = db.session
+    insert = UPSERT_DIALECTS[migrator.dialect]
+    for model in TAGGED_MODELS:
+        table = model.__table__
+        association = model.tag_objects.property.secondary
+        entity_column = next(column.name for column in association.c if column.name != 'tag_id')
+        for low, high in migrator.id_batches(table):
+            rows = session.execute(db.select(table.c.id, table.c.tags).where(table.c.id.between(low, high))).all()
+            wanted = {row_id: normalize_tag_names(tags) for row_id, tags in rows}
+            tag_ids = tag_ids_by_name(session, {name for names in wanted.values() for name in names})
+            links = [
+                {entity_column: row_id, 'tag_id': tag_ids[name]}
+                for row_id, names in wanted.items() for name in names
+            ]
+            if links:
+                session.execute(insert(association).on_conflict_do_nothing(), links)
+            session.commit()
+
+
+@revision('0002', 'Daily transaction rollups')
+def add_transaction_rollups(migrator):
+    migrator.create_tables(TransactionDailyRollup.__table__, TransactionTagDailyRollup.__table__)
+    # No lock on transactions, so the release still serving keeps writing them without rollup hooks.
+    # Rows it inserts meanwhile are picked up by passes over the ids above the last range covered;
+    # its updates and deletes of rows already backfilled are not, hence the rebuild after deploy.
+    # Starting from empty tables lets an interrupted run be repeated.
+    session = db.session
+    for model in (TransactionTagDailyRollup, TransactionDailyRollup):
+        session.execute(db.delete(model))
+    session.commit()
+    batches, covered = 0, None
+    while True:
+        last_covered = covered
+        for low, high in migrator.id_batches(Transaction.__table__, after=covered):
+            backfill_rollups(session, low, high)
+            session.commit()
+            batches += 1
+            covered = high
+        if covered == last_covered:
+            break
+    migrator.log(f"   ✓ Backfilled transaction rollups in {batches} batches")
+    migrator.log(ROLLUP_REBUILD_NOTICE)
+
+
+@revision('0003', 'Event period index')
+def add_event_period_index(migrator):
+    if migrator.dialect == 'postgresql':
+        migrator.create_model_indexes(Event.__table__)
+    elif migrator.dialect == 'sqlite':
+        for statement in SQLITE_PERIOD_DDL:
+            migrator.execute(statement)
+        migrator.backfill(
+            Event.__table__,
+            f"INSERT OR REPLACE INTO events_period_rtree "
+            f"SELECT events.id, {SQLITE_PERIOD_MINUTES.format(row='events')} FROM events "
+            f"WHERE events.id BETWEEN :low AND :high"
+        )
+
+
+@revision('0004', 'Open todo due date index')
+def add_open_todo_index(migrator):
+    migrator.create_model_indexes(Todo.__table__)
+
+
+@revision('0005', 'Context change versions')
+def add_context_versions(migrator):
+    migrator.create_tables(ContextVersion.__table__)
+
+
+@revision('0006', 'Transaction import dedup hash')
+def add_transaction_import_hash(migrator):
+    # Existing rows keep a NULL hash, so they never collide with imported rows
+    migrator.add_column(Transaction.__table__, 'import_hash')
+    migrator.create_model_indexes(Transaction.__table__)
+
+
+@revision('0007', 'Indexes declared on the models')
+def add_model_indexes(migrator):
+    migrator.create_model_indexes(*db.metadata.sorted_tables)
+
+
+@revision('0008', 'Foreign key, date and status indexes')
+def add_performance_indexes(migrator):
+    migrator.create_model_indexes(
+        Transaction.__table__, Todo.__table__, Idea.__table__, Event.__table__, todo_event_links
+    )
+
+
+@revision('0009', 'Cascade deletes in the database')
+def cascade_deletes(migrator):
+    tables = [
+        Transaction.__table__, Todo.__table__, Idea.__table__, Event.__table__, todo_event_links,
+        transaction_tags, todo_tags, idea_tags, event_tags,
+        TransactionDailyRollup.__table__, TransactionTagDailyRollup.__table__,
+    ]
+    for table in tables:
+        migrator.add_delete_cascades(table)
+    # A SQLite rebuild drops the table's indexes and triggers; re-create whatever is missing
+    if migrator.dialect == 'sqlite':
+        for statement in SQLITE_PERIOD_DDL:
+            migrator.execute(statement)
+    migrator.create_model_indexes(*tables)
@@ -1,7 +1,42 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import DDL, and_, column, event, inspect, literal_column, or_, select, table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from calendar import timegm
+import sqlite3
+from functools import lru_cache
+from datetime import datetime, timedelta
 
-db = SQLAlchemy()
+from replicas import RoutingSession
+from tracing import traced
+
+# RoutingSession sends the reads of GET requests to a read replica when configured (see replicas.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def tag_association_table(name, entity_column, entity_table):
+    """Association table linking one tagged entity type to the shared tags table"""
+    return db.Table(name,
+        db.Column(entity_column, db.Integer, db.ForeignKey(f'{entity_table}.id', ondelete='CASCADE'), primary_key=True),
+        db.Column('tag_id', db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+        # Reverse lookup for ?tag= filters and per-tag aggregation
+        db.Index(f'ix_{name}_tag_id', 'tag_id', entity_column)
+    )
+
+
+transaction_tags = tag_association_table('transaction_tags', 'transaction_id', 'transactions')
+todo_tags = tag_association_table('todo_tags', 'todo_id', 'todos')
+idea_tags = tag_association_table('idea_tags', 'idea_id', 'ideas')
+event_tags = tag_association_table('event_tags', 'event_id', 'events')
+
+
+class Tag(db.Model):
+    __tablename__ = 'tags'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Context(db.Model):
     __tablename__ = 'contexts'
@@ -14,12 +49,14 @@ class Context(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     total_time_minutes = db.Column(db.Integer, default=0)
     
-    # Relationships
-    transactions = db.relationship('Transaction', back_populates='context', cascade='all, delete-orphan')
-    todos = db.relationship('Todo', back_populates='context', cascade='all, delete-orphan')
-    ideas = db.relationship('Idea', back_populates='context', cascade='all, delete-orphan')
-    events = db.relationship('Event', back_populates='context', cascade='all, delete-orphan')
+    # Relationships (passive_deletes: the database cascades a context delete to its
+    # items and their links, so they are never loaded just to be deleted)
+    transactions = db.relationship('Transaction', back_populates='context', cascade='all, delete-orphan', passive_deletes=True)
+    todos = db.relationship('Todo', back_populates='context', cascade='all, delete-orphan', passive_deletes=True)
+    ideas = db.relationship('Idea', back_populates='context', cascade='all, delete-orphan', passive_deletes=True)
+    events = db.relationship('Event', back_populates='context', cascade='all, delete-orphan', passive_deletes=True)
     
+    @traced
     def to_dict(self):
         return {
             'id': self.id,
@@ -34,19 +71,30 @@ class Context(db.Model):
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Serves per-context listings and range filters (WHERE context_id = ? AND date >= ?)
+        db.Index('ix_transactions_context_id_date', 'context_id', 'date'),
+        # Unscoped range listings, newest first, paged on (date, id)
+        db.Index('ix_transactions_date_id', 'date', 'id'),
+        # Bulk imports skip rows already imported into the context (NULL for manual entries)
+        db.Index('ux_transactions_context_id_import_hash', 'context_id', 'import_hash', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    context_id = db.Column(db.Integer, db.ForeignKey('contexts.id'), nullable=False)
+    context_id = db.Column(db.Integer, db.ForeignKey('contexts.id', ondelete='CASCADE'), nullable=False)
     type = db.Column(db.String(20), nullable=False)  # 'income' or 'expense'
     amount = db.Column(db.Float, nullable=False)
     description = db.Column(db.String(200))
     tags = db.Column(db.JSON, default=list)
     date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    import_hash = db.Column(db.String(64))  # sha256 of (date, signed amount, description) for imported rows
     
     # Relationships
     context = db.relationship('Context', back_populates='transactions')
+    tag_objects = db.relationship('Tag', secondary=transaction_tags, passive_deletes=True)
     
+    @traced
     def to_dict(self):
         return {
             'id': self.id,
@@ -61,9 +109,19 @@ class Transaction(db.Model):
 
 class Todo(db.Model):
     __tablename__ = 'todos'
+    __table_args__ = (
+        # Per-context todo lists and the overview's per-status counts
+        db.Index('ix_todos_context_id_status_due_date', 'context_id', 'status', 'due_date'),
+        # Overdue lookups only ever touch open todos, ordered by due date/time
+        db.Index(
+            'ix_todos_open_due_date_due_time', 'due_date', 'due_time',
+            postgresql_where=db.text("status <> 'done'"),
+            sqlite_where=db.text("status <> 'done'")
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    context_id = db.Column(db.Integer, db.ForeignKey('contexts.id'), nullable=False)
+    context_id = db.Column(db.Integer, db.ForeignKey('contexts.id', ondelete='CASCADE'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     status = db.Column(db.String(20), default='todo')  # 'todo', 'in_progress', 'done'
@@ -77,8 +135,10 @@ class Todo(db.Model):
     
     # Relationships
     context = db.relationship('Context', back_populates='todos')
-    calendar_events = db.relationship('Event', secondary='todo_event_links', back_populates='linked_todos')
+    calendar_events = db.relationship('Event', secondary='todo_event_links', back_populates='linked_todos', passive_deletes=True)
+    tag_objects = db.relationship('Tag', secondary=todo_tags, passive_deletes=True)
     
+    @traced
     def to_dict(self):
         return {
             'id': self.id,
@@ -99,17 +159,72 @@ class Todo(db.Model):
 
 # Many-to-many relationship table for Todo <-> Event
 todo_event_links = db.Table('todo_event_links',
-    db.Column('todo_id', db.Integer, db.ForeignKey('todos.id'), primary_key=True),
-    db.Column('event_id', db.Integer, db.ForeignKey('events.id'), primary_key=True),
-    db.Column('created_at', db.DateTime, default=datetime.utcnow)
+    db.Column('todo_id', db.Integer, db.ForeignKey('todos.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('event_id', db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('created_at', db.DateTime, default=datetime.utcnow),
+    # The primary key serves todo -> events; this serves event -> todos (Event.linked_todos)
+    db.Index('ix_todo_event_links_event_id', 'event_id')
 )
 
 
+class TransactionDailyRollup(db.Model):
+    """Per-day transaction totals, maintained incrementally by the flush hooks in rollups.py"""
+    __tablename__ = 'transaction_daily_rollups'
+    __table_args__ = (
+        db.Index('ix_transaction_daily_rollups_date_type', 'date', 'type'),
+    )
+    
+    context_id = db.Column(db.Integer, db.ForeignKey('contexts.id', ondelete='CASCADE'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    type = db.Column(db.String(20), primary_key=True)
+    total_amount = db.Column(db.Float, nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+    untagged_amount = db.Column(db.Float, nullable=False, default=0)
+
+
+class TransactionTagDailyRollup(db.Model):
+    """Per-day, per-tag transaction totals (a transaction counts towards each of its tags)"""
+    __tablename__ = 'transaction_tag_daily_rollups'
+    __table_args__ = (
+        db.Index('ix_transaction_tag_daily_rollups_date_type', 'date', 'type'),
+    )
+    
+    context_id = db.Column(db.Integer, db.ForeignKey('contexts.id', ondelete='CASCADE'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    type = db.Column(db.String(20), primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True)
+    total_amount = db.Column(db.Float, nullable=False, default=0)
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ContextVersion(db.Model):
+    """Change counter per context, bumped on every write to the context or its items (see changes.py)"""
+    __tablename__ = 'context_versions'
+    
+    # No foreign key: id 0 versions the context list itself, and a deleted
+    # context keeps its counter so a reused id never repeats an old ETag
+    context_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class SchemaMigration(db.Model):
+    """Revisions applied by the migration runner (see migrations.py)"""
+    __tablename__ = 'schema_migrations'
+
+    revision = db.Column(db.String(32), primary_key=True)
+    description = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class Idea(db.Model):
     __tablename__ = 'ideas'
+    __table_args__ = (
+        # Per-context note lists, newest first
+        db.Index('ix_ideas_context_id_created_at', 'context_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    context_id = db.Column(db.Integer, db.ForeignKey('contexts.id'), nullable=False)
+    context_id = db.Column(db.Integer, db.ForeignKey('contexts.id', ondelete='CASCADE'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     tags = db.Column(db.JSON, default=list)
@@ -118,7 +233,9 @@ class Idea(db.Model):
     
     # Relationships
     context = db.relationship('Context', back_populates='ideas')
+    tag_objects = db.relationship('Tag', secondary=idea_tags, passive_deletes=True)
     
+    @traced
     def to_dict(self):
         return {
             'id': self.id,
@@ -133,9 +250,15 @@ class Idea(db.Model):
 
 class Event(db.Model):
     __tablename__ = 'events'
+    __table_args__ = (
+        # Finds recurring series still active in a window without scanning every series
+        db.Index('ix_events_recurring_start_date_recurrence_end', 'recurring', 'start_date', 'recurrence_end_date'),
+        # Per-context calendars
+        db.Index('ix_events_context_id_start_date', 'context_id', 'start_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    context_id = db.Column(db.Integer, db.ForeignKey('contexts.id'), nullable=False)
+    context_id = db.Column(db.Integer, db.ForeignKey('contexts.id', ondelete='CASCADE'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     start_date = db.Column(db.DateTime, nullable=False)
@@ -150,8 +273,10 @@ class Event(db.Model):
     
     # Relationships
     context = db.relationship('Context', back_populates='events')
-    linked_todos = db.relationship('Todo', secondary='todo_event_links', back_populates='calendar_events')
+    linked_todos = db.relationship('Todo', secondary='todo_event_links', back_populates='calendar_events', passive_deletes=True)
+    tag_objects = db.relationship('Tag', secondary=event_tags, passive_deletes=True)
     
+    @traced
     def to_dict(self):
         duration_hours = None
         if self.all_day:
@@ -182,3 +307,219 @@ class Event(db.Model):
             'linkedTodoId': self.linked_todos[0].id if self.linked_todos else None,
             'durationHours': duration_hours
         }
+
+
+# ============================================================================
+# FOREIGN KEYS
+# ============================================================================
+
+# Deleting a context (or an item) relies on ON DELETE CASCADE. SQLite only
+# enforces foreign keys, cascades included, when enabled per connection.
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys = ON')
+        cursor.close()
+
+
+# ============================================================================
+# EVENT PERIOD INDEX
+# ============================================================================
+
+# Calendar windows select events whose period [start, end] overlaps the
+# window (start <= window_end AND end > window_start). A missing end counts
+# as one hour, like Event.to_dict. PostgreSQL serves the overlap from a GiST
+# index on a tsrange expression. SQLite keeps an R*Tree of each event's
+# period in whole minutes, maintained by triggers, and re-checks the exact
+# bounds on the candidate rows.
+DEFAULT_EVENT_LENGTH = timedelta(hours=1)
+
+
+def event_period_expression():
+    effective_end = db.func.greatest(
+        Event.start_date,
+        db.func.coalesce(Event.end_date, Event.start_date + literal_column("INTERVAL '1 hour'"))
+    )
+    return db.func.tsrange(Event.start_date, effective_end, literal_column("'[]'"))
+
+
+db.Index('ix_events_period', event_period_expression(), postgresql_using='gist').ddl_if(dialect='postgresql')
+
+events_period_rtree = table('events_period_rtree', column('id'), column('period_start'), column('period_end'))
+
+SQLITE_PERIOD_MINUTES = """
+    CAST(strftime('%s', {row}.start_date) AS INTEGER) / 60,
+    (MAX(
+        CAST(strftime('%s', {row}.start_date) AS INTEGER),
+        CAST(strftime('%s', COALESCE({row}.end_date, datetime({row}.start_date, '+1 hour'))) AS INTEGER)
+    ) + 59) / 60
+"""
+
+SQLITE_PERIOD_DDL = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS events_period_rtree USING rtree_i32(id, period_start, period_end)',
+    f"""CREATE TRIGGER IF NOT EXISTS events_period_insert AFTER INSERT ON events BEGIN
+        INSERT OR REPLACE INTO events_period_rtree VALUES (NEW.id, {SQLITE_PERIOD_MINUTES.format(row='NEW')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS events_period_update AFTER UPDATE OF start_date, end_date ON events BEGIN
+        INSERT OR REPLACE INTO events_period_rtree VALUES (NEW.id, {SQLITE_PERIOD_MINUTES.format(row='NEW')});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS events_period_delete AFTER DELETE ON events BEGIN
+        DELETE FROM events_period_rtree WHERE id = OLD.id;
+    END""",
+]
+
+for statement in SQLITE_PERIOD_DDL:
+    # DDL() %-formats its text, so escape strftime's '%s'
+    event.listen(Event.__table__, 'after_create', DDL(statement.replace('%', '%%')).execute_if(dialect='sqlite'))
+event.listen(Event.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS events_period_rtree').execute_if(dialect='sqlite'))
+
+
+def epoch_minutes(value):
+    """Minutes since 1970-01-01 of a datetime's wall-clock fields (matches SQLite strftime('%s'))"""
+    return timegm(value.timetuple()) // 60
+
+
+def event_window_clause(dialect_name, window_start=None, window_end=None):
+    """SQL condition selecting events that overlap the window; either bound may be None"""
+    if window_start is None and window_end is None:
+        return None
+
+    if dialect_name == 'postgresql':
+        window = db.func.tsrange(
+            db.cast(window_start, db.DateTime),
+            db.cast(window_end, db.DateTime),
+            literal_column("'(]'")
+        )
+        return event_period_expression().op('&&')(window)
+
+    conditions = []
+    if window_end is not None:
+        conditions.append(Event.start_date <= window_end)
+    if window_start is not None:
+        # Effective end is GREATEST(start, COALESCE(end, start + 1 hour)), as in the tsrange
+        conditions.append(or_(
+            Event.start_date > window_start,
+            Event.end_date > window_start,
+            and_(Event.end_date.is_(None), Event.start_date > window_start - DEFAULT_EVENT_LENGTH)
+        ))
+
+    if dialect_name == 'sqlite':
+        # Coarse R*Tree probe (whole minutes, so a superset); the conditions above are exact
+        candidates = select(events_period_rtree.c.id)
+        if window_end is not None:
+            candidates = candidates.where(events_period_rtree.c.period_start <= epoch_minutes(window_end))
+        if window_start is not None:
+            candidates = candidates.where(events_period_rtree.c.period_end >= epoch_minutes(window_start))
+        conditions.append(Event.id.in_(candidates))
+
+    return and_(*conditions)
+
+
+# ============================================================================
+# TAG INDEX
+# ============================================================================
+
+# The JSON `tags` column stays the API's source of truth; the normalized
+# tags/*_tags tables mirror it so tag filters and aggregations run in SQL.
+TAGGED_MODELS = (Transaction, Todo, Idea, Event)
+
+
+def normalize_tag_names(tags):
+    """Clean a tag list into unique, non-empty names, preserving order"""
+    if isinstance(tags, str):
+        tags = [tags]
+    if not isinstance(tags, (list, tuple)):
+        return []
+
+    names = []
+    for tag in tags:
+        if not isinstance(tag, str):
+            continue
+        name = tag.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def sync_tag_index(session, objects):
+    """Point each object's tag_objects at Tag rows matching its JSON tags, creating missing tags"""
+    wanted = {obj: normalize_tag_names(obj.tags) for obj in objects}
+    all_names = {name for names in wanted.values() for name in names}
+
+    tags_by_name = {}
+    if all_names:
+        with session.no_autoflush:
+            insert_missing_tags(session, all_names)
+            existing = session.query(Tag).filter(Tag.name.in_(all_names)).all()
+        tags_by_name = {tag.name: tag for tag in existing}
+
+    for obj, names in wanted.items():
+        obj.tag_objects = [tags_by_name[name] for name in names]
+
+
+@event.listens_for(Session, 'before_flush')
+def keep_tag_index_in_sync(session, flush_context, instances):
+    changed = []
+    for obj in session.new:
+        if isinstance(obj, TAGGED_MODELS) and obj.tags:
+            changed.append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, TAGGED_MODELS) and inspect(obj).attrs.tags.history.has_changes():
+            changed.append(obj)
+    if changed:
+        sync_tag_index(session, changed)
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def insert_missing_tags(session, names):
+    """
+    Create Tag rows for the names that have none with INSERT ... ON CONFLICT DO NOTHING,
+    so concurrent writers creating the same tag both succeed.
+    """
+    if not names:
+        return
+    insert = UPSERT_DIALECTS[session.get_bind().dialect.name]
+    session.execute(
+        insert(Tag.__table__).on_conflict_do_nothing(index_elements=['name']),
+        [{'name': name} for name in sorted(names)]
+    )
+
+
+@lru_cache(maxsize=None)
+def upsert_increment_statement(dialect_name, table, key_columns, increment_columns):
+    """INSERT ... ON CONFLICT DO UPDATE adding the increment columns; built once per shape"""
+    stmt = UPSERT_DIALECTS[dialect_name](table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={column: table.c[column] + stmt.excluded[column] for column in increment_columns}
+    )
+
+
+def upsert_increment(session, table, key_values, increments):
+    """
+    Insert a row, or atomically add `increments` to the existing row with the same key.
+    Works on PostgreSQL and SQLite via INSERT ... ON CONFLICT DO UPDATE.
+    """
+    upsert_increment_many(session, table, tuple(key_values), tuple(increments), [{**key_values, **increments}])
+
+
+def upsert_increment_many(session, table, key_columns, increment_columns, rows):
+    """upsert_increment for many rows in one executemany (keys must be unique within `rows`)"""
+    if not rows:
+        return
+    if hasattr(table, '__table__'):
+        table = table.__table__
+    stmt = upsert_increment_statement(
+        session.get_bind().dialect.name, table, tuple(key_columns), tuple(increment_columns)
+    )
+    session.execute(stmt, rows)
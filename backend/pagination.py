@@ -0,0 +1,132 @@
+"""
+Keyset pagination and streamed JSON for the large list endpoints.
+
+Lists are ordered by (sort column, id). With ?limit=N a response holds at
+most N rows plus a nextCursor ("<sort value>,<id>", null on the last
+page); pass it back as ?after= to continue. Keyset filters use a row-value
+comparison, so every page is an index range scan no matter how deep.
+
+With ?stream=true the body is written as JSON array chunks while rows are
+fetched from a server-side cursor (yield_per), so memory stays flat for
+exports of any size. The body has the same shape as the buffered one.
+
+Lists that are not built from one ordered query (expanded recurring events)
+reject these params with a 400 rather than ignoring them; see
+pagination_requested().
+"""
+
+import json
+from datetime import date, datetime
+
+from flask import Response, jsonify, stream_with_context
+from sqlalchemy import tuple_
+
+STREAM_BATCH_SIZE = 500
+PAGINATION_PARAMS = ('after', 'limit', 'stream')
+
+
+class InvalidPageParams(ValueError):
+    pass
+
+
+def pagination_requested(args):
+    """True if any of the after/limit/stream params is present"""
+    return any(args.get(param) not in (None, '') for param in PAGINATION_PARAMS)
+
+
+def parse_cursor(value, sort_column):
+    """Split an `after` cursor into (sort value, id)"""
+    try:
+        raw_value, raw_id = value.rsplit(',', 1)
+        python_type = sort_column.type.python_type
+        if python_type is datetime:
+            sort_value = datetime.fromisoformat(raw_value)
+        elif python_type is date:
+            sort_value = date.fromisoformat(raw_value)
+        else:
+            sort_value = raw_value
+        return sort_value, int(raw_id)
+    except (TypeError, ValueError):
+        raise InvalidPageParams(f'Invalid after cursor: {value}')
+
+
+def parse_limit(value, maximum=None):
+    if not value:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise InvalidPageParams(f'Invalid limit: {value}')
+    if maximum is not None and limit > maximum:
+        raise InvalidPageParams(f'Invalid limit: {value} (at most {maximum})')
+    return limit
+
+
+def make_cursor(sort_value, row_id):
+    return f'{sort_value.isoformat()},{row_id}'
+
+
+def apply_keyset(query, model, sort_column, descending, args):
+    """Order by (sort_column, id) and skip past the `after` cursor"""
+    key = tuple_(sort_column, model.id)
+    after = args.get('after')
+    if after:
+        sort_value, row_id = parse_cursor(after, sort_column)
+        query = query.filter(key < (sort_value, row_id) if descending else key > (sort_value, row_id))
+    if descending:
+        return query.order_by(sort_column.desc(), model.id.desc())
+    return query.order_by(sort_column, model.id)
+
+
+def stream_rows(query, serialize):
+    """Yield the {"success", "data", "count"} body one batch of rows at a time"""
+    yield '{"success": true, "data": ['
+    count = 0
+    batch = []
+    rows = query.session.scalars(query.statement, execution_options={'yield_per': STREAM_BATCH_SIZE})
+    for row in rows:
+        batch.append(json.dumps(serialize(row)))
+        count += 1
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield (',' if count > len(batch) else '') + ','.join(batch)
+            batch = []
+    if batch:
+        yield (',' if count > len(batch) else '') + ','.join(batch)
+    yield f'], "count": {count}}}'
+
+
+def list_response(query, model, sort_column, serialize, args, descending=False):
+    """Respond with the rows of `query`, honouring the after/limit/stream params"""
+    try:
+        query = apply_keyset(query, model, sort_column, descending, args)
+        limit = parse_limit(args.get('limit'))
+    except InvalidPageParams as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    if str(args.get('stream', '')).strip().lower() in ('1', 'true', 'yes'):
+        if limit is not None:
+            query = query.limit(limit)
+        return Response(stream_with_context(stream_rows(query, serialize)), mimetype='application/json')
+
+    if limit is None:
+        rows = query.all()
+        return jsonify({
+            'success': True,
+            'data': [serialize(row) for row in rows],
+            'count': len(rows)
+        }), 200
+
+    rows = query.limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and page:
+        last = page[-1]
+        next_cursor = make_cursor(getattr(last, sort_column.key), last.id)
+    return jsonify({
+        'success': True,
+        'data': [serialize(row) for row in page],
+        'count': len(page),
+        'nextCursor': next_cursor
+    }), 200
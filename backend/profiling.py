@@ -0,0 +1,206 @@
+"""
+Opt-in per-request profiling.
+
+With PROFILING_ENABLED=1 and a PROFILING_TOKEN set, any request carrying
+?__profile=1 and the token in the X-Profile-Token header runs its handler
+under cProfile. Instead of the handler's response it gets back a JSON
+summary: total time, the time spent in ORM hydration, model to_dict()
+calls, SQL, date parsing (strptime/fromisoformat) and JSON encoding, and
+the functions with the most own time. ?__profile=pstats returns the raw capture as a
+pstats file instead; collapse_profile.py turns saved files into collapsed
+stacks for flame graphs.
+
+The capture starts after the other before_request hooks and stops before
+the other after_request hooks, so it covers the view (including jsonify)
+and bypasses the response cache. Only one request per process is
+profiled at a time; a second one gets 409. Streamed responses
+(/api/export) are captured up to their first byte only.
+
+cProfile records caller/callee pairs, not full stacks, so collapsed stacks
+are rebuilt from the call graph, splitting a function's time between its
+callers in proportion to the time each caller spent in it. The breakdown
+is computed from those stacks, so nested calls within a category
+(Context.to_dict calling Todo.to_dict) are counted once. The categories
+overlap each other: ORM hydration includes the SQL of the loads it
+triggers.
+"""
+
+import cProfile
+import hmac
+import marshal
+import os
+import pstats
+import threading
+
+from flask import g, jsonify, request
+
+PROFILE_PARAM = '__profile'
+TOKEN_HEADER = 'X-Profile-Token'
+PROFILE_MODES = ('1', 'pstats')
+TOP_FUNCTIONS = 25
+MIN_STACK_SECONDS = 1e-6
+
+# cProfile hooks the interpreter, so one capture per process at a time
+_capturing = threading.Lock()
+
+
+def in_package(filename, *parts):
+    return filename.replace(os.sep, '/').endswith('/'.join(parts))
+
+
+BREAKDOWN_CATEGORIES = (
+    ('sql', lambda filename, name: in_package(filename, 'sqlalchemy', 'engine', 'default.py')
+        and name in ('do_execute', 'do_executemany', 'do_execute_no_params')),
+    ('ormHydration', lambda filename, name: in_package(filename, 'sqlalchemy', 'orm', 'loading.py')
+        and name == 'instances'),
+    ('toDict', lambda filename, name: name == 'to_dict' and in_package(filename, 'models.py')),
+    ('dateParsing', lambda filename, name: 'strptime' in name or 'fromisoformat' in name),
+    ('jsonEncoding', lambda filename, name: '/json/' in filename.replace(os.sep, '/')
+        and name in ('dumps', 'encode', 'iterencode')),
+)
+
+
+def function_label(func):
+    """'name (file.py:line)' for Python functions, the bare name for builtins"""
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f'{name} ({os.path.basename(filename)}:{line})'
+
+
+def collapsed_stacks(stats):
+    """{(func, ...) root first: seconds} rebuilt from the caller/callee edges of a pstats.Stats"""
+    entries = stats.stats  # func -> (primitive calls, calls, own time, cumulative time, {caller: edge})
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            # edge = (primitive calls, calls, own time, cumulative time) of func when called from caller
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    stacks = {}
+
+    def add(stack, seconds):
+        if seconds >= MIN_STACK_SECONDS:
+            stacks[stack] = stacks.get(stack, 0.0) + seconds
+
+    def walk(func, stack, seconds):
+        stack = stack + (func,)
+        entry = entries.get(func)
+        if entry is None:
+            # A frame that was already running when the capture started: only its callees were seen
+            scale = 1.0
+        else:
+            own, cumulative = entry[2], entry[3]
+            scale = seconds / cumulative if cumulative else 0.0
+            add(stack, own * scale)
+        for callee, callee_seconds in callees.get(func, ()):
+            # Recursion shows up as an edge back into the stack; its time is already counted
+            if callee not in stack and callee_seconds * scale >= MIN_STACK_SECONDS:
+                walk(callee, stack, callee_seconds * scale)
+
+    roots = [func for func, entry in entries.items() if not entry[4]]
+    roots += [caller for caller in callees if caller not in entries]
+    for root in roots:
+        entry = entries.get(root)
+        walk(root, (), entry[3] if entry is not None else 0.0)
+    return stacks
+
+
+def format_collapsed(stacks):
+    """Collapsed-stack lines ('frame;frame;frame count', count in microseconds) for flamegraph.pl/speedscope"""
+    lines = []
+    for stack, seconds in sorted(stacks.items(), key=lambda item: item[0]):
+        microseconds = round(seconds * 1_000_000)
+        if microseconds:
+            lines.append(';'.join(function_label(func).replace(';', ',') for func in stack) + f' {microseconds}')
+    return lines
+
+
+def breakdown(stacks):
+    """Milliseconds per BREAKDOWN_CATEGORIES entry; a stack counts once per category it passes through"""
+    totals = {name: 0.0 for name, _ in BREAKDOWN_CATEGORIES}
+    for stack, seconds in stacks.items():
+        for name, matches in BREAKDOWN_CATEGORIES:
+            if any(matches(filename, function) for filename, _, function in stack):
+                totals[name] += seconds
+    return {name: round(seconds * 1000, 3) for name, seconds in totals.items()}
+
+
+def summarize(stats, status):
+    stacks = collapsed_stacks(stats)
+    top = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:TOP_FUNCTIONS]
+    return {
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'path': request.path,
+        'status': status,
+        'totalMs': round(stats.total_tt * 1000, 3),
+        'breakdownMs': breakdown(stacks),
+        'top': [{
+            'function': function_label(func),
+            'calls': calls,
+            'ownMs': round(own * 1000, 3),
+            'cumulativeMs': round(cumulative * 1000, 3)
+        } for func, (_, calls, own, cumulative, _) in top]
+    }
+
+
+def is_profiling():
+    """True while the current request's handler runs under the profiler"""
+    return g.get('profiler') is not None
+
+
+def stop_profiler():
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        _capturing.release()
+    return profiler
+
+
+def init_profiling(app):
+    """Answer ?__profile requests with a capture of their handler; register after the other hooks"""
+    if app.config.get('PROFILING_ENABLED') and not app.config.get('PROFILING_TOKEN'):
+        app.logger.warning('PROFILING_ENABLED is set without PROFILING_TOKEN; profiling stays off')
+
+    @app.before_request
+    def start_profiler():
+        mode = request.args.get(PROFILE_PARAM)
+        token = app.config.get('PROFILING_TOKEN')
+        if mode is None or not app.config.get('PROFILING_ENABLED') or not token:
+            return None
+        if not hmac.compare_digest(request.headers.get(TOKEN_HEADER, '').encode(), token.encode()):
+            return jsonify({'success': False, 'message': 'Invalid profiling token'}), 403
+        if mode not in PROFILE_MODES:
+            return jsonify({
+                'success': False,
+                'message': f"{PROFILE_PARAM} must be one of: {', '.join(PROFILE_MODES)}"
+            }), 400
+        if not _capturing.acquire(blocking=False):
+            return jsonify({'success': False, 'message': 'Another request is being profiled'}), 409
+
+        g.profile_mode = mode
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+        return None
+
+    @app.after_request
+    def return_profile(response):
+        profiler = stop_profiler()
+        if profiler is None:
+            return response
+
+        stats = pstats.Stats(profiler)
+        if g.profile_mode == 'pstats':
+            filename = f"{request.endpoint or 'unmatched'}.pstats"
+            return app.response_class(
+                marshal.dumps(stats.stats),
+                mimetype='application/octet-stream',
+                headers={'Content-Disposition': f'attachment; filename={filename}'}
+            )
+        return jsonify({'success': True, 'data': summarize(stats, response.status_code)})
+
+    @app.teardown_request
+    def release_profiler(exception=None):
+        # after_request does not run when the response could not be built
+        stop_profiler()
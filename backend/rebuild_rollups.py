@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Rebuild Transaction Rollups
+Recomputes transaction_daily_rollups and transaction_tag_daily_rollups from
+the transactions table (creating the tables first if they are missing).
+Pass a context id to rebuild just that context.
+"""
+
+import os
+import sys
+from app import app
+from models import db, TransactionDailyRollup
+from rollups import rebuild_rollups
+
+
+def main():
+    print("\n" + "="*60)
+    print("🗄️  Second Brain - Rebuild Transaction Rollups")
+    print("="*60 + "\n")
+
+    if not os.getenv('DATABASE_URL'):
+        print("❌ ERROR: DATABASE_URL environment variable not set!")
+        print("   Please create a .env file with your database URL")
+        return
+
+    context_id = int(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    with app.app_context():
+        try:
+            db.create_all()
+            rebuild_rollups(context_id)
+            db.session.commit()
+            rows = TransactionDailyRollup.query.count()
+            print(f"✅ Rollups rebuilt ({rows} daily rows)")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Rebuild failed: {str(e)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
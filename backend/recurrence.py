@@ -0,0 +1,110 @@
+"""
+Recurring event expansion.
+
+A recurring event is stored once as a series (start/end of the first
+occurrence plus recurrence_type and an optional inclusive
+recurrence_end_date). expand_event() materializes the occurrences that
+overlap a window. Occurrence starts are computed per calendar month and
+memoized; the cache key includes every field that shapes the series, so
+editing an event simply misses the cache instead of needing invalidation.
+
+Monthly and yearly series follow RFC 5545: months without the start day
+(e.g. the 31st) and non-leap years for Feb 29 are skipped, not clamped.
+"""
+
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+RECURRENCE_STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(days=7),
+}
+RECURRENCE_TYPES = ('daily', 'weekly', 'monthly', 'yearly')
+DEFAULT_EVENT_DURATION = timedelta(hours=1)
+MONTH_CACHE_SIZE = 8192
+
+
+def overlaps(start, end, window_start, window_end):
+    """True if [start, end] intersects the window; an event ending exactly at window_start does not count
+    (the same predicate as models.event_window_clause)"""
+    return start <= window_end and end > window_start
+
+
+def shift_months(value, months):
+    """Move a datetime by whole months, or return None if the day does not exist in the target month"""
+    month_index = value.month - 1 + months
+    try:
+        return value.replace(year=value.year + month_index // 12, month=month_index % 12 + 1)
+    except ValueError:
+        return None
+
+
+def iter_months(start, end):
+    """Yield (year, month) for every calendar month from start to end inclusive"""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+@lru_cache(maxsize=MONTH_CACHE_SIZE)
+def month_occurrence_starts(series_start, recurrence_type, recurrence_end_date, year, month):
+    """Start datetimes of a series' occurrences that begin within one calendar month"""
+    month_start = datetime(year, month, 1)
+    limit = shift_months(month_start, 1)
+    if recurrence_end_date:
+        limit = min(limit, datetime.combine(recurrence_end_date + timedelta(days=1), datetime.min.time()))
+    if series_start >= limit:
+        return ()
+
+    starts = []
+    step = RECURRENCE_STEPS.get(recurrence_type)
+    if step:
+        # Index of the first occurrence on or after the start of the month
+        index = max(0, -((series_start - month_start) // step))
+        occurrence = series_start + index * step
+        while occurrence < limit:
+            starts.append(occurrence)
+            occurrence += step
+    elif recurrence_type == 'monthly':
+        offset = (year - series_start.year) * 12 + month - series_start.month
+        occurrence = shift_months(series_start, offset) if offset >= 0 else None
+        if occurrence and occurrence < limit:
+            starts.append(occurrence)
+    elif recurrence_type == 'yearly':
+        if month == series_start.month and year >= series_start.year:
+            occurrence = shift_months(series_start, (year - series_start.year) * 12)
+            if occurrence and occurrence < limit:
+                starts.append(occurrence)
+
+    return tuple(starts)
+
+
+def get_event_span(event):
+    """Duration of a single occurrence of the event"""
+    if event.end_date and event.end_date >= event.start_date:
+        return event.end_date - event.start_date
+    return DEFAULT_EVENT_DURATION
+
+
+def is_recurring_series(event):
+    return bool(event.recurring) and event.recurrence_type in RECURRENCE_TYPES
+
+
+def expand_event(event, window_start, window_end):
+    """Return (start, end) pairs for every occurrence of `event` that overlaps the window"""
+    span = get_event_span(event)
+    if not is_recurring_series(event):
+        start, end = event.start_date, event.start_date + span
+        return [(start, end)] if overlaps(start, end, window_start, window_end) else []
+
+    occurrences = []
+    # Occurrences starting up to one span before the window can still run into it
+    for year, month in iter_months(max(window_start - span, event.start_date), window_end):
+        for start in month_occurrence_starts(
+            event.start_date, event.recurrence_type, event.recurrence_end_date, year, month
+        ):
+            end = start + span
+            if overlaps(start, end, window_start, window_end):
+                occurrences.append((start, end))
+    return occurrences
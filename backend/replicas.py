@@ -0,0 +1,242 @@
+"""
+Read-replica routing.
+
+DATABASE_REPLICA_URLS takes a comma-separated list of database URLs; each
+gets an engine with the same SQLALCHEMY_ENGINE_OPTIONS as the primary,
+pool_pre_ping included. (They are not Flask-SQLAlchemy binds, so
+db.create_all() and friends never touch them.) GET and HEAD
+requests pick a replica round-robin and db.session sends their SELECTs to
+it. Everything else goes to the primary: non-GET requests, DML and
+SELECT ... FOR UPDATE, raw SQL, and every statement after a flush in the
+same request.
+
+Read-after-write: a context written within the lag window (REPLICA_MAX_LAG
+plus REPLICA_CHECK_INTERVAL seconds) has its reads served by the primary.
+Commits of other workers are included, through the same on_commit
+callbacks the response cache invalidates from. Requests that are not
+scoped to one context fall back to the primary after any write, and all
+requests do after a context is created or deleted.
+
+A replica is skipped while its measured lag is over REPLICA_MAX_LAG, and
+for REPLICA_RETRY_DELAY seconds after it fails a lag check or drops a
+connection. With no usable replica, reads go to the primary.
+"""
+
+import itertools
+import threading
+import time
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+
+DEFAULT_MAX_LAG = 5
+DEFAULT_CHECK_INTERVAL = 2
+DEFAULT_RETRY_DELAY = 10
+# changes.CONTEXT_LIST_SCOPE: a change to the context list (a context created or deleted)
+CONTEXT_LIST_SCOPE = 0
+
+PG_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def parse_replica_urls(value):
+    """URLs of a comma-separated DATABASE_REPLICA_URLS value"""
+    return [url.strip() for url in (value or '').split(',') if url.strip()]
+
+
+def measure_replica_lag(engine):
+    """Seconds the replica is behind its primary (0 when caught up or not a standby), None if unknown"""
+    with engine.connect() as connection:
+        if engine.dialect.name != 'postgresql':
+            connection.execute(text('SELECT 1'))
+            return 0.0
+        lag = connection.execute(PG_LAG_QUERY).scalar()
+    return None if lag is None else float(lag)
+
+
+def current_replica():
+    """The replica engine the current request reads from, or None for the primary"""
+    if not has_app_context():
+        return None
+    return g.get('replica_engine')
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends plain SELECTs of a replica-routed request to its replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and getattr(clause, 'is_select', False) \
+                and getattr(clause, '_for_update_arg', None) is None:
+            engine = current_replica()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def read_from_primary_after_flush(session, flush_context, instances):
+    # The request has written; it must see its own writes from here on
+    if has_app_context():
+        g.pop('replica_engine', None)
+
+
+class Replica:
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.lag = None
+        self.checked_at = None
+        self.down_until = 0.0
+        self.error = None
+
+
+class ReplicaSet:
+    """Round-robin over the healthy replicas, with per-context read-after-write tracking"""
+
+    def __init__(self, engines, logger, max_lag=DEFAULT_MAX_LAG, check_interval=DEFAULT_CHECK_INTERVAL,
+                 retry_delay=DEFAULT_RETRY_DELAY, measure_lag=measure_replica_lag, clock=time.monotonic):
+        self.replicas = [Replica(name, engine) for name, engine in engines]
+        self.logger = logger
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_delay = retry_delay
+        self.measure_lag = measure_lag
+        self.clock = clock
+        self.window = max_lag + check_interval
+        self._written_at = {}  # context_id -> time of its last committed change
+        self._last_write = None
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(('replica_reads', 'primary_reads', 'recent_write_reads', 'failures'), 0)
+
+        for replica in self.replicas:
+            event.listen(replica.engine, 'handle_error', self._on_error(replica))
+
+    def _on_error(self, replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                self.mark_down(replica, context.original_exception)
+        return handle_error
+
+    def mark_down(self, replica, error):
+        with self._lock:
+            replica.down_until = self.clock() + self.retry_delay
+            replica.error = str(error)
+            self._counters['failures'] += 1
+        self.logger.warning(f'Read replica {replica.name} unavailable, reading from the primary: {error}')
+
+    def note_changes(self, changes):
+        """on_commit callback: remember which contexts were just written"""
+        now = self.clock()
+        with self._lock:
+            self._last_write = now
+            for _, context_id in changes:
+                self._written_at[context_id] = now
+            for context_id, written_at in list(self._written_at.items()):
+                if now - written_at > self.window:
+                    del self._written_at[context_id]
+
+    def recently_written(self, context_id=None):
+        now = self.clock()
+        with self._lock:
+            if context_id is None:
+                written_at = [self._last_write]
+            else:
+                written_at = [self._written_at.get(context_id), self._written_at.get(CONTEXT_LIST_SCOPE)]
+        return any(at is not None and now - at <= self.window for at in written_at)
+
+    def choose(self, context_id=None):
+        """Engine for a read of context_id (None: not scoped to one context), or None for the primary"""
+        if not self.replicas:
+            return None
+        if self.recently_written(context_id):
+            self._count('recent_write_reads')
+            return None
+        start = next(self._next)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if self._usable(replica):
+                self._count('replica_reads')
+                return replica.engine
+        self._count('primary_reads')
+        return None
+
+    def _usable(self, replica):
+        now = self.clock()
+        if replica.down_until > now:
+            return False
+        if replica.checked_at is None or now - replica.checked_at >= self.check_interval:
+            replica.checked_at = now
+            try:
+                replica.lag = self.measure_lag(replica.engine)
+            except Exception as e:
+                self.mark_down(replica, e)
+                return False
+            replica.error = None
+        return replica.lag is not None and replica.lag <= self.max_lag
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            now = self.clock()
+            return {
+                **self._counters,
+                'max_lag_seconds': self.max_lag,
+                'replicas': [
+                    {
+                        'name': replica.name,
+                        'lag_seconds': replica.lag,
+                        'available': replica.down_until <= now,
+                        'error': replica.error,
+                    }
+                    for replica in self.replicas
+                ],
+            }
+
+
+def context_scope():
+    """The context a request reads, from the context_id view arg or the contextId query param"""
+    context_id = (request.view_args or {}).get('context_id') or request.args.get('contextId')
+    try:
+        return int(context_id) if context_id is not None else None
+    except ValueError:
+        return None
+
+
+def init_read_replicas(app):
+    """Route GET reads to the replicas in DATABASE_REPLICA_URLS, if any"""
+    # Imported here: changes imports models, which imports this module for RoutingSession
+    from changes import on_commit
+
+    urls = app.config.get('DATABASE_REPLICA_URLS') or []
+    if urls:
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        app.extensions['read_replicas'] = ReplicaSet(
+            [(f'replica_{index}', create_engine(url, **options)) for index, url in enumerate(urls)],
+            app.logger,
+            max_lag=app.config.get('REPLICA_MAX_LAG', DEFAULT_MAX_LAG),
+            check_interval=app.config.get('REPLICA_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL),
+            retry_delay=app.config.get('REPLICA_RETRY_DELAY', DEFAULT_RETRY_DELAY)
+        )
+
+    def note_replica_changes(changes):
+        replicas = app.extensions.get('read_replicas')
+        if replicas is not None:
+            replicas.note_changes(changes)
+
+    on_commit(app, note_replica_changes)
+
+    @app.before_request
+    def route_reads_to_replica():
+        replicas = app.extensions.get('read_replicas')
+        if replicas is not None and request.method in ('GET', 'HEAD'):
+            g.replica_engine = replicas.choose(context_scope())
+
+    return app.extensions.get('read_replicas')
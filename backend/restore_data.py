@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Restore All Data
+Loads an export written by export_data.py (or GET /api/export) into the
+database, keeping every id. The tables are created if missing. The
+database must be empty unless --replace is given, which deletes the current
+data first. Everything is restored in one transaction.
+
+    python restore_data.py backup.ndjson.gz [--replace]
+"""
+
+import gzip
+import os
+import sys
+import time
+from app import app
+from models import db
+from backup import RestoreError, restore_backup
+
+
+def open_backup(path):
+    """Open a plain or gzip-compressed export as text"""
+    with open(path, 'rb') as probe:
+        compressed = probe.read(2) == b'\x1f\x8b'
+    if compressed:
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def main():
+    print("\n" + "="*60)
+    print("🗄️  Second Brain - Restore Data")
+    print("="*60 + "\n")
+
+    if not os.getenv('DATABASE_URL'):
+        print("❌ ERROR: DATABASE_URL environment variable not set!")
+        print("   Please create a .env file with your database URL")
+        return
+
+    args = [arg for arg in sys.argv[1:] if arg != '--replace']
+    if len(args) != 1:
+        print("Usage: python restore_data.py <file.ndjson[.gz]> [--replace]")
+        sys.exit(1)
+
+    with app.app_context():
+        try:
+            started = time.perf_counter()
+            db.create_all()
+            with open_backup(args[0]) as lines:
+                counts = restore_backup(lines, replace='--replace' in sys.argv)
+            db.session.commit()
+            for table, count in counts.items():
+                print(f"   ✓ {table}: {count} rows")
+            print(f"\n✅ Restore completed in {time.perf_counter() - started:.1f}s")
+        except RestoreError as e:
+            db.session.rollback()
+            print(f"❌ Cannot restore: {str(e)}")
+            sys.exit(1)
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Restore failed: {str(e)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
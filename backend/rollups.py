@@ -0,0 +1,215 @@
+"""
+Daily transaction rollups.
+
+transaction_daily_rollups holds one row per (context, date, type) and
+transaction_tag_daily_rollups one row per (context, date, type, tag).
+Session flush hooks keep them in step with every ORM write to a
+Transaction, in the same database transaction as the write, so the stats
+endpoints only ever read pre-aggregated rows: before the flush the stored
+state of each updated or deleted transaction is read, after it the stored
+state of each new or updated one, and the difference is applied with one
+upsert per table. Bulk Core inserts (the importer) bypass the hooks and
+apply a RollupDelta themselves. rebuild_rollups() recomputes both tables
+from scratch under a share lock on transactions; backfill_rollups() adds
+one id range at a time without locking, for the schema migration.
+"""
+
+from collections import namedtuple
+from sqlalchemy import event, exists, inspect, select
+from sqlalchemy.orm import Session
+
+from models import (
+    db, Context, Transaction, TransactionDailyRollup, TransactionTagDailyRollup,
+    transaction_tags, upsert_increment_many
+)
+
+TransactionSnapshot = namedtuple('TransactionSnapshot', 'context_id date type amount tag_ids')
+
+ROLLUP_ATTRIBUTES = ('context_id', 'date', 'type', 'amount', 'tag_objects')
+PENDING_ROLLUPS_KEY = 'pending_rollup_changes'
+SNAPSHOT_BATCH_SIZE = 500
+
+
+class RollupDelta:
+    """Accumulates the contribution of many transactions, then applies it with one executemany per table"""
+
+    def __init__(self):
+        self.daily = {}
+        self.per_tag = {}
+        self.emptied = set()
+
+    def add(self, snapshot, sign=1):
+        """Add (sign=1) or remove (sign=-1) one transaction's contribution"""
+        key = (snapshot.context_id, snapshot.date, snapshot.type)
+        amount = snapshot.amount * sign
+        total, count, untagged = self.daily.get(key, (0, 0, 0))
+        self.daily[key] = (total + amount, count + sign, untagged + (0 if snapshot.tag_ids else amount))
+        for tag_id in snapshot.tag_ids:
+            tag_total, tag_count = self.per_tag.get(key + (tag_id,), (0, 0))
+            self.per_tag[key + (tag_id,)] = (tag_total + amount, tag_count + sign)
+        if sign < 0:
+            self.emptied.add(key)
+
+    def apply(self, session=None):
+        session = session or db.session
+        upsert_increment_many(
+            session, TransactionDailyRollup,
+            ('context_id', 'date', 'type'), ('total_amount', 'transaction_count', 'untagged_amount'),
+            [
+                {'context_id': context_id, 'date': day, 'type': transaction_type,
+                 'total_amount': amount, 'transaction_count': count, 'untagged_amount': untagged}
+                for (context_id, day, transaction_type), (amount, count, untagged) in self.daily.items()
+                if amount or count or untagged
+            ]
+        )
+        upsert_increment_many(
+            session, TransactionTagDailyRollup,
+            ('context_id', 'date', 'type', 'tag_id'), ('total_amount', 'transaction_count'),
+            [
+                {'context_id': context_id, 'date': day, 'type': transaction_type, 'tag_id': tag_id,
+                 'total_amount': amount, 'transaction_count': count}
+                for (context_id, day, transaction_type, tag_id), (amount, count) in self.per_tag.items()
+                if amount or count
+            ]
+        )
+        for key in sorted(self.emptied):
+            _delete_empty_rows(session, *key)
+        self.daily.clear()
+        self.per_tag.clear()
+        self.emptied.clear()
+
+
+def load_snapshots(session, transaction_ids):
+    """{id: TransactionSnapshot} of the stored rows of the given transactions"""
+    table = Transaction.__table__
+    ids = sorted(transaction_ids)
+    snapshots = {}
+    for start in range(0, len(ids), SNAPSHOT_BATCH_SIZE):
+        batch = ids[start:start + SNAPSHOT_BATCH_SIZE]
+        tag_ids = {}
+        for transaction_id, tag_id in session.execute(
+            select(transaction_tags.c.transaction_id, transaction_tags.c.tag_id)
+            .where(transaction_tags.c.transaction_id.in_(batch))
+        ):
+            tag_ids.setdefault(transaction_id, []).append(tag_id)
+        for row in session.execute(
+            select(table.c.id, table.c.context_id, table.c.date, table.c.type, table.c.amount)
+            .where(table.c.id.in_(batch))
+        ):
+            snapshots[row.id] = TransactionSnapshot(
+                row.context_id, row.date, row.type, row.amount or 0, tuple(sorted(tag_ids.get(row.id, ())))
+            )
+    return snapshots
+
+
+def _delete_empty_rows(session, context_id, day, transaction_type):
+    for model in (TransactionDailyRollup, TransactionTagDailyRollup):
+        session.execute(
+            db.delete(model).where(
+                model.context_id == context_id,
+                model.date == day,
+                model.type == transaction_type,
+                model.transaction_count <= 0
+            )
+        )
+
+
+@event.listens_for(Session, 'before_flush')
+def read_previous_rollup_snapshots(session, flush_context, instances):
+    # Registered after models.keep_tag_index_in_sync, so tag_objects already reflect the JSON tags
+    session.info.pop(PENDING_ROLLUPS_KEY, None)
+    changed = {
+        obj.id for obj in session.dirty
+        if isinstance(obj, Transaction)
+        and any(inspect(obj).attrs[name].history.has_changes() for name in ROLLUP_ATTRIBUTES)
+    }
+    deleted = {obj.id for obj in session.deleted if isinstance(obj, Transaction) and obj.id is not None}
+    has_new = any(isinstance(obj, Transaction) for obj in session.new)
+    if not (changed or deleted or has_new):
+        return
+    # Rollup rows of a deleted context go with it (ON DELETE CASCADE)
+    deleted_contexts = {obj.id for obj in session.deleted if isinstance(obj, Context)}
+    session.info[PENDING_ROLLUPS_KEY] = (load_snapshots(session, changed | deleted), changed - deleted, deleted_contexts)
+
+
+@event.listens_for(Session, 'after_flush')
+def apply_rollup_changes(session, flush_context):
+    pending = session.info.pop(PENDING_ROLLUPS_KEY, None)
+    if pending is None:
+        return
+    previous, changed, deleted_contexts = pending
+    new = {obj.id for obj in session.new if isinstance(obj, Transaction)}
+
+    delta = RollupDelta()
+    for snapshot in previous.values():
+        if snapshot.context_id not in deleted_contexts:
+            delta.add(snapshot, -1)
+    for snapshot in load_snapshots(session, new | changed).values():
+        delta.add(snapshot, 1)
+    delta.apply(session)
+
+
+def backfill_rollups(session, low, high):
+    """Add the transactions with ids from low to high to the rollups; returns how many there were"""
+    table = Transaction.__table__
+    ids = session.scalars(select(table.c.id).where(table.c.id.between(low, high))).all()
+    delta = RollupDelta()
+    for snapshot in load_snapshots(session, ids).values():
+        delta.add(snapshot)
+    delta.apply(session)
+    return len(ids)
+
+
+def rebuild_rollups(context_id=None):
+    """Recompute the rollups from the transactions table, for one context or all of them"""
+    session = db.session
+    if session.get_bind().dialect.name == 'postgresql':
+        # Hold off concurrent transaction writes so no increment lands between delete and insert
+        session.execute(db.text('LOCK TABLE transactions IN SHARE MODE'))
+
+    for model in (TransactionDailyRollup, TransactionTagDailyRollup):
+        stmt = db.delete(model)
+        if context_id is not None:
+            stmt = stmt.where(model.context_id == context_id)
+        session.execute(stmt)
+
+    has_tags = exists().where(transaction_tags.c.transaction_id == Transaction.id)
+    daily = (
+        select(
+            Transaction.context_id,
+            Transaction.date,
+            Transaction.type,
+            db.func.sum(Transaction.amount),
+            db.func.count(Transaction.id),
+            db.func.sum(db.case((has_tags, 0), else_=Transaction.amount)),
+        )
+        .group_by(Transaction.context_id, Transaction.date, Transaction.type)
+    )
+    per_tag = (
+        select(
+            Transaction.context_id,
+            Transaction.date,
+            Transaction.type,
+            transaction_tags.c.tag_id,
+            db.func.sum(Transaction.amount),
+            db.func.count(Transaction.id),
+        )
+        .join(transaction_tags, transaction_tags.c.transaction_id == Transaction.id)
+        .group_by(Transaction.context_id, Transaction.date, Transaction.type, transaction_tags.c.tag_id)
+    )
+    if context_id is not None:
+        daily = daily.where(Transaction.context_id == context_id)
+        per_tag = per_tag.where(Transaction.context_id == context_id)
+
+    session.execute(
+        db.insert(TransactionDailyRollup).from_select(
+            ['context_id', 'date', 'type', 'total_amount', 'transaction_count', 'untagged_amount'],
+            daily
+        )
+    )
+    session.execute(
+        db.insert(TransactionTagDailyRollup).from_select(
+            ['context_id', 'date', 'type', 'tag_id', 'total_amount', 'transaction_count'],
+            per_tag
+        )
+    )
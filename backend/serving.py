@@ -0,0 +1,45 @@
+"""
+Per-worker process hooks for serving the app with gunicorn (see gunicorn.conf.py).
+
+With preload_app the app, and with it every engine, is built once in the
+gunicorn master and inherited by forked workers. A pooled connection must
+never be shared across processes, so after_fork() discards the inherited
+pools without closing their connections (which belong to the master) and
+each worker opens its own. The invalidation listener thread does not
+survive a fork either; it restarts itself in each worker on the first
+request (invalidation.InvalidationListener.ensure_running).
+
+shutdown() runs when a worker exits, after gunicorn has let in-flight
+requests finish (graceful_timeout): it stops the listener and closes the
+worker's pooled connections, so PostgreSQL sees clean disconnects. The
+listener may be blocked in select() for a while, so it gets a short join
+timeout; it is a daemon thread and its connection closes with the process.
+"""
+
+from models import db
+
+
+def app_engines(app):
+    """{name: engine} for the primary (and any bind engines) and the read replicas of an app"""
+    with app.app_context():
+        engines = {key or 'primary': engine for key, engine in db.engines.items()}
+    replicas = app.extensions.get('read_replicas')
+    if replicas is not None:
+        engines.update((replica.name, replica.engine) for replica in replicas.replicas)
+    return engines
+
+
+def after_fork(app):
+    """Give a freshly forked worker its own connection pools and an empty response cache"""
+    for engine in app_engines(app).values():
+        engine.dispose(close=False)
+    app.extensions['response_cache'].clear()
+
+
+def shutdown(app, timeout=1):
+    """Stop the worker's background listener and close its pooled connections"""
+    listener = app.extensions.get('invalidation_listener')
+    if listener is not None:
+        listener.stop(timeout)
+    for engine in app_engines(app).values():
+        engine.dispose()
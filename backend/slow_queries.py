@@ -0,0 +1,243 @@
+"""
+Slow-query log.
+
+Every statement on the app's engines (primary and replicas) is timed with
+before/after_cursor_execute. One that takes SLOW_QUERY_MS or longer is
+logged as a warning with its duration, the engine, the route of the request
+that ran it, and the shapes of its bound parameters (types and lengths,
+never the values). SLOW_QUERY_MS=0 turns the log off.
+
+With SLOW_QUERY_EXPLAIN=1, a slow plain-read SELECT on PostgreSQL is re-run
+under EXPLAIN (ANALYZE, BUFFERS) and the plan is written to SLOW_QUERY_LOG_FILE,
+a rotating file (SLOW_QUERY_LOG_MAX_BYTES, SLOW_QUERY_LOG_BACKUPS) that
+also receives the warnings; without a file the plans are logged with them.
+The EXPLAIN runs on a separate connection in a background thread, one at a
+time, inside a rolled-back transaction with a statement timeout. Each
+distinct statement is explained at most once per
+SLOW_QUERY_EXPLAIN_INTERVAL seconds, so a hot slow query does not double
+the load it already causes. ANALYZE executes the statement, so only
+SELECTs without a locking clause (FOR UPDATE/SHARE) that call nothing but
+the functions in READ_ONLY_CALLS are analyzed; other SELECTs (setval,
+pg_advisory_lock, pg_notify...) get a plain EXPLAIN, which only plans
+them. Other statements are never explained.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from datetime import date, datetime
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+DEFAULT_THRESHOLD_MS = 500
+DEFAULT_EXPLAIN_INTERVAL = 300
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+EXPLAIN_TIMEOUT_MS = 30_000
+STATEMENT_PREVIEW_CHARS = 1000
+MAX_TRACKED_STATEMENTS = 1000
+
+# Keywords that can precede a parenthesis, and functions without side effects
+READ_ONLY_CALLS = frozenset('''
+    select from where and or not in exists any all some on join using as over filter within values
+    case when then else end by union intersect except lateral
+    cast coalesce nullif greatest least extract date_trunc date lower upper length trim abs round
+    count sum min max avg array_agg string_agg json_agg jsonb_agg bool_and bool_or
+    row_number rank dense_rank tsrange tstzrange daterange
+'''.split())
+CALL_PATTERN = re.compile(r'(\w+)\s*\(')
+LOCKING_CLAUSE = re.compile(r'\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE|KEY\s+SHARE)\b', re.IGNORECASE)
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+
+def value_shape(value):
+    """Type of a bound parameter, with the length for strings and collections"""
+    if isinstance(value, (str, bytes, list, tuple, dict, set)):
+        return f'{type(value).__name__}[{len(value)}]'
+    if isinstance(value, (datetime, date)):
+        return type(value).__name__
+    return type(value).__name__ if value is not None else 'null'
+
+
+def parameter_shapes(parameters):
+    if isinstance(parameters, dict):
+        return {name: value_shape(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [value_shape(value) for value in parameters]
+    return value_shape(parameters)
+
+
+def explain_options(statement):
+    """EXPLAIN options for a slow statement: ANALYZE only for plain reads, None for anything but SELECT"""
+    if not statement.lstrip().upper().startswith('SELECT'):
+        return None
+    code = STRING_LITERAL.sub("''", statement)
+    calls = {name.lower() for name in CALL_PATTERN.findall(code)}
+    if LOCKING_CLAUSE.search(code) or not calls <= READ_ONLY_CALLS:
+        return ''
+    return '(ANALYZE, BUFFERS) '
+
+
+def current_route():
+    if not has_request_context():
+        return '-'
+    return f'{request.method} {request.path} ({request.endpoint or "unmatched"})'
+
+
+def preview(statement):
+    text = ' '.join(statement.split())
+    return text if len(text) <= STATEMENT_PREVIEW_CHARS else text[:STATEMENT_PREVIEW_CHARS] + '...'
+
+
+class SlowQueryLog:
+    """Logs statements at or over threshold_ms and optionally captures their PostgreSQL plans"""
+
+    def __init__(self, threshold_ms, logger, plan_logger=None, explain=False,
+                 explain_interval=DEFAULT_EXPLAIN_INTERVAL, clock=time.monotonic):
+        self.threshold = threshold_ms / 1000
+        self.logger = logger
+        self.plan_logger = plan_logger or logger
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.clock = clock
+        self._explained_at = {}  # statement -> clock time of its last EXPLAIN
+        self._explaining = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, engine_name, engine, statement, parameters, seconds, executemany):
+        if seconds < self.threshold:
+            return
+        shapes = f'{len(parameters)} parameter sets' if executemany else parameter_shapes(parameters)
+        self.logger.warning(
+            f'Slow query: {seconds * 1000:.1f} ms on {engine_name} for {current_route()} '
+            f'params={shapes}: {preview(statement)}'
+        )
+        if self.explain and not executemany and engine.dialect.name == 'postgresql':
+            options = explain_options(statement)
+            if options is not None and self._should_explain(statement):
+                self._start_explain(engine_name, engine, statement, parameters, seconds, options)
+
+    def _should_explain(self, statement):
+        now = self.clock()
+        with self._lock:
+            last = self._explained_at.get(statement)
+            if last is not None and now - last < self.explain_interval:
+                return False
+            if len(self._explained_at) >= MAX_TRACKED_STATEMENTS:
+                self._explained_at = {
+                    known: at for known, at in self._explained_at.items() if now - at < self.explain_interval
+                }
+            self._explained_at[statement] = now
+        return True
+
+    def _start_explain(self, engine_name, engine, statement, parameters, seconds, options):
+        # One EXPLAIN at a time; a slow query arriving meanwhile is only logged
+        if not self._explaining.acquire(blocking=False):
+            return
+        route = current_route()
+        self._thread = threading.Thread(
+            target=self._explain, args=(engine_name, engine, statement, parameters, seconds, route, options),
+            name='slow-query-explain', daemon=True
+        )
+        self._thread.start()
+
+    def _explain(self, engine_name, engine, statement, parameters, seconds, route, options):
+        try:
+            with engine.connect() as connection:
+                transaction = connection.begin()
+                try:
+                    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+                    rows = connection.exec_driver_sql(f'EXPLAIN {options}{statement}', parameters)
+                    plan = '\n'.join(row[0] for row in rows)
+                finally:
+                    transaction.rollback()
+            kind = 'Plan' if options else 'Estimated plan (not analyzed)'
+            self.plan_logger.info(
+                f'{kind} of slow query ({seconds * 1000:.1f} ms on {engine_name} for {route}):\n'
+                f'{" ".join(statement.split())}\n{plan}'
+            )
+        except Exception as e:
+            self.logger.warning(f'Could not EXPLAIN slow query: {str(e)}')
+        finally:
+            self._explaining.release()
+
+    def wait(self, timeout=None):
+        """Wait for a running EXPLAIN to finish"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+def make_loggers(app, log_file, max_bytes, backups):
+    """
+    (logger, plan_logger): warnings go through the app logger's handlers and, if configured,
+    the rotating file; plans go to the file only (or along with the warnings without one)
+    """
+    logger = app.logger.getChild('slow_queries')
+    logger.setLevel(logging.INFO)
+    plan_logger = logger.getChild('plans')
+    if not log_file:
+        return logger, plan_logger
+
+    path = os.path.abspath(log_file)
+    handler = next((handler for handler in logger.handlers if getattr(handler, 'baseFilename', None) == path), None)
+    if handler is None:
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+        handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s pid=%(process)d: %(message)s'))
+        logger.addHandler(handler)
+    plan_logger.propagate = False
+    if handler not in plan_logger.handlers:
+        plan_logger.addHandler(handler)
+    return logger, plan_logger
+
+
+def init_slow_query_log(app, engines):
+    """Time the statements of the given {name: engine} into app.extensions['slow_query_log']"""
+    threshold_ms = app.config.get('SLOW_QUERY_MS', DEFAULT_THRESHOLD_MS)
+    if not threshold_ms:
+        return None
+
+    logger, plan_logger = make_loggers(
+        app,
+        app.config.get('SLOW_QUERY_LOG_FILE'),
+        app.config.get('SLOW_QUERY_LOG_MAX_BYTES', DEFAULT_MAX_BYTES),
+        app.config.get('SLOW_QUERY_LOG_BACKUPS', DEFAULT_BACKUPS)
+    )
+    app.extensions['slow_query_log'] = SlowQueryLog(
+        threshold_ms,
+        logger,
+        plan_logger,
+        explain=app.config.get('SLOW_QUERY_EXPLAIN', False),
+        explain_interval=app.config.get('SLOW_QUERY_EXPLAIN_INTERVAL', DEFAULT_EXPLAIN_INTERVAL)
+    )
+
+    for name, engine in engines.items():
+        listen_for_slow_queries(app, name, engine)
+    return app.extensions['slow_query_log']
+
+
+def listen_for_slow_queries(app, name, engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_slow_query_timer(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault('slow_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def check_slow_query(connection, cursor, statement, parameters, context, executemany):
+        started = connection.info.get('slow_query_started')
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+        slow_query_log = app.extensions.get('slow_query_log')
+        if slow_query_log is not None:
+            slow_query_log.record(name, engine, statement, parameters, seconds, executemany)
+
+    @event.listens_for(engine, 'handle_error')
+    def discard_slow_query_timer(context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get('slow_query_started') if context.connection is not None else None
+        if started and context.statement is not None:
+            started.pop()
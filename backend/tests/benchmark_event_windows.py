@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Event Window Benchmark
+Seeds a large events table and times calendar window lookups through the
+period index (models.event_window_clause) against the same overlap
+predicate evaluated as a plain scan. Not collected by pytest; run it
+directly, optionally with TEST_DATABASE_URL pointing at PostgreSQL:
+
+    python tests/benchmark_event_windows.py [event_count]
+"""
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from support import app, reset_database
+from models import db, Context, Event, event_window_clause
+
+DEFAULT_EVENT_COUNT = 100_000
+SPAN_DAYS = 5 * 365
+REPEATS = 20
+WINDOWS = {
+    'week': timedelta(days=7),
+    'month': timedelta(days=31),
+    'year': timedelta(days=365),
+}
+
+
+def seed(count):
+    rng = random.Random(7)
+    context = Context(name='Benchmark')
+    db.session.add(context)
+    db.session.flush()
+
+    origin = datetime(2021, 1, 1)
+    rows = []
+    for _ in range(count):
+        start = origin + timedelta(minutes=rng.randint(0, SPAN_DAYS * 24 * 60))
+        # Mostly short meetings, some multi-day trips, a few legacy rows without an end
+        roll = rng.random()
+        if roll < 0.02:
+            end = None
+        elif roll < 0.07:
+            end = start + timedelta(days=rng.randint(1, 14))
+        else:
+            end = start + timedelta(minutes=rng.choice([15, 30, 60, 90, 120]))
+        rows.append({
+            'context_id': context.id, 'title': 'Event', 'description': '',
+            'start_date': start, 'end_date': end, 'all_day': False, 'tags': [],
+            'recurring': False, 'completed': False
+        })
+    db.session.execute(db.insert(Event), rows)
+    db.session.commit()
+    return origin
+
+
+def scan_clause(window_start, window_end):
+    """The overlap predicate with no index support"""
+    effective_end = db.func.coalesce(Event.end_date, Event.start_date)
+    return db.and_(Event.start_date <= window_end, effective_end > window_start)
+
+
+def time_query(clause):
+    statement = db.select(Event.id).where(clause)
+    ids = db.session.execute(statement).scalars().all()
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        db.session.execute(statement).scalars().all()
+    return len(ids), (time.perf_counter() - started) / REPEATS * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_EVENT_COUNT
+    reset_database()
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        print(f"Seeding {count} events on {dialect}...")
+        started = time.perf_counter()
+        origin = seed(count)
+        print(f"   seeded in {time.perf_counter() - started:.1f}s")
+        if dialect == 'postgresql':
+            db.session.execute(db.text('ANALYZE events'))
+            db.session.commit()
+
+        window_start = origin + timedelta(days=SPAN_DAYS // 2)
+        print(f"\n{'window':<8}{'rows':>8}{'indexed ms':>14}{'scan ms':>12}")
+        for name, length in WINDOWS.items():
+            window_end = window_start + length
+            rows, indexed = time_query(event_window_clause(dialect, window_start, window_end))
+            scan_rows, scan = time_query(scan_clause(window_start, window_end))
+            marker = '' if rows >= scan_rows else '  (row count mismatch!)'
+            print(f"{name:<8}{rows:>8}{indexed:>14.2f}{scan:>12.2f}{marker}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Serving Load Test
+Seeds a database, then starts the API twice, once on the development server
+(`flask run --debug`, the same server `python app.py` starts) and once under
+gunicorn with gunicorn.conf.py. Each is driven with concurrent keep-alive
+clients over a mix of list, calendar, stats and home requests for a fixed
+time, and throughput and latency percentiles are reported. Not collected by
+pytest. The servers need a database they can share, so it defaults to a
+temporary SQLite file; point TEST_DATABASE_URL at PostgreSQL for realistic
+numbers:
+
+    python tests/benchmark_serving.py [seconds] [clients]
+
+Gunicorn settings come from the usual environment variables
+(WEB_CONCURRENCY, GUNICORN_THREADS, ...; see gunicorn.conf.py).
+
+Measured on PostgreSQL 16 with a single CPU shared by the database, the
+server and the load generator (20 s, 16 clients, 10,000 rows per table):
+
+    server                          req/s    p50 ms   p95 ms   p99 ms
+    dev (flask run --debug)          51.5     262.3    689.5   1292.6
+    gunicorn, 1 worker x 4 threads   69.1     173.9    638.6    954.6
+    gunicorn, 3 workers x 4 threads  58.0     172.5    998.6   1505.9
+
+Handlers are CPU-bound Python, so on one core extra workers only add
+contention. Throughput scales with WEB_CONCURRENCY up to the number of cores
+available, which the development server cannot use at all.
+"""
+
+import http.client
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, time as day_time, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not os.getenv('TEST_DATABASE_URL'):
+    os.environ['TEST_DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'serving.db')}"
+
+from support import app, reset_database  # noqa: E402
+from models import db, Context, Event, Idea, Todo, Transaction  # noqa: E402
+from rollups import rebuild_rollups  # noqa: E402
+
+DEFAULT_SECONDS = 20
+DEFAULT_CLIENTS = 16
+CONTEXT_COUNT = 5
+ROWS_PER_CONTEXT = 2000
+STARTUP_TIMEOUT = 30
+
+
+def seed():
+    rng = random.Random(5)
+    today = date.today()
+    created = datetime.combine(today - timedelta(days=400), day_time())
+    with app.app_context():
+        session = db.session
+        session.execute(Context.__table__.insert(), [
+            {'id': context_id, 'name': f'Context {context_id}', 'created_at': created}
+            for context_id in range(1, CONTEXT_COUNT + 1)
+        ])
+        rows = {Transaction: [], Todo: [], Idea: [], Event: []}
+        for context_id in range(1, CONTEXT_COUNT + 1):
+            for _ in range(ROWS_PER_CONTEXT):
+                day = today - timedelta(days=rng.randint(0, 365))
+                rows[Transaction].append({
+                    'context_id': context_id, 'type': rng.choice(['income', 'expense']),
+                    'amount': rng.randint(1, 500), 'description': 'Seeded', 'tags': [], 'date': day,
+                    'created_at': created,
+                })
+                rows[Todo].append({
+                    'context_id': context_id, 'title': 'Seeded', 'status': rng.choice(['todo', 'done']),
+                    'priority': 'medium', 'tags': [], 'created_at': created,
+                    'due_date': today + timedelta(days=rng.randint(-30, 30)),
+                })
+                rows[Idea].append({'context_id': context_id, 'title': 'Seeded', 'tags': [], 'created_at': created})
+                start = datetime.combine(day, day_time(9))
+                rows[Event].append({
+                    'context_id': context_id, 'title': 'Seeded', 'start_date': start,
+                    'end_date': start + timedelta(hours=1), 'all_day': False, 'tags': [],
+                    'completed': False, 'recurring': False, 'created_at': created,
+                })
+        for model, model_rows in rows.items():
+            session.execute(model.__table__.insert(), model_rows)
+        rebuild_rollups()
+        session.commit()
+
+
+def request_paths():
+    today = date.today()
+    window = f'from={today - timedelta(days=7)}&to={today + timedelta(days=7)}'
+    paths = ['/api/contexts', '/api/home', '/api/todos/overdue?limit=20', f'/api/events?{window}']
+    for context_id in range(1, CONTEXT_COUNT + 1):
+        paths += [
+            f'/api/contexts/{context_id}/transactions?range=month&limit=50',
+            f'/api/contexts/{context_id}/todos?limit=50',
+            f'/api/contexts/{context_id}/events?{window}',
+            f'/api/stats/summary?contextId={context_id}&range=month',
+        ]
+    return paths
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port):
+    env = dict(os.environ, DATABASE_URL=os.environ['TEST_DATABASE_URL'], PORT=str(port))
+    if kind == 'dev':
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--debug', '--port', str(port)]
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    process = subprocess.Popen(
+        command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'{kind} server did not start on port {port}')
+
+
+def stop_server(process):
+    # The dev server's reloader and gunicorn's workers are children; signal the whole group
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(15)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def drive(port, seconds, clients):
+    """Run `clients` keep-alive clients for `seconds`; returns (latencies in ms, errors)"""
+    paths = request_paths()
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(seed_value):
+        rng = random.Random(seed_value)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine, failed = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', rng.choice(paths))
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            mine.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SECONDS
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CLIENTS
+    reset_database()
+    with app.app_context():
+        print(f"Seeding {CONTEXT_COUNT * ROWS_PER_CONTEXT} rows per table on {db.engine.dialect.name}...")
+    seed()
+
+    results = []
+    for kind in ('dev', 'gunicorn'):
+        port = free_port()
+        process = start_server(kind, port)
+        try:
+            drive(port, 2, clients)  # warm up pools and caches
+            latencies, errors = drive(port, seconds, clients)
+        finally:
+            stop_server(process)
+        results.append((kind, len(latencies) / seconds, latencies, errors))
+
+    print(f"\n{clients} clients, {seconds} s per server")
+    print(f"{'server':<10}{'req/s':>8}{'p50 ms':>10}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}")
+    for kind, throughput, latencies, errors in results:
+        print(
+            f"{kind:<10}{throughput:>8.1f}{percentile(latencies, 0.5):>10.1f}"
+            f"{percentile(latencies, 0.95):>9.1f}{percentile(latencies, 0.99):>9.1f}{errors:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Transaction Import Benchmark
+Generates a CSV statement and times /api/transactions/import, first into
+an empty context and then re-importing the same file (all duplicates).
+Not collected by pytest; run it directly, optionally with
+TEST_DATABASE_URL pointing at PostgreSQL:
+
+    python tests/benchmark_transaction_import.py [row_count]
+"""
+
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from support import app, reset_database
+from models import db
+
+DEFAULT_ROW_COUNT = 100_000
+
+
+def build_csv(count):
+    rng = random.Random(11)
+    start = date(2024, 1, 1)
+    lines = ['date,amount,description,tags']
+    for index in range(count):
+        day = start + timedelta(days=rng.randint(0, 365))
+        amount = round(rng.uniform(-300, 120), 2) or 1
+        tags = rng.choice(['', 'food', 'rent', 'travel;work'])
+        lines.append(f'{day.isoformat()},{amount},Statement line {index},{tags}')
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROW_COUNT
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Benchmark'}).get_json()['data']['id']
+    body = build_csv(count)
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    print(f"Importing {count} rows ({len(body) / 1e6:.1f} MB) on {dialect}...")
+
+    for label in ('fresh', 're-import'):
+        started = time.perf_counter()
+        response = client.post(f'/api/transactions/import?contextId={context_id}', data=body, content_type='text/csv')
+        elapsed = time.perf_counter() - started
+        report = response.get_json()['data']
+        print(f"   {label:<10} {elapsed:6.2f}s  imported={report['imported']} duplicates={report['duplicates']}")
+
+
+if __name__ == '__main__':
+    main()
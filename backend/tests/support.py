@@ -0,0 +1,55 @@
+"""
+Shared setup for the in-process API tests.
+
+These tests drive the Flask app through its test client against a throwaway
+database (in-memory SQLite unless TEST_DATABASE_URL is set), so they run
+without a live server. Each file can be run directly or collected by pytest.
+"""
+
+import os
+import sys
+import traceback
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Must be set before the app module reads DATABASE_URL
+os.environ['DATABASE_URL'] = os.getenv('TEST_DATABASE_URL', 'sqlite://')
+
+from app import app  # noqa: E402
+from models import db  # noqa: E402
+
+
+def reset_database():
+    """Recreate every table and return a fresh test client"""
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+    app.extensions['response_cache'].clear()
+    return app.test_client()
+
+
+def print_test(name, passed, message=""):
+    status = "✅ PASS" if passed else "❌ FAIL"
+    print(f"{status} - {name}")
+    if message:
+        print(f"   {message}")
+    print()
+
+
+def run_tests(namespace):
+    """Run every test_* function in a module namespace and exit non-zero on failure"""
+    tests = [(name, fn) for name, fn in namespace.items() if name.startswith('test_') and callable(fn)]
+    failures = 0
+    for name, fn in tests:
+        try:
+            fn()
+            print_test(name, True)
+        except Exception:
+            failures += 1
+            print_test(name, False, traceback.format_exc())
+
+    print(f"📊 Test Summary: {len(tests) - failures}/{len(tests)} passed")
+    sys.exit(1 if failures else 0)
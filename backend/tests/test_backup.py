@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Backup Tests
+Exports a seeded database through /api/export (plain and gzip), restores
+it into an empty database and checks that ids, links, tags and the stats
+all come back; also checks that bad or truncated files are rejected
+without writing anything.
+"""
+
+import gzip
+import json
+
+from support import app, reset_database, run_tests
+from backup import RestoreError, restore_backup
+from models import db, Context
+
+LISTINGS = [
+    '/api/contexts',
+    '/api/transactions?range=all',
+    '/api/events',
+    '/api/stats/summary?range=all',
+    '/api/stats/by-tag?range=all',
+]
+
+
+def seed(client):
+    home = client.post('/api/contexts', json={'name': 'Home', 'emoji': 'Heart'}).get_json()['data']['id']
+    work = client.post('/api/contexts', json={'name': 'Work'}).get_json()['data']['id']
+    # Leave a gap in the ids so preserving them is observable
+    client.delete(f"/api/contexts/{client.post('/api/contexts', json={'name': 'Gone'}).get_json()['data']['id']}")
+    for index in range(12):
+        client.post('/api/transactions', json={
+            'contextId': home if index % 2 else work, 'type': 'expense' if index % 3 else 'income',
+            'amount': 10 + index, 'date': f'2025-03-{index + 1:02d}', 'tags': ['food'] if index % 4 else []
+        })
+    todo_id = client.post('/api/todos', json={
+        'contextId': home, 'title': 'Pay rent', 'dueDate': '2025-03-05', 'tags': ['bills']
+    }).get_json()['data']['id']
+    client.post(f'/api/todos/{todo_id}/add-to-calendar', json={'startDate': '2025-03-05T10:00:00'})
+    client.post(f'/api/contexts/{work}/notes', json={'title': 'Idea', 'content': 'Body', 'tags': ['later']})
+    client.post('/api/events', json={
+        'contextId': work, 'title': 'Standup', 'startDate': '2025-03-03T09:00:00',
+        'recurring': True, 'recurrenceType': 'weekly'
+    })
+    return home, work
+
+
+def snapshot(client, home, work):
+    urls = LISTINGS + [
+        f'/api/contexts/{home}/todos', f'/api/contexts/{work}/notes', f'/api/contexts/{home}/overview'
+    ]
+    return {url: client.get(url).get_json()['data'] for url in urls}
+
+
+def test_export_restore_round_trip():
+    for compress in (False, True):
+        client = reset_database()
+        home, work = seed(client)
+        before = snapshot(client, home, work)
+
+        response = client.get(f'/api/export?gzip={str(compress).lower()}')
+        assert response.status_code == 200
+        body = response.get_data()
+        text = gzip.decompress(body).decode() if compress else body.decode()
+        lines = text.splitlines(keepends=True)
+        assert json.loads(lines[-1])['counts']['todo_event_links'] == 1
+
+        client = reset_database()
+        with app.app_context():
+            counts = restore_backup(lines)
+            db.session.commit()
+        assert counts['transactions'] == 12 and counts['contexts'] == 2
+        assert snapshot(client, home, work) == before
+
+        # New rows get ids past the restored ones
+        new_id = client.post('/api/contexts', json={'name': 'New'}).get_json()['data']['id']
+        assert new_id > max(home, work)
+
+
+def test_restore_rejects_bad_files_without_writing():
+    client = reset_database()
+    home, work = seed(client)
+    lines = client.get('/api/export').get_data(as_text=True).splitlines(keepends=True)
+
+    with app.app_context():
+        try:
+            restore_backup(lines)
+            assert False, 'restored into a non-empty database'
+        except RestoreError:
+            db.session.rollback()
+
+    reset_database()
+    for bad in (lines[:-1], ['{"format": "other"}\n'] + lines[1:], []):
+        with app.app_context():
+            try:
+                restore_backup(bad)
+                assert False, 'restored a bad file'
+            except RestoreError:
+                db.session.rollback()
+            assert Context.query.count() == 0
+
+    # replace overwrites what is there
+    with app.app_context():
+        restore_backup(lines)
+        db.session.commit()
+        restore_backup(lines, replace=True)
+        db.session.commit()
+        assert sorted(context.id for context in Context.query) == [home, work]
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Conditional GET Tests
+Checks that the list endpoints answer If-None-Match with 304 until a write
+touches their context, and that a 304 only reads context_versions.
+"""
+
+from support import app, reset_database, run_tests
+from models import db
+from sqlalchemy import event
+
+
+def setup_contexts(client):
+    first = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    second = client.post('/api/contexts', json={'name': 'Work'}).get_json()['data']['id']
+    return first, second
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={'If-None-Match': etag})
+
+
+def test_unchanged_list_returns_304_without_entity_queries():
+    client = reset_database()
+    first, _ = setup_contexts(client)
+    client.post('/api/todos', json={'contextId': first, 'title': 'Call plumber'})
+
+    url = f'/api/contexts/{first}/todos'
+    response = client.get(url)
+    assert response.status_code == 200 and response.headers['ETag']
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        cached = revalidate(client, url, response.headers['ETag'])
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert cached.status_code == 304 and cached.data == b''
+    assert cached.headers['ETag'] == response.headers['ETag']
+    assert len(statements) == 1 and 'context_versions' in statements[0]
+
+
+def test_writes_invalidate_only_their_context():
+    client = reset_database()
+    first, second = setup_contexts(client)
+    urls = [f'/api/contexts/{first}/{kind}' for kind in ('todos', 'notes', 'events', 'transactions')]
+    etags = {url: client.get(url).headers['ETag'] for url in urls}
+    other_etag = client.get(f'/api/contexts/{second}/todos').headers['ETag']
+
+    client.post(f'/api/contexts/{first}/notes', json={'title': 'Idea', 'content': 'Draft'})
+    client.post('/api/transactions', json={'contextId': first, 'type': 'expense', 'amount': 5, 'date': '2025-01-01'})
+
+    for url, etag in etags.items():
+        assert revalidate(client, url, etag).status_code == 200, url
+    assert revalidate(client, f'/api/contexts/{second}/todos', other_etag).status_code == 304
+
+    # Different query strings never share an ETag
+    assert client.get(urls[0]).headers['ETag'] != client.get(urls[0] + '?tag=x').headers['ETag']
+
+
+def test_calendar_links_and_context_edits_invalidate():
+    client = reset_database()
+    first, second = setup_contexts(client)
+    todo = client.post('/api/todos', json={'contextId': first, 'title': 'Plan', 'dueDate': '2025-03-01'}).get_json()['data']
+
+    def etags(context_id):
+        return [client.get(f'/api/contexts/{context_id}/{kind}').headers['ETag'] for kind in ('todos', 'events')]
+
+    before, other = etags(first), etags(second)
+    linked = client.post(f"/api/todos/{todo['id']}/add-to-calendar", json={'date': '2025-03-02', 'time': '09:00'})
+    assert linked.status_code in (200, 201)
+    after = etags(first)
+    assert before[0] != after[0] and before[1] != after[1]
+    assert etags(second) == other
+
+    event_id = linked.get_json()['data']['event']['id']
+    client.delete(f"/api/todos/{todo['id']}/events/{event_id}/unlink")
+    assert etags(first)[0] != after[0]
+
+    contexts_etag = client.get('/api/contexts').headers['ETag']
+    assert revalidate(client, '/api/contexts', contexts_etag).status_code == 304
+    client.put(f'/api/contexts/{second}', json={'name': 'Office'})
+    assert revalidate(client, '/api/contexts', contexts_etag).status_code == 200
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Home Page Tests
+Checks each section of /api/home: contexts in creation order, the newest
+notes first, open todos soonest due first (undated last) with their total
+count, overdue todos, events overlapping the coming week (including one in
+progress), and the notesLimit/todosLimit/eventsLimit params.
+"""
+
+from datetime import date, datetime, timedelta
+
+from support import reset_database, run_tests
+
+
+def seed(client):
+    home = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    work = client.post('/api/contexts', json={'name': 'Work'}).get_json()['data']['id']
+    for index in range(7):
+        client.post(f'/api/contexts/{home if index % 2 else work}/notes', json={'title': f'Note {index}'})
+
+    today = date.today()
+
+    def add_todo(title, due=None, **fields):
+        payload = {'contextId': home, 'title': title, **fields}
+        if due is not None:
+            payload['dueDate'] = due.strftime('%Y-%m-%d')
+        return client.post('/api/todos', json=payload).get_json()['data']['id']
+
+    add_todo('Undated')
+    add_todo('Next week', today + timedelta(days=7))
+    add_todo('Late', today - timedelta(days=2))
+    add_todo('Tomorrow', today + timedelta(days=1))
+    add_todo('Done late', today - timedelta(days=3), status='done')
+    add_todo('Very late', today - timedelta(days=5))
+    return home, work
+
+
+def test_home_sections():
+    client = reset_database()
+    seed(client)
+    response = client.get('/api/home')
+    assert response.status_code == 200
+    data = response.get_json()['data']
+
+    assert [context['name'] for context in data['contexts']] == ['Home', 'Work']
+    assert [note['title'] for note in data['recent_notes']] == [f'Note {index}' for index in (6, 5, 4, 3, 2)]
+    assert [todo['title'] for todo in data['open_todos']] == ['Very late', 'Late', 'Tomorrow', 'Next week', 'Undated']
+    assert data['open_todo_count'] == 5
+    assert [todo['title'] for todo in data['overdue_todos']] == ['Very late', 'Late']
+    assert data['upcoming_events'] == []
+
+
+def test_home_limits():
+    client = reset_database()
+    seed(client)
+    data = client.get('/api/home?notesLimit=2&todosLimit=3').get_json()['data']
+    assert [note['title'] for note in data['recent_notes']] == ['Note 6', 'Note 5']
+    assert [todo['title'] for todo in data['open_todos']] == ['Very late', 'Late', 'Tomorrow']
+    # The count covers every open todo, not just the ones returned
+    assert data['open_todo_count'] == 5
+
+
+def test_home_rejects_invalid_limits():
+    client = reset_database()
+    for query in ('notesLimit=abc', 'todosLimit=0', 'eventsLimit=-1', 'notesLimit=101', 'eventsLimit=2.5'):
+        response = client.get(f'/api/home?{query}')
+        assert response.status_code == 400, query
+        body = response.get_json()
+        assert body['success'] is False and body['message'].startswith(query.split('=')[0])
+    assert client.get('/api/home?eventsLimit=100').status_code == 200
+
+
+def test_home_lists_events_in_progress_and_the_next_few():
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Travel'}).get_json()['data']['id']
+    now = datetime.now().replace(second=0, microsecond=0)
+
+    def add(title, start, hours=None):
+        payload = {'contextId': context_id, 'title': title, 'startDate': start.isoformat()}
+        if hours:
+            payload['durationHours'] = hours
+        client.post('/api/events', json=payload)
+
+    add('Finished', now - timedelta(hours=3), hours=1)
+    add('Conference', now - timedelta(days=1), hours=48)
+    for day in range(1, 8):
+        add(f'Day {day}', now + timedelta(days=day) - timedelta(hours=1))
+    add('Next month', now + timedelta(days=30))
+
+    upcoming = client.get('/api/home').get_json()['data']['upcoming_events']
+    assert [e['title'] for e in upcoming] == ['Conference', 'Day 1', 'Day 2', 'Day 3', 'Day 4']
+    upcoming = client.get('/api/home?eventsLimit=20').get_json()['data']['upcoming_events']
+    assert [e['title'] for e in upcoming] == ['Conference'] + [f'Day {day}' for day in range(1, 8)]
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
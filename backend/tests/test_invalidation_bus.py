@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Invalidation Bus Tests
+Checks the NOTIFY payloads, and on PostgreSQL that a change announced by
+another worker evicts cached responses and that the cache degrades while
+the listener is disconnected. The PostgreSQL checks are no-ops on SQLite.
+"""
+
+import time
+
+from support import app, reset_database, run_tests
+from models import db
+from invalidation import INVALIDATION_CHANNEL, decode_change, encode_change, worker_id
+
+
+def on_postgres():
+    with app.app_context():
+        return db.engine.dialect.name == 'postgresql'
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def execute_as_other_worker(statements):
+    """Run SQL outside the app's session, like a write handled by another process"""
+    with app.app_context():
+        with db.engine.begin() as connection:
+            for statement, params in statements:
+                connection.execute(db.text(statement), params)
+
+
+def test_payload_round_trip():
+    assert decode_change(encode_change('transaction', 7)) == (worker_id(), 'transaction', 7)
+    assert decode_change('garbage') is None
+    assert decode_change('abc|todo|x') is None
+
+
+def test_remote_change_evicts_cached_stats():
+    if not on_postgres():
+        return
+    client = reset_database()
+    listener = app.extensions['invalidation_listener']
+    context_id = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    assert listener.connected.is_set()
+
+    url = f'/api/stats/summary?range=all&contextId={context_id}'
+    assert client.get(url).get_json()['data']['total_income'] == 0
+
+    execute_as_other_worker([
+        ("INSERT INTO transaction_daily_rollups (context_id, date, type, total_amount, transaction_count, untagged_amount) "
+         "VALUES (:context_id, '2025-01-01', 'income', 40, 1, 40)", {'context_id': context_id}),
+        ('SELECT pg_notify(:channel, :payload)',
+         {'channel': INVALIDATION_CHANNEL, 'payload': f'otherworker|transaction|{context_id}'}),
+    ])
+    assert wait_until(lambda: client.get(url).get_json()['data']['total_income'] == 40)
+
+
+def test_cache_degrades_while_listener_is_down():
+    if not on_postgres():
+        return
+    client = reset_database()
+    listener = app.extensions['invalidation_listener']
+    cache = app.extensions['response_cache']
+    client.get('/api/health')
+    listener.reconnect_delay = 0.5
+    assert listener.connected.is_set() and cache.degraded_ttl is None
+
+    execute_as_other_worker([('SELECT pg_terminate_backend(:pid)', {'pid': listener.backend_pid})])
+    assert wait_until(lambda: cache.degraded_ttl is not None)
+    assert cache.stats()['entries'] == 0
+    assert wait_until(lambda: listener.connected.is_set() and cache.degraded_ttl is None)
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Metrics Tests
+Drives a few endpoints and checks that /api/metrics reports them in
+Prometheus text format: per-endpoint request counts by status, latency
+histograms, SQL statement counts and time, and pool gauges.
+"""
+
+from support import app, reset_database, run_tests
+from metrics import RequestMetrics
+from models import db
+
+
+def scrape(client):
+    """{sample name with labels: value} of a /api/metrics response"""
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_metrics_report_requests_and_sql():
+    client = reset_database()
+    app.extensions['metrics'].clear()
+    context_id = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    for _ in range(3):
+        assert client.get(f'/api/contexts/{context_id}/todos').status_code == 200
+    assert client.get('/api/contexts/999/overview').status_code == 404
+    assert client.get('/api/no-such-route').status_code == 404
+
+    samples = scrape(client)
+    todos = 'endpoint="api.get_context_todos"'
+    assert samples[f'http_requests_total{{{todos},method="GET",status="200"}}'] == 3
+    assert samples['http_requests_total{endpoint="api.get_context_overview",method="GET",status="404"}'] == 1
+    assert samples['http_requests_total{endpoint="unmatched",method="GET",status="404"}'] == 1
+    assert samples['http_requests_total{endpoint="api.create_context",method="POST",status="201"}'] == 1
+
+    # Histogram buckets are cumulative and end in +Inf == count
+    assert samples[f'http_request_duration_seconds_count{{{todos},method="GET"}}'] == 3
+    assert samples[f'http_request_duration_seconds_bucket{{{todos},method="GET",le="+Inf"}}'] == 3
+    assert samples[f'http_request_duration_seconds_bucket{{{todos},method="GET",le="0.005"}}'] <= \
+        samples[f'http_request_duration_seconds_bucket{{{todos},method="GET",le="10.0"}}']
+    assert samples[f'http_request_duration_seconds_sum{{{todos},method="GET"}}'] > 0
+
+    # Each todo list request runs a fixed, non-zero number of statements
+    statements = samples[f'sql_statements_total{{{todos}}}']
+    assert statements > 0 and statements % 3 == 0
+    assert samples[f'sql_statements_per_request_count{{{todos}}}'] == 3
+    assert samples[f'sql_duration_seconds_total{{{todos}}}'] > 0
+
+    with app.app_context():
+        has_sizing_pool = hasattr(db.engine.pool, 'checkedout')
+    if has_sizing_pool:
+        assert samples['db_pool_checked_out{engine="primary"}'] >= 0
+        assert 'db_pool_overflow{engine="primary"}' in samples
+        assert samples['db_pool_size{engine="primary"}'] > 0
+
+
+def test_label_values_are_escaped():
+    metrics = RequestMetrics()
+    metrics.observe('odd"name\\x', 'GET', 200, 0.01, 1, 0.001)
+    body = metrics.render({})
+    assert 'http_requests_total{endpoint="odd\\"name\\\\x",method="GET",status="200"} 1' in body
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Migration Tests
+Strips a fresh schema back to the pre-migration layout (no tag index,
+rollups, change versions, import hash or extra indexes), adds data, and
+checks that the runner brings it up to the model schema without losing a
+row, backfills the derived tables (the rollups in batches, without locking
+transactions, picking up rows inserted meanwhile), and is a no-op when run
+again.
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import MetaData, event, inspect
+
+from support import app, reset_database, run_tests
+from migrations import REVISIONS, ROLLUP_REBUILD_NOTICE, Migrator, applied_revisions, upgrade
+from models import (
+    db, Context, Event, Transaction, TransactionDailyRollup, TransactionTagDailyRollup, transaction_tags
+)
+from rollups import rebuild_rollups
+
+ADDED_TABLES = [
+    'schema_migrations', 'context_versions', 'transaction_tag_daily_rollups', 'transaction_daily_rollups',
+    'transaction_tags', 'todo_tags', 'idea_tags', 'event_tags', 'tags',
+]
+CREATED_AT = datetime(2024, 12, 1)
+
+
+def legacy_metadata():
+    """The model schema as it was before deletes cascaded in the database"""
+    metadata = MetaData()
+    for table in db.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    for table in metadata.tables.values():
+        # Indexes are dropped below anyway (and the copies lose their dialect guards)
+        table.indexes.clear()
+        for constraint in table.foreign_key_constraints:
+            constraint.ondelete = None
+    return metadata
+
+
+def make_legacy_database():
+    """Drop everything the revisions add, then insert rows the old way (Core, no ORM listeners)"""
+    reset_database()
+    with app.app_context():
+        db.drop_all()
+        legacy_metadata().create_all(db.engine)
+        with db.engine.begin() as connection:
+            for name in ADDED_TABLES:
+                connection.execute(db.text(f'DROP TABLE {name}'))
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    connection.execute(db.text(f'DROP INDEX IF EXISTS {index.name}'))
+            connection.execute(db.text('ALTER TABLE transactions DROP COLUMN import_hash'))
+
+            connection.execute(Context.__table__.insert(), [
+                {'id': context_id, 'name': name, 'created_at': CREATED_AT}
+                for context_id, name in ((1, 'Home'), (2, 'Work'))
+            ])
+            connection.execute(db.text(
+                "INSERT INTO transactions (context_id, type, amount, description, tags, date, created_at) "
+                "VALUES (1, 'expense', :amount, 'Old', :tags, :date, :created_at)"
+            ), [
+                {'amount': index, 'tags': '["food", "home"]' if index % 2 else '[]',
+                 'date': date(2025, 1, 1 + index % 5), 'created_at': CREATED_AT}
+                for index in range(1, 26)
+            ])
+            connection.execute(db.text(
+                "INSERT INTO events (id, context_id, title, start_date, created_at) "
+                "VALUES (:id, :context_id, :title, :start, :created_at)"
+            ), [
+                {'id': 1, 'context_id': 1, 'title': 'Dentist', 'start': datetime(2025, 1, 3, 9), 'created_at': CREATED_AT},
+                {'id': 2, 'context_id': 2, 'title': 'Standup', 'start': datetime(2025, 1, 3, 10), 'created_at': CREATED_AT},
+            ])
+
+
+def run_upgrade(statements=None):
+    with app.app_context():
+        messages = []
+
+        def record_statement(connection, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        if statements is not None:
+            event.listen(db.engine, 'before_cursor_execute', record_statement)
+        try:
+            applied = upgrade(db.engine, Migrator(db.engine, batch_size=10, batch_pause=0, log=messages.append))
+        finally:
+            if statements is not None:
+                event.remove(db.engine, 'before_cursor_execute', record_statement)
+        return applied, messages
+
+
+def rollup_rows():
+    rows = []
+    for model in (TransactionDailyRollup, TransactionTagDailyRollup):
+        table = model.__table__
+        rows.append(sorted(tuple(row) for row in db.session.execute(db.select(table)).all()))
+    return rows
+
+
+def test_upgrade_brings_legacy_schema_to_models():
+    make_legacy_database()
+    statements = []
+    applied, messages = run_upgrade(statements)
+    assert applied == [revision_id for revision_id, _, _ in REVISIONS]
+    assert '   ✓ Backfilled transaction rollups in 3 batches' in messages
+    assert not any(statement.upper().startswith('LOCK TABLE') for statement in statements)
+
+    with app.app_context():
+        inspector = inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            assert inspector.has_table(table.name), table.name
+            live = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name != 'ix_events_period' or db.engine.dialect.name == 'postgresql':
+                    assert index.name in live, index.name
+        assert 'import_hash' in {column['name'] for column in inspector.get_columns('transactions')}
+
+        # Rows survived and the derived tables were backfilled from them
+        assert Transaction.query.count() == 25
+        assert db.session.execute(db.select(db.func.count()).select_from(transaction_tags)).scalar() == 26
+        rollup_total = db.session.execute(db.select(db.func.sum(TransactionDailyRollup.total_amount))).scalar()
+        assert rollup_total == sum(range(1, 26))
+        assert applied_revisions(db.engine) == {revision_id for revision_id, _, _ in REVISIONS}
+
+    # The API works on the migrated schema, including the period index
+    client = app.test_client()
+    events = client.get('/api/events?from=2025-01-03&to=2025-01-04&expand=true').get_json()['data']
+    assert [event['title'] for event in events] == ['Dentist', 'Standup']
+    response = client.post('/api/transactions', json={
+        'contextId': 1, 'type': 'income', 'amount': 5, 'date': '2025-01-02', 'tags': ['food']
+    })
+    assert response.status_code == 201
+
+    # Deleting a context now cascades in the database, through the rebuilt tables on SQLite
+    assert client.delete('/api/contexts/1').status_code == 200
+    events = client.get('/api/events?from=2025-01-03&to=2025-01-04&expand=true').get_json()['data']
+    assert [event['title'] for event in events] == ['Standup']
+    with app.app_context():
+        assert Transaction.query.count() == 0
+        assert db.session.execute(db.select(db.func.count()).select_from(transaction_tags)).scalar() == 0
+
+
+def test_upgrade_is_idempotent():
+    make_legacy_database()
+    run_upgrade()
+    applied, messages = run_upgrade()
+    assert applied == [] and messages == []
+
+    # Re-running a revision that already took effect changes nothing
+    with app.app_context():
+        migrator = Migrator(db.engine, batch_size=10, batch_pause=0, log=lambda message: None)
+        before = db.session.execute(db.select(db.func.count()).select_from(transaction_tags)).scalar()
+        for _, _, run in REVISIONS:
+            run(migrator)
+        after = db.session.execute(db.select(db.func.count()).select_from(transaction_tags)).scalar()
+        assert before == after
+
+        # The rollup backfill starts over, so a repeated (or interrupted) run matches a full rebuild
+        backfilled = rollup_rows()
+        rebuild_rollups()
+        db.session.commit()
+        assert backfilled == rollup_rows() and backfilled[0]
+        assert not migrator.create_index(next(iter(Event.__table__.indexes)))
+
+
+class ConcurrentWriteMigrator(Migrator):
+    """After the first rollup batch, writes transactions the way the previous release does (no rollup hooks)"""
+
+    def __init__(self, engine, log):
+        super().__init__(engine, batch_size=10, batch_pause=0, log=log)
+        self.written = False
+
+    def id_batches(self, table, id_column='id', after=None):
+        for batch in super().id_batches(table, id_column, after):
+            yield batch
+            if table.name == 'transactions' and not self.written and self.has_table('transaction_daily_rollups'):
+                self.written = True
+                with self.engine.begin() as connection:
+                    insert = db.text(
+                        "INSERT INTO transactions (id, context_id, type, amount, description, tags, date, created_at) "
+                        "VALUES (:id, 2, 'income', :amount, 'New', '[]', :date, :created_at)"
+                    )
+                    # One inside the id range being backfilled, one above it
+                    connection.execute(insert, [
+                        {'id': 26, 'amount': 1000, 'date': date(2025, 1, 2), 'created_at': CREATED_AT},
+                        {'id': 40, 'amount': 2000, 'date': date(2025, 1, 3), 'created_at': CREATED_AT},
+                    ])
+                    # And an update of a row that is already backfilled
+                    connection.execute(db.text('UPDATE transactions SET amount = 500 WHERE id = 1'))
+
+
+def test_rollup_backfill_picks_up_inserts_made_meanwhile():
+    make_legacy_database()
+    with app.app_context():
+        messages = []
+        migrator = ConcurrentWriteMigrator(db.engine, messages.append)
+        upgrade(db.engine, migrator)
+        assert migrator.written and ROLLUP_REBUILD_NOTICE in messages
+
+        def rollup_total():
+            return db.session.execute(db.select(db.func.sum(TransactionDailyRollup.total_amount))).scalar()
+        # Both inserts are counted; the update of row 1 waits for the rebuild the runner asks for
+        assert rollup_total() == sum(range(1, 26)) + 3000
+        rebuild_rollups()
+        db.session.commit()
+        assert rollup_total() == sum(range(2, 26)) + 500 + 3000
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
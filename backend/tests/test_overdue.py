@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Overdue Todo Tests
+Checks the SQL overdue filter against the original per-row Python check
+(missing time means end of day) and the contextId/limit parameters.
+"""
+
+import random
+from datetime import date, datetime, time, timedelta
+
+from support import app, reset_database, run_tests
+from models import db, Context, Todo
+from app import find_overdue_todos
+
+
+def legacy_is_overdue(todo, now):
+    if todo.status == 'done' or not todo.due_date:
+        return False
+    if todo.due_time:
+        return datetime.combine(todo.due_date, todo.due_time) < now
+    return todo.due_date < now.date()
+
+
+def test_overdue_matches_python_implementation():
+    reset_database()
+    rng = random.Random(3)
+    now = datetime(2025, 6, 15, 12, 30)
+
+    with app.app_context():
+        context = Context(name='Work')
+        db.session.add(context)
+        db.session.flush()
+        for index in range(300):
+            due_date = now.date() + timedelta(days=rng.randint(-3, 3)) if rng.random() < 0.9 else None
+            due_time = time(rng.randint(0, 23), rng.choice([0, 29, 30, 31])) if rng.random() < 0.5 else None
+            db.session.add(Todo(
+                context_id=context.id,
+                title=f'Todo {index}',
+                status=rng.choice(['todo', 'in_progress', 'done']),
+                due_date=due_date,
+                due_time=due_time
+            ))
+        db.session.commit()
+
+        expected = sorted(t.id for t in Todo.query.all() if legacy_is_overdue(t, now))
+        actual = find_overdue_todos(Todo.query, now)
+        assert sorted(t.id for t in actual) == expected
+        assert expected
+
+        keys = [(t.due_date, t.due_time or time.max) for t in actual]
+        assert keys == sorted(keys)
+
+
+def test_overdue_endpoint_filters_and_limits():
+    client = reset_database()
+    first = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    second = client.post('/api/contexts', json={'name': 'Work'}).get_json()['data']['id']
+    yesterday = (date.today() - timedelta(days=1)).strftime('%Y-%m-%d')
+
+    for context_id in (first, first, first, second):
+        client.post('/api/todos', json={'contextId': context_id, 'title': 'Late', 'dueDate': yesterday})
+    client.post('/api/todos', json={'contextId': first, 'title': 'Today', 'dueDate': date.today().strftime('%Y-%m-%d')})
+
+    assert client.get('/api/todos/overdue').get_json()['count'] == 4
+    assert client.get(f'/api/todos/overdue?contextId={first}').get_json()['count'] == 3
+    limited = client.get(f'/api/todos/overdue?contextId={first}&limit=2').get_json()
+    assert limited['count'] == 2
+    assert all(todo['contextId'] == first for todo in limited['data'])
+
+    for limit in ('abc', '-1', '0', '501'):
+        response = client.get(f'/api/todos/overdue?limit={limit}')
+        assert response.status_code == 400
+        assert response.get_json()['success'] is False
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Pagination Tests
+Walks the keyset-paginated list endpoints page by page (including rows
+that tie on the sort column) and checks that the pages, and the streamed
+body, match the single-response listing. Expanded event lists reject the
+pagination params instead of ignoring them.
+"""
+
+import json
+from datetime import datetime
+
+from support import app, reset_database, run_tests
+from models import db, Idea, Todo
+
+
+def seed(client):
+    context_id = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    for index in range(23):
+        day = 1 + index % 5  # several rows per date
+        client.post('/api/transactions', json={
+            'contextId': context_id, 'type': 'expense', 'amount': index + 1, 'date': f'2025-01-{day:02d}'
+        })
+        client.post('/api/todos', json={'contextId': context_id, 'title': f'Todo {index}'})
+        client.post(f'/api/contexts/{context_id}/notes', json={'title': f'Note {index}', 'content': ''})
+        client.post('/api/events', json={
+            'contextId': context_id, 'title': f'Event {index}', 'startDate': f'2025-02-{day:02d}T09:00:00'
+        })
+
+    # Give todos and notes tied creation times as well
+    with app.app_context():
+        for model in (Todo, Idea):
+            db.session.execute(db.update(model).where(model.id % 3 == 0).values(created_at=datetime(2025, 1, 1, 12)))
+        db.session.commit()
+    return context_id
+
+
+def list_urls(context_id):
+    return [
+        '/api/transactions?range=all',
+        f'/api/contexts/{context_id}/todos',
+        f'/api/contexts/{context_id}/notes',
+        '/api/events',
+        f'/api/contexts/{context_id}/events',
+    ]
+
+
+def walk_pages(client, url, limit):
+    separator = '&' if '?' in url else '?'
+    rows, cursor = [], None
+    while True:
+        page_url = f'{url}{separator}limit={limit}'
+        if cursor:
+            page_url += f'&after={cursor}'
+        body = client.get(page_url).get_json()
+        assert body['success'] and body['count'] == len(body['data']) <= limit
+        rows += body['data']
+        cursor = body['nextCursor']
+        if not cursor:
+            return rows
+
+
+def test_pages_cover_the_full_listing_in_order():
+    client = reset_database()
+    context_id = seed(client)
+
+    for url in list_urls(context_id):
+        full = client.get(url).get_json()['data']
+        assert len(full) == 23
+        for limit in (1, 7, 23, 50):
+            assert [row['id'] for row in walk_pages(client, url, limit)] == [row['id'] for row in full], (url, limit)
+
+
+def test_streamed_body_matches_buffered_body():
+    client = reset_database()
+    context_id = seed(client)
+
+    for url in list_urls(context_id):
+        separator = '&' if '?' in url else '?'
+        buffered = client.get(url).get_json()
+        streamed = json.loads(client.get(f'{url}{separator}stream=true').get_data(as_text=True))
+        assert streamed == buffered, url
+
+        limited = json.loads(client.get(f'{url}{separator}stream=true&limit=5').get_data(as_text=True))
+        assert limited['data'] == buffered['data'][:5] and limited['count'] == 5
+
+
+def test_invalid_page_params_are_rejected():
+    client = reset_database()
+    context_id = seed(client)
+    for url in list_urls(context_id):
+        separator = '&' if '?' in url else '?'
+        assert client.get(f'{url}{separator}after=yesterday').status_code == 400
+        assert client.get(f'{url}{separator}limit=0').status_code == 400
+
+
+def test_expanded_events_reject_pagination():
+    client = reset_database()
+    context_id = seed(client)
+    window = 'from=2025-02-01&to=2025-02-28&expand=true'
+    for url in ('/api/events', f'/api/contexts/{context_id}/events'):
+        assert client.get(f'{url}?{window}').get_json()['count'] == 23
+        for params in ('limit=2', 'after=2025-02-01T09:00:00,1', 'stream=true'):
+            response = client.get(f'{url}?{window}&{params}')
+            assert response.status_code == 400, (url, params)
+            assert 'not supported with expand=true' in response.get_json()['message']
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Profiling Tests
+?__profile=1 is ignored unless profiling is enabled, needs the token, and
+returns a breakdown of the handler's time (SQL, ORM hydration, to_dict,
+date parsing, JSON encoding) even for cached endpoints. ?__profile=pstats
+returns a capture that collapse_profile.py turns into collapsed stacks.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from support import app, reset_database, run_tests
+
+TOKEN = 'test-token'
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def enable_profiling(enabled=True):
+    app.config['PROFILING_ENABLED'] = enabled
+    app.config['PROFILING_TOKEN'] = TOKEN if enabled else None
+
+
+def seed(client):
+    context_id = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    for day in range(1, 21):
+        client.post('/api/todos', json={'contextId': context_id, 'title': f'Todo {day}'})
+        client.post('/api/transactions', json={
+            'contextId': context_id, 'type': 'expense', 'amount': day, 'category': 'Food',
+            'date': f'2024-01-{day:02d}'
+        })
+    return context_id
+
+
+def profile(client, url, mode='1', token=TOKEN):
+    separator = '&' if '?' in url else '?'
+    return client.get(f'{url}{separator}__profile={mode}', headers={'X-Profile-Token': token})
+
+
+def test_profile_param_is_ignored_unless_enabled():
+    client = reset_database()
+    enable_profiling(False)
+    response = profile(client, '/api/contexts')
+    assert response.status_code == 200
+    assert isinstance(response.get_json()['data'], list)
+
+
+def test_profile_requires_the_token():
+    client = reset_database()
+    enable_profiling()
+    try:
+        assert profile(client, '/api/contexts', token='wrong').status_code == 403
+        assert client.get('/api/contexts?__profile=1').status_code == 403
+        assert profile(client, '/api/contexts', mode='svg').status_code == 400
+    finally:
+        enable_profiling(False)
+
+
+def test_profile_breaks_down_handler_time():
+    client = reset_database()
+    context_id = seed(client)
+    enable_profiling()
+    try:
+        todos = profile(client, f'/api/contexts/{context_id}/todos').get_json()['data']
+        transactions = profile(
+            client, f'/api/contexts/{context_id}/transactions?from=2024-01-05&to=2024-01-15'
+        ).get_json()['data']
+        # The stats endpoint is response-cached; profiled requests still run the handler
+        stats = [profile(client, f'/api/stats/summary?contextId={context_id}').get_json()['data'] for _ in range(2)]
+    finally:
+        enable_profiling(False)
+
+    assert todos['endpoint'] == 'api.get_context_todos' and todos['status'] == 200
+    breakdown = todos['breakdownMs']
+    assert breakdown['sql'] > 0 and breakdown['ormHydration'] > 0
+    assert breakdown['toDict'] > 0 and breakdown['jsonEncoding'] > 0
+    assert 0 < breakdown['toDict'] <= todos['totalMs']
+    assert todos['top'] and {'function', 'calls', 'ownMs', 'cumulativeMs'} <= set(todos['top'][0])
+    assert transactions['breakdownMs']['dateParsing'] > 0
+    assert all(profiled['breakdownMs']['sql'] > 0 for profiled in stats)
+
+    # The profiled responses were not cached in place of the real one
+    assert client.get(f'/api/stats/summary?contextId={context_id}').get_json()['success'] is True
+
+
+def test_saved_profile_collapses_to_stacks():
+    client = reset_database()
+    context_id = seed(client)
+    enable_profiling()
+    try:
+        response = profile(client, f'/api/contexts/{context_id}/todos', mode='pstats')
+    finally:
+        enable_profiling(False)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/octet-stream'
+
+    path = os.path.join(tempfile.mkdtemp(), 'todos.pstats')
+    with open(path, 'wb') as profile_file:
+        profile_file.write(response.get_data())
+    result = subprocess.run(
+        [sys.executable, 'collapse_profile.py', path], cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+    lines = result.stdout.splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert stack and int(count) > 0
+    assert any('get_context_todos (app.py:' in line and 'to_dict (models.py:' in line for line in lines)
+    assert 'toDict:' in result.stderr
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Query Count Tests
+List endpoints must issue a fixed number of SQL statements no matter how
+many rows they return (no per-row lazy loads of todo/event links), and
+deleting a context must not load its items to delete them one by one.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from support import app, reset_database, run_tests
+from models import db, Event, Todo, TransactionDailyRollup, todo_event_links, todo_tags
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def seed_linked_todos(client, count):
+    """Create `count` overdue todos, each linked to its own calendar event"""
+    context_id = client.post('/api/contexts', json={'name': 'Work'}).get_json()['data']['id']
+    due = (datetime.now() - timedelta(days=2)).strftime('%Y-%m-%d')
+    for index in range(count):
+        todo = client.post('/api/todos', json={
+            'contextId': context_id,
+            'title': f'Todo {index}',
+            'dueDate': due,
+            'durationHours': 1
+        }).get_json()['data']
+        response = client.post(f"/api/todos/{todo['id']}/add-to-calendar", json={'date': due, 'time': '09:00'})
+        assert response.status_code == 201
+    return context_id
+
+
+def queries_for(url, count):
+    client = reset_database()
+    context_id = seed_linked_todos(client, count)
+    url = url.format(context_id=context_id)
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()['data']
+    if isinstance(data, list):
+        assert len(data) == count
+    return len(statements)
+
+
+def assert_fixed_query_count(url):
+    small = queries_for(url, 3)
+    large = queries_for(url, 40)
+    assert small == large, f'{url}: {small} queries for 3 rows but {large} for 40'
+
+
+def test_context_todos_query_count():
+    assert_fixed_query_count('/api/contexts/{context_id}/todos')
+
+
+def test_overdue_todos_query_count():
+    assert_fixed_query_count('/api/todos/overdue')
+
+
+def test_all_events_query_count():
+    assert_fixed_query_count('/api/events')
+
+
+def test_context_events_query_count():
+    assert_fixed_query_count('/api/contexts/{context_id}/events')
+
+
+def test_home_query_count():
+    assert_fixed_query_count('/api/home')
+
+
+def delete_context_queries(count):
+    client = reset_database()
+    context_id = seed_linked_todos(client, count)
+    for index in range(count):
+        client.post('/api/transactions', json={
+            'contextId': context_id, 'type': 'expense', 'amount': index + 1, 'date': '2025-01-01', 'tags': ['food']
+        })
+    client.post('/api/todos', json={'contextId': context_id, 'title': 'Tagged', 'tags': ['home']})
+    with count_queries() as statements:
+        response = client.delete(f'/api/contexts/{context_id}')
+    assert response.status_code == 200
+
+    # The database cascade removed everything that hung off the context
+    with app.app_context():
+        assert Todo.query.count() == 0 and Event.query.count() == 0
+        assert TransactionDailyRollup.query.count() == 0
+        for table in (todo_event_links, todo_tags):
+            assert db.session.execute(db.select(db.func.count()).select_from(table)).scalar() == 0
+    return len(statements)
+
+
+def test_delete_context_query_count():
+    small = delete_context_queries(3)
+    large = delete_context_queries(40)
+    assert small == large, f'deleting a context: {small} queries for 3 rows but {large} for 40'
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
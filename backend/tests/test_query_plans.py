@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Query Plan Tests
+Seeds a database with enough rows for the planner to care (and ANALYZEs
+it), captures every SELECT that the main read endpoints issue, and runs
+EXPLAIN on each one. A full scan of a large table (sequential, or of an
+index without a condition) fails the test, so a dropped index or a
+rewritten query that can no longer use one is caught here rather than in
+production.
+"""
+
+import json
+import random
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import event
+
+from support import app, reset_database, run_tests
+from models import db, Context, Event, Idea, Todo, Transaction, todo_event_links
+from rollups import rebuild_rollups
+
+CONTEXT_COUNT = 40
+ROWS_PER_CONTEXT = 250
+TARGET_CONTEXT = 7
+TODAY = date.today()
+
+# Tables that grow with usage; small lookup tables (contexts, tags) may be scanned
+LARGE_TABLES = {
+    'transactions', 'todos', 'ideas', 'events', 'todo_event_links',
+    'transaction_tags', 'todo_tags', 'idea_tags', 'event_tags',
+    'transaction_daily_rollups', 'transaction_tag_daily_rollups',
+}
+
+
+def endpoint_urls():
+    window_start = TODAY - timedelta(days=3)
+    window_end = TODAY + timedelta(days=3)
+    context = TARGET_CONTEXT
+    return [
+        f'/api/contexts/{context}/transactions?range=month',
+        f'/api/transactions?contextId={context}&range=year&limit=50',
+        '/api/transactions?range=week&limit=50',
+        f'/api/contexts/{context}/todos?limit=50',
+        f'/api/contexts/{context}/notes?limit=50',
+        f'/api/contexts/{context}/events?from={window_start}&to={window_end}',
+        f'/api/events?from={window_start}&to={window_end}',
+        '/api/todos/overdue?limit=20',
+        f'/api/contexts/{context}/overview',
+        f'/api/stats/summary?contextId={context}&range=month',
+        f'/api/stats/daily?contextId={context}&range=month',
+    ]
+
+
+def seed():
+    """Bulk-insert a realistic spread of rows with Core (bypassing the per-row ORM listeners)"""
+    rng = random.Random(3)
+    created = datetime.combine(TODAY - timedelta(days=400), time())
+    with app.app_context():
+        session = db.session
+        session.execute(Context.__table__.insert(), [
+            {'id': context_id, 'name': f'Context {context_id}', 'created_at': created}
+            for context_id in range(1, CONTEXT_COUNT + 1)
+        ])
+
+        transactions, todos, ideas, events = [], [], [], []
+        for context_id in range(1, CONTEXT_COUNT + 1):
+            for _ in range(ROWS_PER_CONTEXT):
+                day = TODAY - timedelta(days=rng.randint(0, 720))
+                transactions.append({
+                    'context_id': context_id, 'type': rng.choice(['income', 'expense']),
+                    'amount': rng.randint(1, 500), 'description': 'Seeded', 'tags': [], 'date': day,
+                    'created_at': created,
+                })
+                done = rng.random() < 0.8
+                todos.append({
+                    'context_id': context_id, 'title': 'Seeded', 'status': 'done' if done else 'todo',
+                    'priority': 'medium', 'tags': [], 'created_at': created + timedelta(minutes=rng.randint(0, 10 ** 6)),
+                    # Open todos are mostly due in the future, as in real use
+                    'due_date': TODAY + timedelta(days=rng.randint(-400 if done else -3, 60)),
+                })
+                ideas.append({
+                    'context_id': context_id, 'title': 'Seeded', 'tags': [],
+                    'created_at': created + timedelta(minutes=rng.randint(0, 10 ** 6)),
+                })
+                start = datetime.combine(TODAY, time(9)) + timedelta(hours=rng.randint(-24 * 720, 24 * 60))
+                events.append({
+                    'context_id': context_id, 'title': 'Seeded', 'start_date': start,
+                    'end_date': start + timedelta(hours=1), 'all_day': False, 'tags': [],
+                    'completed': False, 'recurring': False, 'created_at': created,
+                })
+        for table, rows in ((Transaction, transactions), (Todo, todos), (Idea, ideas), (Event, events)):
+            session.execute(table.__table__.insert(), rows)
+
+        todo_count = len(todos)
+        session.execute(todo_event_links.insert(), [
+            {'todo_id': todo_id, 'event_id': todo_id, 'created_at': created}
+            for todo_id in range(1, todo_count + 1, 5)
+        ])
+        rebuild_rollups()
+        session.commit()
+
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.execute(db.text('ANALYZE'))
+
+
+def capture_selects(client, url):
+    """The SELECT statements (with parameters) a request issues"""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, (url, response.get_data(as_text=True)[:300])
+    return statements
+
+
+def full_scans(connection, statement, parameters):
+    """Large tables the plan reads in full, either sequentially or through an index without a condition"""
+    scans = []
+    if connection.dialect.name == 'postgresql':
+        with connection.begin():
+            # The seeded tables are small enough that a seq scan can be the cheaper plan; with seq
+            # scans priced out, one left in the plan means no index can serve the query at all
+            connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            relation = node.get('Relation Name')
+            full_index_scan = node['Node Type'] in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in node
+            if relation in LARGE_TABLES and (node['Node Type'] == 'Seq Scan' or full_index_scan):
+                scans.append(relation)
+            nodes.extend(node.get('Plans', []))
+        return scans
+
+    for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters):
+        # "SCAN todos" and "SCAN todos USING INDEX ..." read the whole table; "SEARCH todos ..." does not
+        words = row[-1].split()
+        if words[0] == 'SCAN' and words[1] in LARGE_TABLES:
+            scans.append(words[1])
+    return scans
+
+
+def test_endpoint_queries_use_indexes():
+    client = reset_database()
+    seed()
+
+    failures = []
+    checked = 0
+    for url in endpoint_urls():
+        for statement, parameters in capture_selects(client, url):
+            with app.app_context():
+                with db.engine.connect() as connection:
+                    scans = full_scans(connection, statement, parameters)
+            checked += 1
+            if scans:
+                failures.append(f"{url}: full scan of {', '.join(scans)}\n    {' '.join(statement.split())[:300]}")
+
+    assert checked >= len(endpoint_urls())
+    assert not failures, '\n'.join(failures)
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Read Replica Tests
+Uses in-memory SQLite databases as stand-in replicas, each holding a
+context the primary does not have, so every response shows which database
+served it. Checks round-robin reads, writes and read-after-write on the
+primary, and the fallback for lagging or failing replicas.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+from support import app, reset_database, run_tests
+from models import db, Context
+from replicas import ReplicaSet
+
+CREATED_AT = datetime(2025, 1, 1)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_replica(context_name):
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Context.__table__.insert(), [{'id': 1, 'name': context_name, 'created_at': CREATED_AT}])
+    return engine
+
+
+def install_replicas(lags=None):
+    """Attach two stand-in replicas; lags maps an engine to its lag (or an exception to raise)"""
+    lags = lags if lags is not None else {}
+    first, second = make_replica('Replica A'), make_replica('Replica B')
+
+    def measure_lag(engine):
+        lag = lags.get(engine, 0.0)
+        if isinstance(lag, Exception):
+            raise lag
+        return lag
+
+    clock = FakeClock()
+    replicas = ReplicaSet(
+        [('replica_0', first), ('replica_1', second)], app.logger,
+        max_lag=5, check_interval=2, retry_delay=10, measure_lag=measure_lag, clock=clock
+    )
+    app.extensions['read_replicas'] = replicas
+    return replicas, clock, first, second
+
+
+def context_names(client):
+    response = client.get('/api/contexts')
+    assert response.status_code == 200
+    return [context['name'] for context in response.get_json()['data']]
+
+
+def test_reads_rotate_over_replicas_and_writes_go_to_primary():
+    client = reset_database()
+    client.post('/api/contexts', json={'name': 'Home'})
+    replicas, clock, _, _ = install_replicas()
+    try:
+        assert [context_names(client) for _ in range(4)] == [['Replica A'], ['Replica B']] * 2
+
+        response = client.post('/api/contexts', json={'name': 'Work'})
+        assert response.status_code == 201
+        work_id = response.get_json()['data']['id']
+
+        # Read-after-write: right after the write, reads come from the primary
+        assert context_names(client) == ['Home', 'Work']
+        assert replicas.choose(work_id) is None
+
+        # A write to one context leaves the reads of the others on the replicas
+        clock.now += replicas.window + 1
+        client.post('/api/transactions', json={
+            'contextId': work_id, 'type': 'expense', 'amount': 5, 'date': '2025-01-02'
+        })
+        assert replicas.choose(work_id) is None
+        assert replicas.choose(999) is not None
+
+        # Once the replicas have had time to catch up, reads go back to them
+        clock.now += replicas.window + 1
+        assert context_names(client) in (['Replica A'], ['Replica B'])
+        assert replicas.stats()['recent_write_reads'] == 3
+    finally:
+        app.extensions.pop('read_replicas', None)
+
+    with app.app_context():
+        assert [context.name for context in Context.query.order_by(Context.id)] == ['Home', 'Work']
+
+
+def test_lagging_or_failing_replica_falls_back_to_primary():
+    client = reset_database()
+    client.post('/api/contexts', json={'name': 'Home'})
+    lags = {}
+    replicas, clock, first, second = install_replicas(lags)
+    try:
+        lags[first] = 60.0
+        clock.now += 5
+        assert [context_names(client) for _ in range(3)] == [['Replica B']] * 3
+
+        lags[second] = OperationalError('SELECT 1', {}, Exception('connection refused'))
+        clock.now += 5
+        assert context_names(client) == ['Home']
+        stats = replicas.stats()
+        assert stats['primary_reads'] >= 1 and stats['failures'] == 1
+        assert [replica['available'] for replica in stats['replicas']] == [True, False]
+
+        # Both recover: the lag is re-measured and the failed one is retried after its delay
+        lags[first] = 0.0
+        lags[second] = 0.0
+        clock.now += 11
+        assert sorted(context_names(client)[0] for _ in range(2)) == ['Replica A', 'Replica B']
+    finally:
+        app.extensions.pop('read_replicas', None)
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Recurrence Tests
+Covers occurrence expansion for each recurrence type, the expand=true
+mode of the event list endpoints, the event windows they select and
+editing a series through one of its expanded occurrences.
+"""
+
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from support import reset_database, run_tests
+from recurrence import expand_event
+
+
+def series(start, recurrence_type, end=None, recurrence_end_date=None):
+    return SimpleNamespace(
+        start_date=start,
+        end_date=end,
+        recurring=True,
+        recurrence_type=recurrence_type,
+        recurrence_end_date=recurrence_end_date
+    )
+
+
+def starts(event, window_start, window_end):
+    return [start for start, _ in expand_event(event, window_start, window_end)]
+
+
+def test_daily_series_started_before_window():
+    event = series(datetime(2024, 1, 1, 9), 'daily', end=datetime(2024, 1, 1, 10))
+    result = starts(event, datetime(2025, 3, 10), datetime(2025, 3, 12, 23, 59))
+    assert result == [datetime(2025, 3, d, 9) for d in (10, 11, 12)]
+
+
+def test_weekly_series_respects_recurrence_end_date():
+    event = series(datetime(2025, 1, 6, 18), 'weekly', recurrence_end_date=date(2025, 1, 27))
+    result = starts(event, datetime(2025, 1, 1), datetime(2025, 2, 28))
+    assert result == [datetime(2025, 1, d, 18) for d in (6, 13, 20, 27)]
+
+
+def test_monthly_series_skips_short_months():
+    event = series(datetime(2025, 1, 31, 8), 'monthly')
+    result = starts(event, datetime(2025, 1, 1), datetime(2025, 5, 31, 23, 59))
+    assert result == [datetime(2025, 1, 31, 8), datetime(2025, 3, 31, 8), datetime(2025, 5, 31, 8)]
+
+
+def test_yearly_series_on_leap_day():
+    event = series(datetime(2024, 2, 29, 12), 'yearly')
+    result = starts(event, datetime(2024, 1, 1), datetime(2028, 12, 31))
+    assert result == [datetime(2024, 2, 29, 12), datetime(2028, 2, 29, 12)]
+
+
+def test_occurrence_running_into_window_is_included():
+    event = series(datetime(2025, 1, 1, 23), 'daily', end=datetime(2025, 1, 2, 1))
+    result = starts(event, datetime(2025, 1, 5), datetime(2025, 1, 5, 23, 59))
+    assert result == [datetime(2025, 1, 4, 23), datetime(2025, 1, 5, 23)]
+
+
+def test_events_endpoint_expands_recurring_series():
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Health'}).get_json()['data']['id']
+    series_event = client.post('/api/events', json={
+        'contextId': context_id,
+        'title': 'Gym',
+        'startDate': '2025-01-06T18:00:00',
+        'durationHours': 1,
+        'recurring': True,
+        'recurrenceType': 'weekly'
+    }).get_json()['data']
+    client.post('/api/events', json={
+        'contextId': context_id,
+        'title': 'Dentist',
+        'startDate': '2025-03-05T10:00:00'
+    })
+
+    plain = client.get('/api/events?from=2025-03-01&to=2025-03-31').get_json()
+    assert [e['title'] for e in plain['data']] == ['Dentist']
+
+    for url in ['/api/events', f'/api/contexts/{context_id}/events']:
+        expanded = client.get(f'{url}?from=2025-03-01&to=2025-03-31&expand=true').get_json()
+        gym = [e for e in expanded['data'] if e['title'] == 'Gym']
+        assert [e['startDate'] for e in gym] == [f'2025-03-{d:02d}T18:00:00' for d in (3, 10, 17, 24, 31)]
+        assert all(e['id'] == series_event['id'] and e['seriesId'] == series_event['id'] for e in gym)
+        assert expanded['count'] == 6
+
+    assert client.get('/api/events?expand=true').status_code == 400
+
+
+def test_events_window_selects_overlapping_events():
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Travel'}).get_json()['data']['id']
+
+    def add(title, start, hours=None):
+        payload = {'contextId': context_id, 'title': title, 'startDate': start}
+        if hours:
+            payload['durationHours'] = hours
+        return client.post('/api/events', json=payload).get_json()['data']
+
+    add('Conference', '2025-02-27T09:00:00', hours=72)
+    add('Late call', '2025-02-28T23:30:00')
+    add('Ends at window start', '2025-02-28T22:00:00', hours=2)
+    moved = add('Moved', '2025-01-10T10:00:00')
+    add('After', '2025-04-01T00:00:00')
+
+    def titles():
+        data = client.get('/api/events?from=2025-03-01&to=2025-03-31').get_json()['data']
+        return [e['title'] for e in data]
+
+    assert titles() == ['Conference', 'Late call']
+
+    client.put(f"/api/events/{moved['id']}", json={'startDate': '2025-03-15T10:00:00'})
+    assert titles() == ['Conference', 'Late call', 'Moved']
+
+    client.delete(f"/api/events/{moved['id']}")
+    assert titles() == ['Conference', 'Late call']
+
+
+def test_editing_an_expanded_occurrence_keeps_the_series():
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Work'}).get_json()['data']['id']
+    series_id = client.post('/api/events', json={
+        'contextId': context_id,
+        'title': 'Standup',
+        'startDate': '2025-03-03T09:00:00',
+        'durationHours': 0.5,
+        'recurring': True,
+        'recurrenceType': 'weekly'
+    }).get_json()['data']['id']
+
+    def occurrences():
+        data = client.get('/api/events?from=2025-03-01&to=2025-03-31&expand=true').get_json()['data']
+        return [(e['startDate'], e['title']) for e in data]
+
+    third = client.get('/api/events?from=2025-03-17&to=2025-03-17&expand=true').get_json()['data'][0]
+    assert third['startDate'] == '2025-03-17T09:00:00' and third['seriesId'] == series_id
+    assert (third['seriesStartDate'], third['seriesEndDate']) == ('2025-03-03T09:00:00', '2025-03-03T09:30:00')
+
+    # What the calendar sends: the series' own start, shifted by the edit made to the occurrence
+    response = client.put(f"/api/events/{third['seriesId']}", json={
+        'title': 'Daily sync',
+        'startDate': '2025-03-03T09:15:00',
+        'endDate': '2025-03-03T09:45:00'
+    })
+    assert response.status_code == 200
+    assert occurrences() == [(f'2025-03-{d:02d}T09:15:00', 'Daily sync') for d in (3, 10, 17, 24, 31)]
+    assert client.get(f'/api/events/{series_id}').get_json()['data']['completed'] is False
+
+
+def test_expanded_window_accepts_utc_offsets():
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Health'}).get_json()['data']['id']
+    client.post('/api/events', json={
+        'contextId': context_id,
+        'title': 'Gym',
+        'startDate': '2024-12-02T18:00:00',
+        'durationHours': 1,
+        'recurring': True,
+        'recurrenceType': 'weekly'
+    })
+
+    def starts(query):
+        response = client.get(f'/api/events?{query}&expand=true')
+        assert response.status_code == 200, response.get_json()
+        return [e['startDate'] for e in response.get_json()['data']]
+
+    assert starts('from=2025-01-01T00:00:00Z&to=2025-01-15T00:00:00Z') == [
+        '2025-01-06T18:00:00', '2025-01-13T18:00:00'
+    ]
+    # Converted to UTC: the window ends at 2025-01-13T17:30:00, before the second occurrence
+    assert starts('from=2025-01-01T00:00:00%2B02:00&to=2025-01-13T19:30:00%2B02:00') == ['2025-01-06T18:00:00']
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
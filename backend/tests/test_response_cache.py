@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Response Cache Tests
+Covers LRU/TTL behaviour of the in-process cache, the write-driven
+invalidation of the stats and overview endpoints, and the backend interface.
+"""
+
+from support import reset_database, run_tests
+from cache import MemoryResponseCache, ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_cache_lru_ttl_and_stale_sets():
+    clock = FakeClock()
+    cache = MemoryResponseCache(max_entries=2, ttl=10, clock=clock)
+
+    token = cache.begin()
+    cache.set('a', 1, ['transaction:1'], token)
+    cache.set('b', 2, ['transaction:2'], token)
+    assert cache.get('a') == 1
+    cache.set('c', 3, ['transaction:3'], token)
+    assert cache.get('b') is None  # least recently used
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+    clock.now = 11
+    assert cache.get('a') is None
+
+    token = cache.begin()
+    cache.invalidate(['transaction:1'])
+    cache.set('a', 1, ['transaction:1'], token)  # computed before the invalidation
+    cache.set('d', 4, ['transaction:4'], token)
+    assert cache.get('a') is None and cache.get('d') == 4
+
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['expirations'] == 1
+    assert stats['hits'] == 4 and stats['misses'] == 3
+
+
+def stats_counters(client):
+    return client.get('/api/cache/stats').get_json()['data']
+
+
+def assert_served(client, url, hit):
+    before = stats_counters(client)['hits']
+    response = client.get(url)
+    assert response.status_code == 200
+    assert (stats_counters(client)['hits'] == before + 1) == hit, f'{url}: expected hit={hit}'
+    return response.get_json()['data']
+
+
+def test_transaction_writes_invalidate_matching_entries():
+    client = reset_database()
+    first = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    second = client.post('/api/contexts', json={'name': 'Work'}).get_json()['data']['id']
+    urls = [
+        '/api/stats/summary?range=all',
+        f'/api/stats/summary?range=all&contextId={first}',
+        f'/api/stats/summary?range=all&contextId={second}',
+        '/api/stats/by-context?range=all',
+        f'/api/stats/daily?range=all&contextId={second}',
+        f'/api/contexts/{second}/overview',
+    ]
+    for url in urls:
+        assert_served(client, url, hit=False)
+        assert_served(client, url, hit=True)
+
+    created = client.post('/api/transactions', json={
+        'contextId': first, 'type': 'expense', 'amount': 12.5, 'date': '2025-01-01'
+    }).get_json()['data']
+
+    summary = assert_served(client, '/api/stats/summary?range=all', hit=False)
+    assert summary['total_expenses'] == 12.5
+    assert_served(client, f'/api/stats/summary?range=all&contextId={first}', hit=False)
+    assert_served(client, '/api/stats/by-context?range=all', hit=False)
+    for url in urls[2:3] + urls[4:]:
+        assert_served(client, url, hit=True)
+
+    client.put(f"/api/transactions/{created['id']}", json={'amount': 20})
+    assert assert_served(client, '/api/stats/summary?range=all', hit=False)['total_expenses'] == 20
+
+    client.delete(f'/api/contexts/{first}')
+    assert assert_served(client, '/api/stats/summary?range=all', hit=False)['total_expenses'] == 0
+    assert_served(client, f'/api/stats/summary?range=all&contextId={second}', hit=True)
+
+
+def test_overview_follows_todos_notes_and_context_edits():
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    url = f'/api/contexts/{context_id}/overview'
+    assert_served(client, url, hit=False)
+
+    client.post('/api/todos', json={'contextId': context_id, 'title': 'Fix sink'})
+    assert assert_served(client, url, hit=False)['stats']['todo_count'] == 1
+
+    client.post(f'/api/contexts/{context_id}/notes', json={'title': 'Idea', 'content': 'Draft'})
+    assert assert_served(client, url, hit=False)['stats']['idea_count'] == 1
+
+    client.put(f'/api/contexts/{context_id}', json={'name': 'House'})
+    assert assert_served(client, url, hit=False)['context']['name'] == 'House'
+    assert_served(client, url, hit=True)
+
+
+def test_incomplete_backend_cannot_be_created():
+    class GetOnlyCache(ResponseCache):
+        def get(self, key):
+            return None
+
+    try:
+        GetOnlyCache()
+    except TypeError as e:
+        assert 'invalidate' in str(e)
+    else:
+        raise AssertionError('a backend without set/invalidate/... was instantiated')
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
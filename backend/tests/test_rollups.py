@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Rollup Tests
+Checks that the incrementally maintained daily rollups always match a
+from-scratch rebuild after a mix of adds, updates and deletes, whether
+they come through the API or straight through the ORM (init_db.py).
+"""
+
+import random
+from datetime import date, datetime, timedelta
+
+from support import app, reset_database, run_tests
+from models import db, Context, Transaction, TransactionDailyRollup, TransactionTagDailyRollup
+from rollups import rebuild_rollups
+from init_db import seed_data
+
+
+def rollup_rows():
+    rows = {}
+    for model in (TransactionDailyRollup, TransactionTagDailyRollup):
+        for row in model.query.all():
+            key = (model.__tablename__, row.context_id, row.date, row.type, getattr(row, 'tag_id', None))
+            rows[key] = (
+                round(row.total_amount, 2),
+                row.transaction_count,
+                round(getattr(row, 'untagged_amount', 0), 2)
+            )
+    return rows
+
+
+def test_incremental_rollups_match_rebuild():
+    client = reset_database()
+    rng = random.Random(7)
+    context_ids = [
+        client.post('/api/contexts', json={'name': name}).get_json()['data']['id']
+        for name in ['Business', 'Fitness']
+    ]
+    today = datetime.now().date()
+
+    def random_fields():
+        return {
+            'contextId': rng.choice(context_ids),
+            'type': rng.choice(['income', 'expense']),
+            'amount': round(rng.uniform(1, 200), 2),
+            'tags': rng.sample(['food', 'rent', 'travel'], rng.randint(0, 2)),
+            'date': (today - timedelta(days=rng.randint(0, 20))).strftime('%Y-%m-%d')
+        }
+
+    ids = []
+    for _ in range(150):
+        ids.append(client.post('/api/transactions', json=random_fields()).get_json()['data']['id'])
+    for transaction_id in rng.sample(ids, 60):
+        updates = random_fields()
+        updates.pop('contextId')
+        for key in rng.sample(list(updates), rng.randint(1, len(updates))):
+            client.put(f'/api/transactions/{transaction_id}', json={key: updates[key]})
+    for transaction_id in rng.sample(ids, 40):
+        client.delete(f'/api/transactions/{transaction_id}')
+    client.delete(f'/api/contexts/{context_ids[1]}')
+
+    with app.app_context():
+        incremental = rollup_rows()
+        rebuild_rollups()
+        db.session.commit()
+        rebuilt = rollup_rows()
+
+    assert incremental == rebuilt
+    assert all(key[1] == context_ids[0] for key in rebuilt)
+
+
+def test_orm_writes_outside_handlers_keep_rollups():
+    client = reset_database()
+    with app.app_context():
+        home, work = Context(name='Home'), Context(name='Work')
+        db.session.add_all([home, work])
+        db.session.commit()
+        rent = Transaction(context_id=home.id, type='expense', amount=800, tags=['rent'], date=date(2025, 3, 1))
+        salary = Transaction(context_id=home.id, type='income', amount=2500, date=date(2025, 3, 1))
+        coffee = Transaction(context_id=home.id, type='expense', amount=4, tags=['food'], date=date(2025, 3, 2))
+        db.session.add_all([rent, salary, coffee])
+        db.session.commit()
+
+        rent.amount = 850
+        rent.tags = ['rent', 'home']
+        salary.context_id = work.id
+        coffee.date = date(2025, 3, 3)
+        db.session.commit()
+        db.session.delete(coffee)
+        db.session.commit()
+        home_id, work_id = home.id, work.id
+
+        incremental = rollup_rows()
+        rebuild_rollups()
+        db.session.commit()
+        assert incremental == rollup_rows()
+
+    home_stats = client.get(f'/api/stats/summary?contextId={home_id}').get_json()['data']
+    work_stats = client.get(f'/api/stats/summary?contextId={work_id}').get_json()['data']
+    assert home_stats['total_expenses'] == 850 and home_stats['total_income'] == 0
+    assert work_stats['total_income'] == 2500
+
+
+def test_seeded_data_shows_in_stats():
+    client = reset_database()
+    seed_data()
+    transactions = client.get('/api/transactions').get_json()['data']
+    summary = client.get('/api/stats/summary').get_json()['data']
+    income = sum(t['amount'] for t in transactions if t['type'] == 'income')
+    expenses = sum(t['amount'] for t in transactions if t['type'] == 'expense')
+    assert transactions and summary['total_income'] == round(income, 2)
+    assert summary['total_expenses'] == round(expenses, 2)
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
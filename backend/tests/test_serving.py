@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Serving Tests
+create_app() builds independent apps from the environment plus overrides
+(a commit in one never invalidates another's cache), and the gunicorn worker hooks in serving.py give a forked worker fresh
+connection pools and shut a worker's listener and pools down.
+"""
+
+from support import app, reset_database, run_tests
+from app import create_app
+from changes import app_callbacks
+from models import db
+from serving import after_fork, shutdown
+
+
+def callback_counts(target):
+    return len(app_callbacks(target, 'flush')), len(app_callbacks(target, 'commit'))
+
+
+def test_create_app_builds_independent_apps():
+    before = callback_counts(app)
+    other = create_app({'RESPONSE_CACHE_TTL': 7})
+    try:
+        assert other is not app
+        assert other.config['RESPONSE_CACHE_TTL'] == 7
+        assert other.extensions['response_cache'] is not app.extensions['response_cache']
+        assert other.test_client().get('/api/health').status_code == 200
+        # Each app keeps its own change callbacks; building another one adds none to this app
+        assert callback_counts(app) == before == callback_counts(other)
+        assert set(app_callbacks(other, 'commit').values()).isdisjoint(app_callbacks(app, 'commit').values())
+    finally:
+        shutdown(other)
+
+    listener = other.extensions.get('invalidation_listener')
+    if listener is not None:
+        assert listener._stop.is_set()
+
+
+def test_commits_only_reach_their_own_app():
+    client = reset_database()
+    client.get('/api/stats/by-context')
+    cache = app.extensions['response_cache']
+    assert cache.stats()['entries'] == 1
+
+    other = create_app()
+    try:
+        with other.app_context():
+            db.create_all()
+            other.test_client().post('/api/contexts', json={'name': 'Elsewhere'})
+        assert cache.stats()['entries'] == 1
+        client.post('/api/contexts', json={'name': 'Home'})
+        assert cache.stats()['entries'] == 0
+    finally:
+        shutdown(other)
+
+
+def test_after_fork_replaces_inherited_pools():
+    client = reset_database()
+    client.post('/api/contexts', json={'name': 'Home'})
+    client.get('/api/stats/summary')
+    with app.app_context():
+        pool = db.engine.pool
+
+    after_fork(app)
+    with app.app_context():
+        assert db.engine.pool is not pool
+    assert app.extensions['response_cache'].stats()['entries'] == 0
+    # (An in-memory SQLite database goes away with its only connection, so check connectivity only)
+    assert client.get('/api/health').status_code == 200
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
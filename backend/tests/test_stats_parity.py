@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Stats Parity Tests
+Checks that the SQL-aggregated /api/stats endpoints return the same numbers
+as the original Python implementation (load every row, filter, then sum).
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from support import reset_database, run_tests
+
+RANGES = ['day', 'week', 'month', 'year', 'all']
+
+
+# ----------------------------------------------------------------------------
+# Reference implementation (the pre-aggregation behaviour of app.py)
+# ----------------------------------------------------------------------------
+
+def legacy_filter(transactions, date_range):
+    if date_range == 'all':
+        return transactions
+
+    now = datetime.now()
+    if date_range == 'day':
+        cutoff = datetime(now.year, now.month, now.day)
+    elif date_range == 'week':
+        cutoff = now - timedelta(days=7)
+    elif date_range == 'month':
+        cutoff = now - timedelta(days=30)
+    elif date_range == 'year':
+        cutoff = now - timedelta(days=365)
+    else:
+        return transactions
+
+    return [t for t in transactions if datetime.strptime(t['date'], '%Y-%m-%d') >= cutoff]
+
+
+def legacy_summary(transactions, date_range, context_id=None):
+    if context_id:
+        transactions = [t for t in transactions if t['contextId'] == context_id]
+    filtered = legacy_filter(transactions, date_range)
+    total_income = sum(t['amount'] for t in filtered if t['type'] == 'income')
+    total_expenses = sum(t['amount'] for t in filtered if t['type'] == 'expense')
+    return {
+        'total_income': round(total_income, 2),
+        'total_expenses': round(total_expenses, 2),
+        'balance': round(total_income - total_expenses, 2)
+    }
+
+
+def legacy_by_context(transactions, contexts, date_range):
+    expenses = [t for t in transactions if t['type'] == 'expense']
+    context_map = {c['id']: c['name'] for c in contexts}
+    totals = {}
+    for t in legacy_filter(expenses, date_range):
+        name = context_map.get(t['contextId'], 'Unknown')
+        totals[name] = totals.get(name, 0) + t['amount']
+    return {name: round(amount, 2) for name, amount in totals.items()}
+
+
+def legacy_by_tag(transactions, date_range, context_id=None):
+    expenses = [t for t in transactions if t['type'] == 'expense']
+    if context_id:
+        expenses = [t for t in expenses if t['contextId'] == context_id]
+    totals = {}
+    untagged = 0
+    for t in legacy_filter(expenses, date_range):
+        if not t['tags']:
+            untagged += t['amount']
+        for tag in t['tags']:
+            totals[tag] = totals.get(tag, 0) + t['amount']
+    if untagged > 0:
+        totals['Others (untagged)'] = untagged
+    return totals
+
+
+def legacy_daily(transactions, date_range, context_id=None):
+    if context_id:
+        transactions = [t for t in transactions if t['contextId'] == context_id]
+    totals = {}
+    for t in legacy_filter(transactions, date_range):
+        key = datetime.strptime(t['date'], '%Y-%m-%d').strftime('%b %d')
+        bucket = totals.setdefault(key, {'expenses': 0, 'income': 0})
+        if t['type'] == 'expense':
+            bucket['expenses'] += t['amount']
+        else:
+            bucket['income'] += t['amount']
+    return totals
+
+
+def legacy_overview_stats(transactions, context_id):
+    transactions = [t for t in transactions if t['contextId'] == context_id]
+    total_income = sum(t['amount'] for t in transactions if t['type'] == 'income')
+    total_expenses = sum(t['amount'] for t in transactions if t['type'] == 'expense')
+    recent = sorted(transactions, key=lambda x: x['date'], reverse=True)[:5]
+    return {
+        'total_income': round(total_income, 2),
+        'total_expenses': round(total_expenses, 2),
+        'transaction_count': len(transactions),
+        'recent_ids': [t['id'] for t in recent]
+    }
+
+
+# ----------------------------------------------------------------------------
+# Helpers
+# ----------------------------------------------------------------------------
+
+def seed(client, count=400):
+    rng = random.Random(42)
+    contexts = []
+    # Two contexts share a name on purpose: by-context groups by name
+    for name in ['Business', 'Fitness', 'Business']:
+        response = client.post('/api/contexts', json={'name': name})
+        contexts.append(response.get_json()['data'])
+
+    today = datetime.now().date()
+    for _ in range(count):
+        response = client.post('/api/transactions', json={
+            'contextId': rng.choice(contexts)['id'],
+            'type': rng.choice(['income', 'expense', 'expense']),
+            'amount': round(rng.uniform(1, 500), 2),
+            'description': 'Seeded',
+            'tags': rng.sample(['food', 'rent', 'travel'], rng.randint(0, 2)),
+            'date': (today - timedelta(days=rng.randint(0, 3 * 365))).strftime('%Y-%m-%d')
+        })
+        assert response.status_code == 201
+
+    transactions = client.get('/api/transactions?range=all').get_json()['data']
+    return contexts, transactions
+
+
+def assert_close(actual, expected, label):
+    assert abs(actual - expected) < 0.01, f"{label}: expected {expected}, got {actual}"
+
+
+# ----------------------------------------------------------------------------
+# Tests
+# ----------------------------------------------------------------------------
+
+def test_summary_matches_python_implementation():
+    client = reset_database()
+    contexts, transactions = seed(client)
+
+    for date_range in RANGES:
+        for context_id in [None] + [c['id'] for c in contexts]:
+            url = f'/api/stats/summary?range={date_range}'
+            if context_id:
+                url += f'&contextId={context_id}'
+            actual = client.get(url).get_json()['data']
+            expected = legacy_summary(transactions, date_range, context_id)
+            for key in expected:
+                assert_close(actual[key], expected[key], f'{url} {key}')
+
+
+def test_by_context_matches_python_implementation():
+    client = reset_database()
+    contexts, transactions = seed(client)
+
+    for date_range in RANGES:
+        data = client.get(f'/api/stats/by-context?range={date_range}').get_json()['data']
+        actual = {row['name']: row['value'] for row in data}
+        expected = legacy_by_context(transactions, contexts, date_range)
+        assert set(actual) == set(expected), f'{date_range}: {sorted(actual)} != {sorted(expected)}'
+        for name in expected:
+            assert_close(actual[name], expected[name], f'{date_range} {name}')
+        values = [row['value'] for row in data]
+        assert values == sorted(values, reverse=True)
+
+
+def test_by_tag_matches_python_implementation():
+    client = reset_database()
+    contexts, transactions = seed(client)
+
+    for date_range in RANGES:
+        for context_id in [None, contexts[1]['id']]:
+            url = f'/api/stats/by-tag?range={date_range}'
+            if context_id:
+                url += f'&contextId={context_id}'
+            data = client.get(url).get_json()['data']
+            actual = {row['name']: row['value'] for row in data}
+            expected = legacy_by_tag(transactions, date_range, context_id)
+            assert set(actual) == set(expected), url
+            for name, amount in expected.items():
+                assert_close(actual[name], amount, f'{url} {name}')
+
+
+def test_daily_matches_python_implementation():
+    client = reset_database()
+    contexts, transactions = seed(client)
+
+    for date_range in RANGES:
+        for context_id in [None, contexts[0]['id']]:
+            url = f'/api/stats/daily?range={date_range}'
+            if context_id:
+                url += f'&contextId={context_id}'
+            data = client.get(url).get_json()['data']
+            actual = {row['date']: row for row in data}
+            expected = legacy_daily(transactions, date_range, context_id)
+            assert set(actual) == set(expected), url
+            for key, bucket in expected.items():
+                assert_close(actual[key]['expenses'], bucket['expenses'], f'{url} {key} expenses')
+                assert_close(actual[key]['income'], bucket['income'], f'{url} {key} income')
+
+
+def test_overview_matches_python_implementation():
+    client = reset_database()
+    contexts, transactions = seed(client)
+    # The listing is newest first; the reference sort expects insertion order
+    transactions = sorted(transactions, key=lambda t: t['id'])
+
+    context_id = contexts[0]['id']
+    for status in ['todo', 'todo', 'in_progress', 'done']:
+        client.post('/api/todos', json={'contextId': context_id, 'title': 'Task', 'status': status})
+    client.post('/api/events', json={'contextId': context_id, 'title': 'Meet', 'startDate': '2025-01-01T10:00:00'})
+
+    for context in contexts:
+        data = client.get(f"/api/contexts/{context['id']}/overview").get_json()['data']
+        expected = legacy_overview_stats(transactions, context['id'])
+        stats = data['stats']
+        assert_close(stats['total_income'], expected['total_income'], 'total_income')
+        assert_close(stats['total_expenses'], expected['total_expenses'], 'total_expenses')
+        assert stats['transaction_count'] == expected['transaction_count']
+        assert [t['id'] for t in data['recent_transactions']] == expected['recent_ids']
+
+    stats = client.get(f'/api/contexts/{context_id}/overview').get_json()['data']['stats']
+    assert stats['todo_counts'] == {'todo': 2, 'in_progress': 1, 'done': 1}
+    assert stats['todo_count'] == 4 and stats['event_count'] == 1
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
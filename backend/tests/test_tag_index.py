@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tag Index Tests
+Checks that the JSON tags of every write are mirrored into the tags table
+and association tables, that existing tags are reused, and (on PostgreSQL)
+that two transactions creating the same new tag at once both commit.
+"""
+
+import threading
+
+from sqlalchemy.orm import Session
+
+from support import app, reset_database, run_tests
+from models import db, Tag, Todo
+
+
+def tag_names():
+    with app.app_context():
+        return sorted(db.session.scalars(db.select(Tag.name)).all())
+
+
+def test_tags_are_created_once_and_reused():
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    first = client.post('/api/todos', json={'contextId': context_id, 'title': 'Shop', 'tags': ['errands', 'food']})
+    client.post('/api/todos', json={'contextId': context_id, 'title': 'Cook', 'tags': ['food']})
+    assert tag_names() == ['errands', 'food']
+
+    todo_id = first.get_json()['data']['id']
+    client.put(f'/api/todos/{todo_id}', json={'tags': ['food', 'weekly']})
+    assert tag_names() == ['errands', 'food', 'weekly']
+    with app.app_context():
+        todo = db.session.get(Todo, todo_id)
+        assert sorted(tag.name for tag in todo.tag_objects) == ['food', 'weekly']
+
+
+def test_concurrent_writers_create_the_same_tag():
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            return
+
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    outcome = {}
+
+    with app.app_context():
+        first = Session(db.engine)
+        first.add(Todo(context_id=context_id, title='First', tags=['shared']))
+        first.flush()
+
+        def write_second():
+            with app.app_context():
+                second = Session(db.engine)
+                try:
+                    second.add(Todo(context_id=context_id, title='Second', tags=['shared']))
+                    second.commit()
+                    outcome['committed'] = True
+                except Exception as e:
+                    outcome['error'] = e
+                finally:
+                    second.close()
+
+        thread = threading.Thread(target=write_second)
+        thread.start()
+        # The second insert of the tag waits for the first transaction
+        thread.join(0.5)
+        assert thread.is_alive()
+        first.commit()
+        first.close()
+        thread.join(10)
+
+    assert outcome == {'committed': True}
+    assert tag_names() == ['shared']
+    with app.app_context():
+        tag_ids = {tuple(tag.id for tag in todo.tag_objects) for todo in Todo.query.all()}
+        assert len(tag_ids) == 1
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
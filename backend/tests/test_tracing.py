@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tracing Tests
+Installs a tracer and checks the spans a request produces: a server span
+with SQL, relationship load, to_dict and JSON encoding spans nested under
+it (a lazy load sits under the to_dict that triggered it), exported as
+OTLP/JSON or as a console waterfall, continuing an incoming traceparent.
+"""
+
+import io
+import json
+import os
+import tempfile
+
+from support import app, reset_database, run_tests
+from tracing import ConsoleExporter, OtlpFileExporter, Tracer
+
+
+def seed(client):
+    """A context with a todo that was added to the calendar; returns (todo id, event id)"""
+    context_id = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    todo_id = client.post('/api/todos', json={'contextId': context_id, 'title': 'Pay rent'}).get_json()['data']['id']
+    data = client.post(f'/api/todos/{todo_id}/add-to-calendar', json={
+        'date': '2025-03-05', 'time': '09:00'
+    }).get_json()['data']
+    return todo_id, data['event']['id']
+
+
+def traced_requests(tracer, send):
+    previous = app.extensions.get('tracer')
+    app.extensions['tracer'] = tracer
+    try:
+        return send()
+    finally:
+        if previous is None:
+            app.extensions.pop('tracer', None)
+        else:
+            app.extensions['tracer'] = previous
+
+
+def read_traces(path):
+    with open(path) as trace_file:
+        return [json.loads(line) for line in trace_file]
+
+
+def spans_of(trace):
+    return trace['resourceSpans'][0]['scopeSpans'][0]['spans']
+
+
+def attributes_of(span):
+    return {item['key']: next(iter(item['value'].values())) for item in span['attributes']}
+
+
+def test_lazy_load_is_nested_under_to_dict():
+    client = reset_database()
+    _, event_id = seed(client)
+    path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+    response = traced_requests(Tracer(OtlpFileExporter(path)), lambda: client.get(f'/api/events/{event_id}'))
+    assert response.status_code == 200
+
+    [trace] = read_traces(path)
+    resource = trace['resourceSpans'][0]['resource']['attributes']
+    assert resource == [{'key': 'service.name', 'value': {'stringValue': 'second-brain-api'}}]
+    spans = spans_of(trace)
+    by_id = {span['spanId']: span for span in spans}
+    assert {span['traceId'] for span in spans} == {response.headers['X-Trace-Id']}
+
+    [server] = [span for span in spans if 'parentSpanId' not in span]
+    assert server['name'] == 'GET /api/events/<int:event_id>' and server['kind'] == 2
+    assert attributes_of(server)['http.response.status_code'] == '200'
+
+    [to_dict] = [span for span in spans if span['name'] == 'Event.to_dict']
+    assert to_dict['parentSpanId'] == server['spanId']
+    assert attributes_of(to_dict)['model.id'] == str(event_id)
+    [lazy_load] = [span for span in spans if span['name'] == 'lazy load Event.linked_todos']
+    assert lazy_load['parentSpanId'] == to_dict['spanId']
+    [select] = [span for span in spans if span.get('parentSpanId') == lazy_load['spanId']]
+    assert select['kind'] == 3 and select['name'].startswith('SELECT ')
+    assert 'todo_event_links' in attributes_of(select)['db.query.text']
+
+    [encode] = [span for span in spans if span['name'] == 'encode JSON']
+    assert encode['parentSpanId'] == server['spanId']
+    for span in spans:
+        assert int(span['startTimeUnixNano']) <= int(span['endTimeUnixNano'])
+        if 'parentSpanId' in span:
+            assert span['parentSpanId'] in by_id
+
+
+def test_eager_loads_and_statements_are_traced_without_parameters():
+    client = reset_database()
+    seed(client)
+    stream = io.StringIO()
+    response = traced_requests(
+        Tracer(ConsoleExporter(stream)), lambda: client.get('/api/events?from=2025-03-01&to=2025-03-31')
+    )
+    assert response.status_code == 200
+
+    text = stream.getvalue()
+    lines = text.splitlines()
+    assert lines[0].startswith(f"trace {response.headers['X-Trace-Id']}")
+    assert 'GET /api/events' in lines[1]
+    assert any('eager load Event.linked_todos' in line for line in lines)
+    assert any('SELECT events' in line for line in lines)
+    # Bound values never reach a span
+    assert '2025-03-01' not in text and '2025-03-31' not in text
+
+
+def test_traceparent_continues_the_callers_trace():
+    client = reset_database()
+    path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+    trace_id, parent_id = '4bf92f3577b34da6a3ce929d0e0e4736', '00f067aa0ba902b7'
+
+    def send():
+        sampled = client.get('/api/contexts', headers={'traceparent': f'00-{trace_id}-{parent_id}-01'})
+        unsampled = client.get('/api/contexts', headers={'traceparent': f'00-{trace_id}-{parent_id}-00'})
+        return sampled, unsampled
+    sampled, unsampled = traced_requests(Tracer(OtlpFileExporter(path)), send)
+
+    [trace] = read_traces(path)
+    [server] = [span for span in spans_of(trace) if span['kind'] == 2]
+    assert server['traceId'] == trace_id and server['parentSpanId'] == parent_id
+    assert sampled.headers['X-Trace-Id'] == trace_id
+    assert 'X-Trace-Id' not in unsampled.headers
+
+
+def test_spans_beyond_the_limit_are_counted():
+    client = reset_database()
+    seed(client)
+    path = os.path.join(tempfile.mkdtemp(), 'traces.jsonl')
+    traced_requests(Tracer(OtlpFileExporter(path), max_spans=3), lambda: client.get('/api/events'))
+
+    [trace] = read_traces(path)
+    spans = spans_of(trace)
+    assert len(spans) == 3
+    [server] = [span for span in spans if span['kind'] == 2]
+    assert int(attributes_of(server)['trace.dropped_spans']) > 0
+
+
+def test_untraced_requests_carry_no_trace_id():
+    client = reset_database()
+    assert 'tracer' not in app.extensions
+    assert 'X-Trace-Id' not in client.get('/api/contexts').headers
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Transaction Import Tests
+Covers CSV and OFX ingest through /api/transactions/import: per-row error
+reports, dedup on re-import, and that the rollups and tag index stay
+consistent with rows created one by one.
+"""
+
+import io
+
+from support import app, reset_database, run_tests
+from rollups import rebuild_rollups
+from models import db, TransactionDailyRollup, TransactionTagDailyRollup
+
+CSV_BODY = """date,amount,description,type,tags
+2025-01-03,-12.50,Coffee beans,,food
+2025-01-03,2500,Salary,income,
+2025-01-04,40,Groceries,expense,food;home
+not-a-date,10,Broken,,
+2025-01-05,abc,Broken amount,,
+2025-01-05,7,Bad type,refund,
+2025-01-04,40,Groceries,expense,food;home
+"""
+
+OFX_BODY = """OFXHEADER:100
+DATA:OFXSGML
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20250110120000
+<TRNAMT>-18.20
+<NAME>Pharmacy
+<MEMO>Card 1234
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250111<TRNAMT>99.00<NAME>Refund</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+def rollup_rows():
+    with app.app_context():
+        return {
+            model.__tablename__: sorted(
+                tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+                for row in db.session.execute(db.select(*model.__table__.columns)).all()
+            )
+            for model in (TransactionDailyRollup, TransactionTagDailyRollup)
+        }
+
+
+def test_csv_import_reports_errors_and_dedups():
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    url = f'/api/transactions/import?contextId={context_id}'
+
+    report = client.post(url, data=CSV_BODY, content_type='text/csv').get_json()['data']
+    assert report['imported'] == 3 and report['duplicates'] == 1 and report['failed'] == 3
+    assert [error['row'] for error in report['errors']] == [5, 6, 7]
+
+    transactions = client.get(f'/api/contexts/{context_id}/transactions?range=all').get_json()['data']
+    by_description = {t['description']: t for t in transactions}
+    assert by_description['Coffee beans']['type'] == 'expense' and by_description['Coffee beans']['amount'] == 12.5
+    assert by_description['Groceries']['tags'] == ['food', 'home']
+
+    filtered = client.get(f'/api/contexts/{context_id}/transactions?range=all&tag=home').get_json()['data']
+    assert [t['description'] for t in filtered] == ['Groceries']
+
+    again = client.post(url, data=CSV_BODY, content_type='text/csv').get_json()['data']
+    assert again['imported'] == 0 and again['duplicates'] == 4
+
+    # Incremental rollups match a rebuild from the imported rows
+    before = rollup_rows()
+    with app.app_context():
+        rebuild_rollups()
+        db.session.commit()
+    assert rollup_rows() == before
+
+
+def test_ofx_import_as_multipart_upload():
+    client = reset_database()
+    context_id = client.post('/api/contexts', json={'name': 'Home'}).get_json()['data']['id']
+    response = client.post(
+        f'/api/transactions/import?contextId={context_id}',
+        data={'file': (io.BytesIO(OFX_BODY.encode()), 'statement.ofx')},
+        content_type='multipart/form-data'
+    )
+    report = response.get_json()['data']
+    assert report['imported'] == 2 and report['failed'] == 0
+
+    transactions = client.get(f'/api/contexts/{context_id}/transactions?range=all').get_json()['data']
+    assert [(t['date'], t['type'], t['amount'], t['description']) for t in transactions] == [
+        ('2025-01-11', 'income', 99.0, 'Refund'),
+        ('2025-01-10', 'expense', 18.2, 'Pharmacy - Card 1234'),
+    ]
+
+    summary = client.get(f'/api/stats/summary?range=all&contextId={context_id}').get_json()['data']
+    assert summary['total_income'] == 99 and summary['total_expenses'] == 18.2
+
+
+def test_bad_uploads_are_rejected():
+    client = reset_database()
+    client.post('/api/contexts', json={'name': 'Home'})
+    assert client.post('/api/transactions/import', data='amount\n1\n', content_type='text/csv').status_code == 400
+    assert client.post('/api/transactions/import?format=xls', data='x').status_code == 400
+
+    report = client.post('/api/transactions/import', data='date,amount\n2025-01-01,5\n',
+                         content_type='text/csv').get_json()['data']
+    assert report['failed'] == 1 and 'contextId' in report['errors'][0]['message']
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,406 @@
+"""
+Request tracing with OpenTelemetry-compatible spans.
+
+With TRACING_EXPORTER set, each sampled request (TRACING_SAMPLE_RATE) gets
+a server span with child spans for:
+- every SQL statement (before/after_cursor_execute, on every engine)
+- relationship loads (Todo.calendar_events, Event.linked_todos, ...),
+  lazy or selectin, including the hydration of the loaded rows
+- model to_dict() calls (@traced in models.py)
+- JSON encoding of the response (a JSON provider wrapping dumps)
+
+A lazy-load cascade then shows up as one waterfall: a to_dict span with a
+relationship load and its SELECT under it, repeated per row.
+
+Exporters need no collector: "console" prints each trace as an indented
+waterfall to stdout, "otlp-file" appends it to TRACING_FILE as one line of
+OTLP/JSON (the format the collector's file exporter writes and its
+otlpjsonfile receiver reads). An incoming W3C traceparent header continues
+the caller's trace, and responses carry the trace id in X-Trace-Id.
+
+Statements are recorded without their parameters. A trace keeps at most
+MAX_SPANS_PER_TRACE spans and counts the rest on the server span, so a
+large list does not buffer unbounded spans.
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+EXPORTERS = ('console', 'otlp-file')
+DEFAULT_TRACE_FILE = 'traces.jsonl'
+DEFAULT_SERVICE_NAME = 'second-brain-api'
+SCOPE_NAME = 'second-brain.tracing'
+MAX_SPANS_PER_TRACE = 2000
+STATEMENT_CHARS = 2000
+TRACE_ID_HEADER = 'X-Trace-Id'
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+STATEMENT_TARGET = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)', re.IGNORECASE)
+WATERFALL_DETAIL_CHARS = 120
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+
+def new_id(bits):
+    return f'{random.getrandbits(bits):0{bits // 4}x}'
+
+
+class Span:
+    __slots__ = ('name', 'kind', 'span_id', 'parent_id', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, name, kind, parent_id, attributes):
+        self.name = name
+        self.kind = kind
+        self.span_id = new_id(64)
+        self.parent_id = parent_id
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes or {}
+        self.error = None
+
+
+class Trace:
+    """The spans of one request; the innermost open span is the parent of the next one"""
+
+    def __init__(self, trace_id=None, parent_id=None, max_spans=MAX_SPANS_PER_TRACE):
+        self.trace_id = trace_id or new_id(128)
+        self.spans = []
+        self.dropped = 0
+        self.max_spans = max_spans
+        self._stack = []
+        self._remote_parent = parent_id
+
+    def start(self, name, kind=KIND_INTERNAL, attributes=None):
+        """Open a child of the current span; None once the trace is full"""
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return None
+        parent_id = self._stack[-1].span_id if self._stack else self._remote_parent
+        span = Span(name, kind, parent_id, attributes)
+        self.spans.append(span)
+        self._stack.append(span)
+        return span
+
+    def end(self, span, error=None):
+        if span is None:
+            return
+        span.end = time.time_ns()
+        if error is not None:
+            span.error = str(error) or type(error).__name__
+        if self._stack and self._stack[-1] is span:
+            self._stack.pop()
+        elif span in self._stack:
+            self._stack.remove(span)
+
+    @contextmanager
+    def span(self, name, kind=KIND_INTERNAL, attributes=None):
+        span = self.start(name, kind, attributes)
+        try:
+            yield span
+        except Exception as e:
+            self.end(span, e)
+            raise
+        self.end(span)
+
+
+def current_trace():
+    return g.get('trace') if has_request_context() else None
+
+
+@contextmanager
+def trace_span(name, kind=KIND_INTERNAL, attributes=None):
+    """A child span of the current request's trace; a no-op outside a traced request"""
+    trace = current_trace()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, kind, attributes) as span:
+        yield span
+
+
+def traced(method):
+    """Trace a model method (to_dict) as a span named after it, with the instance's primary key"""
+    name = method.__qualname__
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        trace = current_trace()
+        if trace is None:
+            return method(self, *args, **kwargs)
+        identity = inspect(self).identity
+        attributes = {'model.id': identity[0]} if identity and len(identity) == 1 else None
+        with trace.span(name, attributes=attributes):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+# ============================================================================
+# EXPORTERS
+# ============================================================================
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def otlp_span(trace, span):
+    data = {
+        'traceId': trace.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': span.kind,
+        'startTimeUnixNano': str(span.start),
+        'endTimeUnixNano': str(span.end or span.start),
+        'attributes': [{'key': key, 'value': otlp_value(value)} for key, value in span.attributes.items()],
+        'status': {'code': STATUS_ERROR, 'message': span.error} if span.error else {}
+    }
+    if span.parent_id:
+        data['parentSpanId'] = span.parent_id
+    return data
+
+
+def otlp_json(trace, service_name):
+    """One OTLP/JSON ExportTraceServiceRequest holding every span of a trace"""
+    return {'resourceSpans': [{
+        'resource': {'attributes': [{'key': 'service.name', 'value': otlp_value(service_name)}]},
+        'scopeSpans': [{
+            'scope': {'name': SCOPE_NAME},
+            'spans': [otlp_span(trace, span) for span in trace.spans]
+        }]
+    }]}
+
+
+class OtlpFileExporter:
+    """Appends each trace to a file as one line of OTLP/JSON"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, trace, service_name):
+        line = (json.dumps(otlp_json(trace, service_name), separators=(',', ':')) + '\n').encode()
+        # One O_APPEND write per trace keeps lines from several workers whole
+        descriptor = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            while line:
+                line = line[os.write(descriptor, line):]
+        finally:
+            os.close(descriptor)
+
+
+def format_waterfall(trace):
+    """Indented lines of 'offset, duration, name' with each span under its parent, in start order"""
+    children = {}
+    span_ids = {span.span_id for span in trace.spans}
+    for span in trace.spans:
+        parent_id = span.parent_id if span.parent_id in span_ids else None
+        children.setdefault(parent_id, []).append(span)
+    origin = min((span.start for span in trace.spans), default=0)
+
+    lines = []
+
+    def add(span, depth):
+        duration = ((span.end or span.start) - span.start) / 1e6
+        detail = span.attributes.get('db.query.text') or span.attributes.get('model.id')
+        suffix = f'  [{str(detail)[:WATERFALL_DETAIL_CHARS]}]' if detail is not None else ''
+        error = f'  ERROR: {span.error}' if span.error else ''
+        lines.append(
+            f'{(span.start - origin) / 1e6:>+9.2f} ms {duration:>9.2f} ms  {"  " * depth}{span.name}{suffix}{error}'
+        )
+        for child in sorted(children.get(span.span_id, ()), key=lambda child: child.start):
+            add(child, depth + 1)
+
+    for root in sorted(children.get(None, ()), key=lambda span: span.start):
+        add(root, 0)
+    return lines
+
+
+class ConsoleExporter:
+    """Prints each trace as a waterfall"""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def export(self, trace, service_name):
+        dropped = f' ({trace.dropped} spans dropped)' if trace.dropped else ''
+        text = '\n'.join([f'trace {trace.trace_id} {service_name}{dropped}'] + format_waterfall(trace)) + '\n'
+        stream = self.stream or sys.stdout
+        with self._lock:
+            stream.write(text)
+            stream.flush()
+
+
+class Tracer:
+    def __init__(self, exporter, service_name=DEFAULT_SERVICE_NAME, sample_rate=1.0,
+                 max_spans=MAX_SPANS_PER_TRACE):
+        self.exporter = exporter
+        self.service_name = service_name
+        self.sample_rate = sample_rate
+        self.max_spans = max_spans
+
+    def begin(self, traceparent=None):
+        """A Trace for a new request, continuing traceparent if given; None when not sampled"""
+        match = TRACEPARENT.match(traceparent or '')
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            if not int(flags, 16) & 1:
+                return None
+            return Trace(trace_id, parent_id, self.max_spans)
+        if random.random() >= self.sample_rate:
+            return None
+        return Trace(max_spans=self.max_spans)
+
+    def export(self, trace):
+        self.exporter.export(trace, self.service_name)
+
+
+def make_exporter(name, path):
+    if name == 'console':
+        return ConsoleExporter()
+    if name == 'otlp-file':
+        return OtlpFileExporter(os.path.abspath(path or DEFAULT_TRACE_FILE))
+    raise ValueError(f"TRACING_EXPORTER must be one of: {', '.join(EXPORTERS)}")
+
+
+# ============================================================================
+# INSTRUMENTATION
+# ============================================================================
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_statement_span(connection, cursor, statement, parameters, context, executemany):
+    trace = current_trace()
+    if trace is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'SQL'
+    # Span names follow the OpenTelemetry "{operation} {table}" convention
+    target = STATEMENT_TARGET.search(statement)
+    name = f'{operation} {target.group(1)}' if target else operation
+    span = trace.start(name, KIND_CLIENT, {
+        'db.system': connection.dialect.name,
+        'db.operation.name': operation,
+        'db.query.text': ' '.join(statement.split())[:STATEMENT_CHARS]
+    })
+    if span is not None and executemany:
+        span.attributes['db.operation.batch.size'] = len(parameters)
+    connection.info.setdefault('trace_spans', []).append(span)
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def end_statement_span(connection, cursor, statement, parameters, context, executemany):
+    spans = connection.info.get('trace_spans')
+    trace = current_trace()
+    if spans and trace is not None:
+        span = spans.pop()
+        if span is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.attributes['db.response.returned_rows'] = cursor.rowcount
+        trace.end(span)
+
+
+@event.listens_for(Engine, 'handle_error')
+def fail_statement_span(context):
+    spans = context.connection.info.get('trace_spans') if context.connection is not None else None
+    trace = current_trace()
+    if spans and trace is not None and context.statement is not None:
+        trace.end(spans.pop(), context.original_exception)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def trace_relationship_load(orm_execute_state):
+    trace = current_trace()
+    if trace is None or not orm_execute_state.is_relationship_load:
+        return None
+    path = orm_execute_state.loader_strategy_path.path
+    relationship = path[-1]
+    name = f'{relationship.parent.class_.__name__}.{relationship.key}'
+    parent = orm_execute_state.lazy_loaded_from
+    attributes = {'orm.relationship': name, 'orm.loader': 'lazy' if parent is not None else 'eager'}
+    if parent is not None and parent.identity and len(parent.identity) == 1:
+        attributes['model.id'] = parent.identity[0]
+    with trace.span(f'{attributes["orm.loader"]} load {name}', attributes=attributes):
+        # Fetch (and hydrate) the rows inside the span, then hand the loader a replay of them
+        frozen = orm_execute_state.invoke_statement().freeze()
+    return frozen()
+
+
+class TracedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with a span around encoding"""
+
+    def dumps(self, obj, **kwargs):
+        with trace_span('encode JSON') as span:
+            text = super().dumps(obj, **kwargs)
+            if span is not None:
+                span.attributes['response.body.size'] = len(text)
+            return text
+
+
+def init_tracing(app):
+    """Trace the app's requests into app.extensions['tracer'] when TRACING_EXPORTER is set"""
+    exporter_name = app.config.get('TRACING_EXPORTER')
+    if exporter_name:
+        app.extensions['tracer'] = Tracer(
+            make_exporter(exporter_name, app.config.get('TRACING_FILE')),
+            service_name=app.config.get('TRACING_SERVICE_NAME', DEFAULT_SERVICE_NAME),
+            sample_rate=app.config.get('TRACING_SAMPLE_RATE', 1.0)
+        )
+    app.json = TracedJSONProvider(app)
+
+    @app.before_request
+    def start_request_span():
+        tracer = app.extensions.get('tracer')
+        if tracer is None:
+            return
+        trace = tracer.begin(request.headers.get('traceparent'))
+        if trace is None:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else None
+        attributes = {'http.request.method': request.method, 'url.path': request.path}
+        if route:
+            attributes['http.route'] = route
+        g.trace = trace
+        g.request_span = trace.start(f'{request.method} {route or request.path}', KIND_SERVER, attributes)
+
+    @app.after_request
+    def record_response_status(response):
+        trace = g.get('trace')
+        if trace is not None:
+            g.request_span.attributes['http.response.status_code'] = response.status_code
+            if response.status_code >= 500:
+                g.request_span.error = f'HTTP {response.status_code}'
+            response.headers[TRACE_ID_HEADER] = trace.trace_id
+        return response
+
+    @app.teardown_request
+    def export_trace(exception=None):
+        # Runs after a streamed response has finished, so the server span covers the whole body
+        trace = g.pop('trace', None)
+        if trace is None:
+            return
+        span = g.pop('request_span')
+        if trace.dropped:
+            span.attributes['trace.dropped_spans'] = trace.dropped
+        trace.end(span, exception)
+        try:
+            app.extensions['tracer'].export(trace)
+        except Exception as e:
+            app.logger.warning(f'Could not export trace {trace.trace_id}: {str(e)}')
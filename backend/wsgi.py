@@ -0,0 +1,10 @@
+"""
+WSGI entry point for production serving:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Worker, thread, preload and timeout settings are read from the environment
+in gunicorn.conf.py. `python app.py` remains the development server.
+"""
+
+from app import app  # noqa: F401
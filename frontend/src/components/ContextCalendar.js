@@ -21,6 +21,7 @@ import apiService from '../services/apiService';
 import { deleteEventWithConfirmation } from '../utils/deleteUtils';
 import { showAppAlert } from '../utils/alertService';
 import { confirmAction } from '../utils/confirmService';
+import { buildEventUpdate, isOccurrence } from '../utils/eventUtils';
 
 const VIEW_OPTIONS = [
   { value: 'day', label: 'Day', Icon: CalendarDays },
@@ -162,7 +163,8 @@ const ContextCalendar = ({
       const response = await apiService.getContextEvents(
         context.id,
         fromDate,
-        toDate
+        toDate,
+        true
       );
       
       setEvents(response.data);
@@ -342,8 +344,8 @@ const ContextCalendar = ({
   const handleSaveEvent = async (eventData) => {
     try {
       if (selectedEvent) {
-        // Update existing event
-        await apiService.updateEvent(selectedEvent.id, eventData);
+        // Update existing event (an expanded occurrence updates its whole series)
+        await apiService.updateEvent(selectedEvent.id, buildEventUpdate(selectedEvent, eventData));
         setQuickViewEventId(selectedEvent.id);
       } else {
         // Create new event
@@ -421,6 +423,10 @@ const ContextCalendar = ({
   };
 
   const handleToggleEventComplete = async (eventItem, completed) => {
+    if (isOccurrence(eventItem)) {
+      // Completion is stored on the series, so it cannot be set for a single occurrence
+      return;
+    }
     try {
       await apiService.updateEvent(eventItem.id, { completed });
       setEvents((prev) =>
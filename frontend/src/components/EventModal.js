@@ -308,7 +308,9 @@ const EventModal = ({
               {event ? 'Edit Event' : 'Add Event'}
             </h3>
             <p className="text-sm text-slate-500 mt-1">
-              Schedule an event in this context
+              {event?.seriesId
+                ? 'Changes apply to every occurrence of this series'
+                : 'Schedule an event in this context'}
             </p>
           </div>
           <button
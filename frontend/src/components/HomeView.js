@@ -49,14 +49,6 @@ const getNoteDateLabel = (value) => {
   });
 };
 
-const getNoteSortValue = (note = {}) => {
-  const source = note.updatedAt || note.modifiedAt || note.createdAt;
-  if (!source) return 0;
-  const normalized = source.includes('T') ? source : `${source}T00:00:00`;
-  const date = new Date(normalized);
-  return date.getTime() || 0;
-};
-
 const HomeView = ({ 
   summaryStats, 
   contextData,
@@ -90,15 +82,7 @@ const HomeView = ({
   const eventMenuRef = useRef(null);
 
   useEffect(() => {
-    fetchAllTodos();
-  }, []);
-
-  useEffect(() => {
-    fetchUpcomingEvents();
-  }, []);
-
-  useEffect(() => {
-    fetchRecentNotes();
+    fetchHomeData();
   }, []);
 
   useEffect(() => {
@@ -150,95 +134,36 @@ const HomeView = ({
     }
   };
 
-  const fetchUpcomingEvents = async () => {
-    try {
-      setEventsLoading(true);
-      const start = new Date();
-      const end = new Date();
-      end.setDate(start.getDate() + 7);
-      const format = (date) => date.toISOString().split('T')[0];
-      const response = await apiService.getEvents(format(start), format(end));
-      const upcoming = response.data
-        .filter((event) => new Date(event.startDate) >= start)
-        .sort((a, b) => new Date(a.startDate) - new Date(b.startDate))
-        .slice(0, 5);
-      setUpcomingEvents(upcoming);
-    } catch (err) {
-      console.error('Error fetching upcoming events:', err);
-    } finally {
-      setEventsLoading(false);
-    }
-  };
-
-  const fetchRecentNotes = async () => {
+  // Contexts, open todos, recent notes and this week's events arrive in a single request
+  const fetchHomeData = async () => {
     try {
+      setTodosLoading(true);
       setNotesLoading(true);
-      const contextsRes = await apiService.getContexts();
-      const contextsList = contextsRes.data || [];
-      const notesByContext = await Promise.all(
-        contextsList.map(async (context) => {
-          try {
-            const response = await apiService.getContextNotes(context.id);
-            const contextNotes = response.data || [];
-            return contextNotes.map((note) => ({
-              ...note,
-              contextId: context.id,
-              contextName: context.name,
-              contextEmoji: context.emoji
-            }));
-          } catch (err) {
-            console.error(`Error fetching notes for context ${context.id}:`, err);
-            return [];
-          }
-        })
-      );
-      const combined = notesByContext.flat().sort((a, b) => getNoteSortValue(b) - getNoteSortValue(a));
-      setRecentNotes(combined.slice(0, 5));
+      setEventsLoading(true);
+      const response = await apiService.getHomeData();
+      const home = response.data || {};
+      const contextsList = home.contexts || [];
+      const contextsById = new Map(contextsList.map((context) => [context.id, context]));
+      const withContext = (item) => {
+        const context = contextsById.get(item.contextId);
+        return {
+          ...item,
+          contextName: context?.name,
+          contextEmoji: context?.emoji
+        };
+      };
+
+      setContexts(contextsList);
+      setAllTodos((home.open_todos || []).map(withContext));
+      setRecentNotes((home.recent_notes || []).map(withContext));
+      setUpcomingEvents((home.upcoming_events || []).slice(0, 5));
     } catch (err) {
-      console.error('Error fetching recent notes:', err);
+      console.error('Error fetching home data:', err);
       setRecentNotes([]);
     } finally {
-      setNotesLoading(false);
-    }
-  };
-
-  const fetchAllTodos = async () => {
-    try {
-      setTodosLoading(true);
-      // Get contexts first
-      const contextsRes = await apiService.getContexts();
-      setContexts(contextsRes.data);
-      
-      // Fetch todos from all contexts
-      const todosPromises = contextsRes.data.map(context => 
-        apiService.getContextTodos(context.id)
-      );
-      const todosResults = await Promise.all(todosPromises);
-      
-      // Combine all todos and filter for active (not done)
-      const allTodosData = todosResults.flatMap((result, index) => 
-        result.data.map(todo => ({
-          ...todo,
-          contextName: contextsRes.data[index].name,
-          contextEmoji: contextsRes.data[index].emoji
-        }))
-      );
-      
-      // Filter for active todos and sort by due date
-      const activeTodos = allTodosData
-        .filter(todo => todo.status !== 'done')
-        .sort((a, b) => {
-          if (!a.dueDate) return 1;
-          if (!b.dueDate) return -1;
-          return new Date(a.dueDate) - new Date(b.dueDate);
-        })
-        .slice(0, 8); // Show top 8
-      
-      setAllTodos(activeTodos);
-      setTodosLoading(false);
-    } catch (err) {
-      console.error('Error fetching todos:', err);
       setTodosLoading(false);
+      setNotesLoading(false);
+      setEventsLoading(false);
     }
   };
 
@@ -246,7 +171,7 @@ const HomeView = ({
     try {
       await apiService.updateTodo(todoId, { status: 'done' });
       // Refresh the todos list
-      fetchAllTodos();
+      fetchHomeData();
     } catch (err) {
       console.error('Error updating todo:', err);
       showAppAlert('Failed to update todo');
@@ -257,7 +182,7 @@ const HomeView = ({
     try {
       const deleted = await deleteTodoWithConfirmation(todo.id, todo, apiService);
       if (deleted) {
-        fetchAllTodos();
+        fetchHomeData();
       }
     } catch (err) {
       console.error('Error deleting todo:', err);
@@ -268,7 +193,7 @@ const HomeView = ({
   const handleEditTodo = async (todoId, updates) => {
     try {
       await apiService.updateTodo(todoId, updates);
-      fetchAllTodos();
+      fetchHomeData();
       setShowEditModal(false);
       setEditingTodo(null);
     } catch (err) {
@@ -279,8 +204,7 @@ const HomeView = ({
 
   const handleAddTodoToCalendar = async (todoId, eventData) => {
     await apiService.addTodoToCalendar(todoId, eventData);
-    await fetchAllTodos();
-    await fetchUpcomingEvents();
+    await fetchHomeData();
     setShowAddToCalendarModal(false);
     setCalendarTodo(null);
   };
@@ -310,8 +234,7 @@ const HomeView = ({
     if (!confirmed) return;
     try {
       await apiService.unlinkTodoFromEvent(todo.id, linkedEventId);
-      await fetchAllTodos();
-      await fetchUpcomingEvents();
+      await fetchHomeData();
     } catch (err) {
       console.error('Error removing todo from calendar:', err);
       showAppAlert('Failed to remove from calendar');
@@ -345,7 +268,7 @@ const HomeView = ({
         ...eventData,
         contextId: getEventContextId(editingEvent),
       });
-      await fetchUpcomingEvents();
+      await fetchHomeData();
       setShowEventModal(false);
       setEditingEvent(null);
       setActiveEventMenu(null);
@@ -359,8 +282,7 @@ const HomeView = ({
     try {
       const deleted = await deleteEventWithConfirmation(eventItem.id, eventItem, apiService);
       if (deleted) {
-        await fetchUpcomingEvents();
-        await fetchAllTodos();
+        await fetchHomeData();
       }
     } catch (err) {
       console.error('Error deleting event:', err);
@@ -382,8 +304,7 @@ const HomeView = ({
     if (!confirmed) return;
     try {
       await apiService.unlinkTodoFromEvent(linkedTodoId, eventItem.id);
-      await fetchUpcomingEvents();
-      await fetchAllTodos();
+      await fetchHomeData();
     } catch (err) {
       console.error('Error unlinking todo:', err);
       showAppAlert('Failed to unlink todo from event');
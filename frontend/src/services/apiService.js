@@ -178,11 +178,12 @@ class ApiService {
     return this.request(`/events?${params}`);
   }
 
-  // Get context events
-  async getContextEvents(contextId, fromDate = null, toDate = null) {
+  // Get context events (expandRecurring returns one entry per occurrence; needs both dates)
+  async getContextEvents(contextId, fromDate = null, toDate = null, expandRecurring = false) {
     const params = new URLSearchParams();
     if (fromDate) params.append('from', fromDate);
     if (toDate) params.append('to', toDate);
+    if (expandRecurring) params.append('expand', 'true');
     return this.request(`/contexts/${contextId}/events?${params}`);
   }
 
@@ -213,6 +214,15 @@ class ApiService {
     });
   }
 
+  // ============================================================================
+  // HOME ENDPOINT
+  // ============================================================================
+
+  // Contexts, recent notes, open/overdue todos and this week's events in one call
+  async getHomeData() {
+    return this.request('/home');
+  }
+
   // ============================================================================
   // STATS ENDPOINTS
   // ============================================================================
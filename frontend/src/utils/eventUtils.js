@@ -0,0 +1,67 @@
+/**
+ * Utility functions for expanded recurring event occurrences
+ */
+
+const parseLocalDateTime = (value) => {
+  const [datePart, timePart = '00:00:00'] = value.split('T');
+  const [year, month, day] = datePart.split('-').map(Number);
+  const [hour, minute, second = 0] = timePart.split(':').map(Number);
+  return new Date(year, month - 1, day, hour, minute, second);
+};
+
+const formatLocalDateTime = (dateObj) => {
+  const pad = (value) => String(value).padStart(2, '0');
+  return `${dateObj.getFullYear()}-${pad(dateObj.getMonth() + 1)}-${pad(dateObj.getDate())}` +
+    `T${pad(dateObj.getHours())}:${pad(dateObj.getMinutes())}:${pad(dateObj.getSeconds())}`;
+};
+
+/**
+ * Check if an event is one occurrence of an expanded recurring series
+ * @param {Object} event - Event as returned by the events endpoints
+ * @returns {boolean} True if the event carries a seriesId
+ */
+export const isOccurrence = (event) => Boolean(event?.seriesId);
+
+/**
+ * Turn the modal's edit of one occurrence into an update of its series.
+ * Occurrences carry their own startDate/endDate, but the series is stored with
+ * its first one (seriesStartDate): moving the occurrence moves the series start
+ * by the same number of days and minutes, so every occurrence moves alike and
+ * none before it is dropped. `completed` belongs to the series and is left out.
+ * @param {Object} event - The event being edited
+ * @param {Object} eventData - Fields from the event modal
+ * @returns {Object} Fields to PUT to /api/events/<seriesId>
+ */
+export const buildEventUpdate = (event, eventData) => {
+  if (!isOccurrence(event) || !event.seriesStartDate) return eventData;
+
+  const { completed, ...update } = eventData;
+  const occurrenceStart = parseLocalDateTime(event.startDate);
+  const editedStart = parseLocalDateTime(eventData.startDate);
+  const seriesStart = parseLocalDateTime(event.seriesStartDate);
+
+  // Shift by calendar days and wall-clock minutes so a DST change in between does not move the time
+  const dayShift = Math.round(
+    (Date.UTC(editedStart.getFullYear(), editedStart.getMonth(), editedStart.getDate()) -
+      Date.UTC(occurrenceStart.getFullYear(), occurrenceStart.getMonth(), occurrenceStart.getDate())) /
+      (24 * 60 * 60 * 1000)
+  );
+  const minuteShift =
+    (editedStart.getHours() * 60 + editedStart.getMinutes()) -
+    (occurrenceStart.getHours() * 60 + occurrenceStart.getMinutes());
+  const newSeriesStart = new Date(
+    seriesStart.getFullYear(),
+    seriesStart.getMonth(),
+    seriesStart.getDate() + dayShift,
+    seriesStart.getHours(),
+    seriesStart.getMinutes() + minuteShift,
+    seriesStart.getSeconds()
+  );
+  update.startDate = formatLocalDateTime(newSeriesStart);
+
+  if (eventData.endDate) {
+    const duration = parseLocalDateTime(eventData.endDate) - editedStart;
+    update.endDate = formatLocalDateTime(new Date(newSeriesStart.getTime() + duration));
+  }
+  return update;
+};
@@ -0,0 +1,53 @@
+import { buildEventUpdate, isOccurrence } from './eventUtils';
+
+const weeklySeries = {
+  id: 7,
+  seriesId: 7,
+  title: 'Standup',
+  recurring: true,
+  recurrenceType: 'weekly',
+  completed: false,
+  // The third occurrence of a series that started on March 3rd
+  startDate: '2025-03-17T09:00:00',
+  endDate: '2025-03-17T09:30:00',
+  seriesStartDate: '2025-03-03T09:00:00',
+  seriesEndDate: '2025-03-03T09:30:00'
+};
+
+const modalData = (overrides) => ({
+  title: 'Standup',
+  startDate: '2025-03-17T09:00:00',
+  endDate: '2025-03-17T09:30:00',
+  allDay: false,
+  recurring: true,
+  recurrenceType: 'weekly',
+  ...overrides
+});
+
+test('editing an occurrence keeps the series start', () => {
+  const update = buildEventUpdate(weeklySeries, modalData({ title: 'Daily sync' }));
+  expect(update.title).toBe('Daily sync');
+  expect(update.startDate).toBe('2025-03-03T09:00:00');
+  expect(update.endDate).toBe('2025-03-03T09:30:00');
+});
+
+test('moving an occurrence moves the series by the same amount', () => {
+  const update = buildEventUpdate(
+    weeklySeries,
+    modalData({ startDate: '2025-03-18T10:15:00', endDate: '2025-03-18T11:15:00' })
+  );
+  expect(update.startDate).toBe('2025-03-04T10:15:00');
+  expect(update.endDate).toBe('2025-03-04T11:15:00');
+});
+
+test('completed is never sent for an occurrence', () => {
+  const update = buildEventUpdate(weeklySeries, modalData({ completed: true }));
+  expect(update).not.toHaveProperty('completed');
+});
+
+test('single events are updated as edited', () => {
+  const single = { id: 3, startDate: '2025-03-17T09:00:00', endDate: '2025-03-17T10:00:00' };
+  const data = modalData({ startDate: '2025-03-20T09:00:00', completed: true });
+  expect(isOccurrence(single)).toBe(false);
+  expect(buildEventUpdate(single, data)).toEqual(data);
+});